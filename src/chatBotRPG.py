@@ -10,7 +10,15 @@ import re
 import core.game_intro
 from core.theme_customizer import ThemeCustomizationDialog, update_ui_colors
 from core.tab_manager import TabManagerWidget, restore_tabs, save_tabs_state, remove_tab
-from core.make_inference import make_inference
+from core.make_inference import make_inference, stream_inference
+from core.inference_transport import get_http_session, get_genai_client, reset_transport
+from core.response_cache import get_response_cache
+from core.entity_registry import rebuild_entity_registry
+from core.context_log import get_context_log, get_scene_index, get_scene_messages, bump_context_generation
+from core.context_budget import fit_context_to_budget, note_current_scene
+from core.transcript_log import get_transcript_log
+from core.variable_store import get_variable_store
+from core.variable_substitution import VariableSnapshot, render_template, substitute_placeholders
 from core.add_tab import add_new_tab, get_default_tab_settings, update_top_splitter_location_text
 from core.utils import reset_player_to_origin, _get_player_current_setting_name, _load_json_safely, _save_json_safely, _get_or_create_actor_data, save_game_state, sanitize_folder_name, _get_player_character_name, _find_setting_file_prioritizing_game_dir
 import shutil
@@ -39,9 +47,11 @@ FALLBACK_MODEL_3 = "google/gemini-2.5-flash-lite-preview-06-17"
 
 class InferenceThread(QThread):
     result_signal = pyqtSignal(str)
+    partial_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
+    PARTIAL_EMIT_INTERVAL = 0.05
 
-    def __init__(self, context, character_name, url_type, max_tokens, temperature, is_utility_call=False):
+    def __init__(self, context, character_name, url_type, max_tokens, temperature, is_utility_call=False, stream=False, use_cache=False, cache_dir=None, cache_accept=None):
         super().__init__()
         self.context = context
         self.character_name = character_name
@@ -49,11 +59,37 @@ class InferenceThread(QThread):
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.is_utility_call = is_utility_call
+        self.stream = stream and not is_utility_call
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.cache_accept = cache_accept
+
+    def _run_streaming(self):
+        accumulated = ""
+        last_emit = 0.0
+        try:
+            for delta in stream_inference(self.context, self.url_type, self.max_tokens, self.temperature):
+                accumulated += delta
+                now = time.monotonic()
+                if now - last_emit >= self.PARTIAL_EMIT_INTERVAL:
+                    self.partial_signal.emit(accumulated)
+                    last_emit = now
+        except Exception as e:
+            print(f"[STREAM] Streaming failed for {self.character_name} after {len(accumulated)} chars, falling back to blocking request: {e}")
+            return None
+        if accumulated:
+            self.partial_signal.emit(accumulated)
+        return accumulated
 
     def run(self):
         try:
             log_header = "Context for Utility LLM" if self.is_utility_call else "Context for LLM"
             print(f"--- [Model: {self.url_type}] ---")
+            if self.stream:
+                streamed_message = self._run_streaming()
+                if streamed_message:
+                    self.result_signal.emit(streamed_message)
+                    return
             user_message = self.context[-1]['content'] if self.context and self.context[-1]['role'] == 'user' else ""
             assistant_message = make_inference(
                 self.context,
@@ -62,7 +98,10 @@ class InferenceThread(QThread):
                 self.url_type,
                 self.max_tokens,
                 self.temperature,
-                is_utility_call=self.is_utility_call
+                is_utility_call=self.is_utility_call,
+                use_cache=self.use_cache,
+                cache_dir=self.cache_dir,
+                cache_accept=self.cache_accept
             )
             self.result_signal.emit(assistant_message)
         except Exception as e:
@@ -345,8 +384,6 @@ class ChatbotUI(QWidget):
             chargen_widget.setParent(None)
             chargen_widget.deleteLater()
             del tab_data['_chargen_widget']
-        if hasattr(self, '_actor_name_to_file_cache'):
-            self._actor_name_to_file_cache.clear()
         right_splitter = tab_data.get('right_splitter')
         workflow_data_dir = tab_data.get('workflow_data_dir')
         if right_splitter and workflow_data_dir:
@@ -912,14 +949,9 @@ class ChatbotUI(QWidget):
         tab_data['context'] = []
         tab_data['_remembered_selected_message'] = None
         loaded_context = []
+        context_log = get_context_log(context_file)
         try:
-            if os.path.exists(context_file):
-                with open(context_file, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    if content.strip():
-                         parsed_content = json.loads(content)
-                         if isinstance(parsed_content, list):
-                             loaded_context = parsed_content
+            loaded_context = context_log.load()
         except json.JSONDecodeError:
             print(f"Error decoding JSON from {context_file}. Starting fresh.")
             loaded_context = []
@@ -927,24 +959,11 @@ class ChatbotUI(QWidget):
             print(f"Error loading context from {context_file}: {e}. Starting fresh.")
             loaded_context = []
         tab_data['context'] = loaded_context
-        latest_scene_in_context = 1
-        if loaded_context:
-            try:
-                latest_scene_in_context = max(msg.get('scene', 1) for msg in loaded_context)
-            except ValueError:
-                 latest_scene_in_context = 1
-        if loaded_context:
-            last_msg = loaded_context[-1]
-            last_scene = last_msg.get('scene')
-            if isinstance(last_scene, int) and last_scene >= 1:
-                desired_scene = last_scene
-            else:
-                desired_scene = latest_scene_in_context
-        else:
-            desired_scene = 1
+        context_index = get_scene_index(loaded_context)
+        desired_scene = context_index.current_scene() if loaded_context else 1
         tab_data['scene_number'] = desired_scene
         if loaded_context:
-            for message_data in loaded_context:
+            for message_data in get_scene_messages(loaded_context, desired_scene):
                 role = message_data.get('role')
                 content = message_data.get('content')
                 metadata = message_data.get('metadata', {})
@@ -952,10 +971,6 @@ class ChatbotUI(QWidget):
                 character_name = metadata.get('character_name', None)
                 post_effects = metadata.get('post_effects', None)
                 message_scene = message_data.get('scene', 1)
-
-                if message_scene != desired_scene:
-                    continue
-
                 if role and isinstance(content, str):
                     # Load portrait data for historical assistant messages
                     portrait_data = None
@@ -979,34 +994,12 @@ class ChatbotUI(QWidget):
                     )
         # Do not backfill debug posts on load; debug shows live run only
         output_widget._scroll_to_bottom()
-        if loaded_context:
-            last_message = loaded_context[-1]
-            last_scene_from_msg = last_message.get('scene')
-            if isinstance(last_scene_from_msg, int) and last_scene_from_msg >= 1:
-                tab_data['scene_number'] = last_scene_from_msg
-            else:
-                tab_data['scene_number'] = latest_scene_in_context
-        else:
-            tab_data['scene_number'] = 1
-        assistant_message_count = sum(1 for msg in loaded_context if msg.get('role') == 'assistant')
-        tab_data['turn_count'] = assistant_message_count + 1
+        tab_data['turn_count'] = context_index.assistant_count + 1
         if index == self.tab_widget.currentIndex():
             self._update_turn_counter_display()
         show_intro = not loaded_context
         tab_data['_is_showing_intro'] = show_intro
-        current_scene_for_tab = tab_data.get('scene_number', 1)
-        narrator_posted_in_current_scene_on_load = False
-        if loaded_context:
-            for message_data in loaded_context:
-                msg_scene = message_data.get('scene', 1)
-                msg_role = message_data.get('role')
-                msg_char_name = message_data.get('metadata', {}).get('character_name')
-                is_narrator_post = (msg_role == 'assistant' and 
-                                    (msg_char_name == "Narrator" or not msg_char_name))
-
-                if msg_scene == current_scene_for_tab and is_narrator_post:
-                    narrator_posted_in_current_scene_on_load = True
-                    break
+        narrator_posted_in_current_scene_on_load = bool(loaded_context) and desired_scene in context_index.narrator_scenes
         tab_data['_has_narrator_posted_this_scene'] = narrator_posted_in_current_scene_on_load
         top_splitter = tab_data.get('top_splitter')
         if show_intro:
@@ -1046,22 +1039,32 @@ class ChatbotUI(QWidget):
 
     def _perform_save_active_tab(self):
         self._save_requested = False
-        output_widget = self.get_current_output_widget()
+        tab_data = self.get_current_tab_data()
         log_file = self.get_current_log_file()
-        if not output_widget or not log_file:
+        if not tab_data or not log_file:
             return
-        current_content = output_widget.toHtml()
         try:
-            log_dir = os.path.dirname(log_file)
-            if log_dir and not os.path.exists(log_dir):
-                 os.makedirs(log_dir)
-            with open(log_file, "w", encoding="utf-8") as file:
-                file.write(current_content)
+            get_transcript_log(log_file).append_messages(tab_data.get('context', []))
         except IOError as e:
             print(f"Error saving log file {log_file}: {e}")
         except Exception as e:
             print(f"Unexpected error saving log file {log_file}: {e}")
 
+    def export_transcript_for_tab(self, index, export_path=None):
+        if not (0 <= index < len(self.tabs_data) and self.tabs_data[index] is not None):
+            return None
+        tab_data = self.tabs_data[index]
+        log_file = tab_data.get('log_file')
+        if not log_file:
+            return None
+        try:
+            transcript = get_transcript_log(log_file)
+            transcript.append_messages(tab_data.get('context', []))
+            return transcript.export_html(export_path)
+        except Exception as e:
+            print(f"Error exporting transcript for tab {index}: {e}")
+            return None
+
     def _save_context_for_tab(self, index):
         if not (0 <= index < len(self.tabs_data) and self.tabs_data[index] is not None):
             return
@@ -1072,11 +1075,7 @@ class ChatbotUI(QWidget):
             print(f"Error: No context file path defined for tab index {index}")
             return
         try:
-            context_dir = os.path.dirname(context_file)
-            if context_dir and not os.path.exists(context_dir):
-                 os.makedirs(context_dir)
-            with open(context_file, "w", encoding="utf-8") as f:
-                json.dump(context, f, indent=2, ensure_ascii=False)
+            get_context_log(context_file).save(context)
         except IOError as e:
             print(f"Error saving context file {context_file}: {e}")
         except Exception as e:
@@ -1542,13 +1541,20 @@ class ChatbotUI(QWidget):
                         tab_data.pop('_is_timer_narrator_action_active', None)
                 QTimer.singleShot(0, lambda: _start_npc_inference_threads(self))
                 return
+            note_current_scene(workflow_data_dir, current_scene, current_context, model_to_use)
+            context_for_llm = fit_context_to_budget(
+                context_for_llm, history_to_add, model_to_use, self.max_tokens,
+                workflow_data_dir, current_scene, self.character_name
+            )
             self.inference_thread = InferenceThread(
                 context_for_llm,
                 self.character_name,
                 model_to_use,
                 self.max_tokens,
-                temperature_to_use
+                temperature_to_use,
+                stream=self._is_token_streaming_enabled(tab_data)
             )
+            self.inference_thread.partial_signal.connect(self.display_partial_message)
             self.inference_thread.result_signal.connect(self.handle_assistant_message)
             self.inference_thread.error_signal.connect(self.handle_inference_error)
             self.inference_thread.finished.connect(self.on_inference_finished)
@@ -1597,6 +1603,7 @@ class ChatbotUI(QWidget):
 
     def handle_inference_error(self, error_message):
         print(f"Error during inference for tab {self.current_tab_index}: {error_message}")
+        self.clear_partial_message()
         tab_data = self.get_current_tab_data()
         if tab_data:
             time_manager_widget = tab_data.get('time_manager_widget')
@@ -1630,10 +1637,12 @@ class ChatbotUI(QWidget):
         # Check for failure responses that indicate model issues
         if isinstance(message, str) and any(message.strip().lower().startswith(failure_start) for failure_start in ['i\'m', 'sorry', 'ext']):
             print(f"[NARRATOR FALLBACK] Detected failure response '{message}' for {char_name}, retrying with fallback models...")
+            self.clear_partial_message()
             if not tried_fallback1:
                 print("[NARRATOR FALLBACK] Retrying with fallback model 1...")
                 if current_context and current_context[-1].get('role') == 'assistant':
                     current_context.pop()
+                    bump_context_generation(current_context)
                 self.inference_thread = InferenceThread(
                     current_context,
                     self.character_name,
@@ -1650,6 +1659,7 @@ class ChatbotUI(QWidget):
                 print("[NARRATOR FALLBACK] Retrying with fallback model 2...")
                 if current_context and current_context[-1].get('role') == 'assistant':
                     current_context.pop()
+                    bump_context_generation(current_context)
                 self.inference_thread = InferenceThread(
                     current_context,
                     self.character_name,
@@ -1666,6 +1676,7 @@ class ChatbotUI(QWidget):
                 print("[NARRATOR FALLBACK] Retrying with fallback model 3...")
                 if current_context and current_context[-1].get('role') == 'assistant':
                     current_context.pop()
+                    bump_context_generation(current_context)
                 self.inference_thread = InferenceThread(
                     current_context,
                     self.character_name,
@@ -1687,6 +1698,7 @@ class ChatbotUI(QWidget):
                 print("LLM refusal or empty response detected, retrying with fallback model 1...")
                 if current_context and current_context[-1].get('role') == 'assistant':
                     current_context.pop()
+                    bump_context_generation(current_context)
                 self.inference_thread = InferenceThread(
                     current_context,
                     self.character_name,
@@ -1703,6 +1715,7 @@ class ChatbotUI(QWidget):
                 print("Fallback model 1 also refused, retrying with fallback model 2...")
                 if current_context and current_context[-1].get('role') == 'assistant':
                     current_context.pop()
+                    bump_context_generation(current_context)
                 self.inference_thread = InferenceThread(
                     current_context,
                     self.character_name,
@@ -1719,6 +1732,7 @@ class ChatbotUI(QWidget):
                 print("Fallback model 2 also refused, retrying with fallback model 3...")
                 if current_context and current_context[-1].get('role') == 'assistant':
                     current_context.pop()
+                    bump_context_generation(current_context)
                 self.inference_thread = InferenceThread(
                     current_context,
                     self.character_name,
@@ -1769,6 +1783,7 @@ class ChatbotUI(QWidget):
             allowed_character = tab_data.get('_HARD_SUPPRESS_ALL_EXCEPT')
             if self.character_name != allowed_character:
                 self._assistant_message_buffer = None
+                self.clear_partial_message(output_widget)
                 return
         text_tag_to_use = getattr(self, '_cot_text_tag', None)
         is_fn_first_call = tab_data.pop('_is_force_narrator_first_active', False)
@@ -1880,6 +1895,7 @@ class ChatbotUI(QWidget):
             if self.character_name != "Narrator" and workflow_data_dir:
                 self._generate_and_save_npc_note_main(self.character_name, message, workflow_data_dir)
         else:
+            self.clear_partial_message(output_widget)
             if self.character_name == "Narrator":
                 self._narrator_streaming_lock = False
         if tab_data:
@@ -2211,6 +2227,47 @@ class ChatbotUI(QWidget):
             print(f"ERROR: Cannot display message, output widget not found for role {role}.")
             return None
 
+    def _is_token_streaming_enabled(self, tab_data=None):
+        if tab_data is None:
+            tab_data = self.get_current_tab_data()
+        if not tab_data:
+            return False
+        return bool(tab_data.get('settings', {}).get('live_token_streaming', False))
+
+    def display_partial_message(self, content, character_name=None, text_tag=None, output_widget=None):
+        if output_widget is None:
+            output_widget = self.get_current_output_widget()
+        if not output_widget or not hasattr(output_widget, 'update_live_message'):
+            return None
+        tab_data = self.get_current_tab_data()
+        if not tab_data:
+            return None
+        name_for_widget = character_name if character_name is not None else self.character_name
+        if not isinstance(content, str):
+            return None
+        content = re.sub(r'<think>[\s\S]*?</think>', '', content, flags=re.IGNORECASE)
+        content = re.sub(r'<think>[\s\S]*$', '', content, flags=re.IGNORECASE).lstrip()
+        if name_for_widget and content.startswith(f"{name_for_widget}:"):
+            content = content[len(name_for_widget) + 1:].lstrip()
+        if not content:
+            return None
+        current_scene = tab_data.get('scene_number', 1)
+        return output_widget.update_live_message(
+            'assistant',
+            content,
+            text_tag=text_tag,
+            scene_number=current_scene,
+            latest_scene_in_context=current_scene,
+            character_name=name_for_widget
+        )
+
+    def clear_partial_message(self, output_widget=None):
+        if output_widget is None:
+            output_widget = self.get_current_output_widget()
+        if output_widget and hasattr(output_widget, 'clear_live_message'):
+            return output_widget.clear_live_message()
+        return False
+
     def _format_code_blocks(self, html_message, border_color, text_color):
         def replace_code_style(match):
             code_content = match.group(1)
@@ -2314,8 +2371,9 @@ class ChatbotUI(QWidget):
             return
         pass
 
-    def run_quick_utility_check(self, prompt, max_tokens=10):
+    def run_quick_utility_check(self, prompt, max_tokens=10, use_cache=True):
         context = [{"role": "user", "content": prompt}]
+        tab_data = self.get_current_tab_data()
         try:
             return make_inference(
                 context,
@@ -2324,7 +2382,9 @@ class ChatbotUI(QWidget):
                 self.get_current_model(),
                 max_tokens,
                 0.1,
-                is_utility_call=True
+                is_utility_call=True,
+                use_cache=use_cache,
+                cache_dir=tab_data.get('workflow_data_dir') if tab_data else None
             )
         except Exception as e:
             print(f"Quick utility check error: {e}")
@@ -2552,8 +2612,7 @@ class ChatbotUI(QWidget):
         elif ctype == 'Variable':
             original_value = cond.get('value', '')
             substituted_value = self._substitute_placeholders_in_condition_value(original_value, tab_data, character_name)
-            cond['value'] = substituted_value
-            result = self._evaluate_variable_condition(tab_data, cond, character_name)
+            result = self._evaluate_variable_condition(tab_data, dict(cond, value=substituted_value), character_name)
             return result
         elif ctype == 'Scene Count':
             operator = cond.get('operator', '==')
@@ -2889,20 +2948,13 @@ class ChatbotUI(QWidget):
         
         if context_file:
             try:
-                with open(context_file, "w", encoding="utf-8") as f:
-                    json.dump([], f)
+                get_context_log(context_file).reset()
             except Exception as e:
                 print(f"  Error clearing context file {context_file}: {e}")
         
         if log_file:
             try:
-                empty_html = """<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" "http://www.w3.org/TR/REC-html40/strict.dtd">
-<html><head><meta name=\"qrichtext\" content=\"1\" /><style type=\"text/css\">
-p, li { white-space: pre-wrap; }
-</style></head><body style=\" font-family:'Arial'; font-size:16pt; font-weight:400; font-style:normal;\">
-<p style=\"-qt-paragraph-type:empty; margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\"><br /></p></body></html>"""
-                with open(log_file, "w", encoding="utf-8") as f:
-                    f.write(empty_html)
+                get_transcript_log(log_file).reset()
             except Exception as e:
                 print(f"  Error clearing log file {log_file}: {e}")
         
@@ -2948,8 +3000,8 @@ p, li { white-space: pre-wrap; }
             except Exception as e:
                 print(f"  Reset: Error updating right splitter setting name: {e}")
         
-        if hasattr(self, '_actor_name_to_file_cache'):
-            self._actor_name_to_file_cache.clear()
+        if workflow_data_dir:
+            rebuild_entity_registry(workflow_data_dir)
         if hasattr(self, '_actor_name_to_actual_name'):
             self._actor_name_to_actual_name.clear()
         if hasattr(self, '_npc_message_queue'):
@@ -2978,16 +3030,7 @@ p, li { white-space: pre-wrap; }
         if not variables_file:
             print(f"Error: No variables file path defined for tab index {tab_index}")
             return
-        try:
-            variables_dir = os.path.dirname(variables_file)
-            if variables_dir and not os.path.exists(variables_dir):
-                os.makedirs(variables_dir)
-            with open(variables_file, 'w', encoding='utf-8') as f:
-                json.dump(variables_data, f, indent=2, ensure_ascii=False)
-        except IOError as e:
-            print(f"Error saving variables file {variables_file}: {e}")
-        except Exception as e:
-            print(f"Unexpected error saving variables file {variables_file}: {e}")
+        get_variable_store().replace(variables_file, variables_data)
 
     def closeEvent(self, event):
         if hasattr(self, 'effects_check_timer') and self.effects_check_timer.isActive():
@@ -3014,6 +3057,7 @@ p, li { white-space: pre-wrap; }
                 time_manager_widget = tab_data.get('time_manager_widget')
                 if time_manager_widget and hasattr(time_manager_widget, 'save_state_on_shutdown'):
                     time_manager_widget.save_state_on_shutdown()
+                self.export_transcript_for_tab(i)
         print("Time state saved for all tabs")
 
         settings = QSettings("ChatBotRPG", "ChatBotRPG")
@@ -3053,6 +3097,8 @@ p, li { white-space: pre-wrap; }
                 self.files_to_delete_on_exit = []
         else:
             print("  No files scheduled for deferred deletion.")
+        reset_transport()
+        get_response_cache().close()
         super().closeEvent(event)
 
     def _evaluate_variable_condition(self, tab_data, variable_condition, character_name=None):
@@ -3536,7 +3582,7 @@ p, li { white-space: pre-wrap; }
             for attempt, current_model in enumerate(models_to_try):
                 try:
                     from google import genai
-                    client = genai.Client(api_key=api_key)
+                    client = get_genai_client(api_key)
                     formatted_messages = []
                     for msg in messages:
                         role = msg.get('role', 'user')
@@ -3618,7 +3664,7 @@ p, li { white-space: pre-wrap; }
             actual_url = f"{base_url_clean}/chat/completions"
             try:
                 import requests 
-                response = requests.post(actual_url, headers=headers, json=data, timeout=60)
+                response = get_http_session(base_url_clean).post(actual_url, headers=headers, json=data, timeout=60)
                 response.raise_for_status()
                 response_data = response.json()
                 choices = response_data.get('choices', [])
@@ -3911,82 +3957,21 @@ p, li { white-space: pre-wrap; }
                 animation_speed=darken_brighten_config.get('animation_speed', 2000)
             )
 
-    def _substitute_variables_in_string(self, text_to_process, tab_data, actor_name_context=None):
+    def _substitute_variables_in_string(self, text_to_process, tab_data, actor_name_context=None, snapshot=None):
         if not text_to_process or not isinstance(text_to_process, str):
             return text_to_process
-        from core.utils import (
-            _get_player_character_name,
-            _get_or_create_actor_data,
-            _get_player_current_setting_name,
-            _find_setting_file_prioritizing_game_dir,
-            _load_json_safely
-        )
-        result_text = text_to_process
-        if '(character)' in result_text.lower() and actor_name_context:
-            result_text = re.sub(r'(?<!\[)\(character\)(?![^,\]]*\])', actor_name_context, result_text, flags=re.IGNORECASE)
-        if '(player)' in result_text.lower():
-            workflow_data_dir = tab_data.get('workflow_data_dir') if tab_data else None
-            if workflow_data_dir:
-                from core.utils import _get_player_character_name
-                player_name = _get_player_character_name(workflow_data_dir)
-                if player_name:
-                    result_text = re.sub(r'\(player\)', player_name, result_text, flags=re.IGNORECASE)
-        if '(setting)' in result_text.lower():
-            workflow_data_dir = tab_data.get('workflow_data_dir') if tab_data else None
-            if workflow_data_dir:
-                from core.utils import _get_player_current_setting_name
-                setting_name = _get_player_current_setting_name(workflow_data_dir)
-                if setting_name and setting_name != "Unknown Setting":
-                    result_text = re.sub(r'\(setting\)', setting_name, result_text, flags=re.IGNORECASE)
-        def get_var_value(scope, var_name):
-            workflow_data_dir = tab_data.get('workflow_data_dir')
-            if not var_name: return ""
-            if scope == "global":
-                if not workflow_data_dir: return ""
-                tab_index = -1
-                try:
-                    tab_index = self.tabs_data.index(tab_data)
-                except ValueError:
-                    return ""
-                all_vars = self._load_variables(tab_index)
-                value = all_vars.get(var_name, "")
-                return value
-            if not workflow_data_dir: return ""
-            if scope == "player":
-                player_name = _get_player_character_name(workflow_data_dir)
-                if player_name:
-                    actor_data, _ = _get_or_create_actor_data(self, workflow_data_dir, player_name)
-                    return actor_data.get('variables', {}).get(var_name, "")
-                return ""
-            elif scope == "actor":
-                if actor_name_context:
-                    actor_data, _ = _get_or_create_actor_data(self, workflow_data_dir, actor_name_context)
-                    return actor_data.get('variables', {}).get(var_name, "")
-                return ""
-            elif scope == "character":
-                if actor_name_context:
-                    actor_data, _ = _get_or_create_actor_data(self, workflow_data_dir, actor_name_context)
-                    return actor_data.get('variables', {}).get(var_name, "")
-                return ""
-            elif scope == "setting":
-                current_setting_name = _get_player_current_setting_name(workflow_data_dir)
-                if current_setting_name and current_setting_name != "Unknown Setting":
-                    setting_file_path, _ = _find_setting_file_prioritizing_game_dir(self, workflow_data_dir, current_setting_name)
-                    if setting_file_path and os.path.exists(setting_file_path):
-                        setting_data = _load_json_safely(setting_file_path)
-                        if setting_data:
-                            return setting_data.get('variables', {}).get(var_name, "")
-                return ""
-            return ""
-        def replace_match(match):
-            scope = match.group(1).lower()
-            var_name = match.group(2).strip()
-            val = get_var_value(scope, var_name)
-            final_str = str(val)
-            return final_str
-        pattern = r'\[(global|player|actor|character|setting),\s*([^,\]]+?)\s*\]'
-        final_result = re.sub(pattern, replace_match, result_text)
-        return final_result
+        if snapshot is None:
+            snapshot = self._create_variable_snapshot(tab_data, actor_name_context)
+        return render_template(text_to_process, snapshot)
+
+    def _create_variable_snapshot(self, tab_data, actor_name_context=None):
+        def load_global_variables():
+            try:
+                tab_index = self.tabs_data.index(tab_data)
+            except ValueError:
+                return {}
+            return self._load_variables(tab_index)
+        return VariableSnapshot(tab_data, actor_name_context, global_loader=load_global_variables, ui=self)
 
     def _generate_and_save_npc_note_main(self, character_name, npc_response, workflow_data_dir):
         try:
@@ -4068,28 +4053,12 @@ Brief note from {character_name}'s perspective:"""
         except Exception as e:
             return None
 
-    def _substitute_placeholders_in_condition_value(self, value_string, tab_data, rule_character_context_name=None):
+    def _substitute_placeholders_in_condition_value(self, value_string, tab_data, rule_character_context_name=None, snapshot=None):
         if not value_string or not isinstance(value_string, str):
             return value_string
-        substituted_string = value_string
-        workflow_data_dir = tab_data.get('workflow_data_dir')
-        player_name = ""
-        setting_name = ""
-        if workflow_data_dir:
-            player_name = _get_player_character_name(workflow_data_dir) or ""
-            setting_name = _get_player_current_setting_name(workflow_data_dir) or ""
-        character_name_to_use = rule_character_context_name or ""
-        def replace_placeholder(match):
-            placeholder = match.group(1).lower()
-            if placeholder == 'player':
-                return player_name
-            elif placeholder == 'character':
-                return character_name_to_use
-            elif placeholder == 'setting':
-                return setting_name
-            return match.group(0)
-        substituted_string = re.sub(r'\((player|character|setting)\)', replace_placeholder, substituted_string, flags=re.IGNORECASE)
-        return substituted_string
+        if snapshot is None:
+            snapshot = VariableSnapshot(tab_data, rule_character_context_name, ui=self)
+        return substitute_placeholders(value_string, snapshot)
 
     def _update_remaining_character_contexts(self):
         try:
@@ -1,5 +1,6 @@
 import os
 import json
+import threading
 
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.json")
 
@@ -15,53 +16,203 @@ DEFAULT_CONFIG = {
     "default_cot_model": "google/gemini-2.5-flash-lite-preview-06-17",
     "default_utility_model": "google/gemini-2.5-flash-lite-preview-06-17",
     "default_temperature": 0.3,
-    "default_max_tokens": 2048
+    "default_max_tokens": 2048,
+    "http_pool_size": 8,
+    "npc_max_concurrency": 1,
+    "rule_batch_size": 8,
+    "rule_pipeline_workers": 4,
+    "response_cache_enabled": True,
+    "context_token_budget": 0,
+    "context_token_budgets": {},
+    "context_summary_enabled": True
 }
 
-def load_config():
-    if not os.path.exists(CONFIG_FILE):
+KNOWN_CONTEXT_WINDOWS = {
+    "google/gemini-2.5": 1048576,
+    "google/gemini-2.0": 1048576,
+    "google/gemini-1.5": 1048576,
+    "gemini-2.5": 1048576,
+    "gemini-2.0": 1048576,
+    "gemini-1.5": 1048576,
+    "openai/gpt-4o": 128000,
+    "openai/gpt-4.1": 1047576,
+    "anthropic/claude": 200000,
+    "meta-llama/llama-3.1": 131072,
+    "meta-llama/llama-3.3": 131072,
+    "mistralai/mistral-nemo": 128000,
+    "cognitivecomputations/dolphin-mistral-24b-venice-edition": 32768
+}
+CONTEXT_WINDOW_SAFETY_RATIO = 0.9
+
+_config_cache = None
+_config_cache_mtime = None
+_config_lock = threading.Lock()
+
+def _get_config_mtime():
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+def _read_config_file():
+    with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    for key, default_value in DEFAULT_CONFIG.items():
+        if key not in config:
+            config[key] = default_value
+    return config
+
+def _get_cached_config():
+    global _config_cache, _config_cache_mtime
+    mtime = _get_config_mtime()
+    with _config_lock:
+        if _config_cache is not None and mtime == _config_cache_mtime:
+            return _config_cache
+    if mtime is None:
         save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG.copy()
+        return _config_cache if _config_cache is not None else DEFAULT_CONFIG
     try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        for key, default_value in DEFAULT_CONFIG.items():
-            if key not in config:
-                config[key] = default_value
-        return config
+        config = _read_config_file()
     except Exception as e:
-        return DEFAULT_CONFIG.copy()
+        config = DEFAULT_CONFIG.copy()
+    with _config_lock:
+        _config_cache = config
+        _config_cache_mtime = mtime
+    return config
+
+def invalidate_config_cache():
+    global _config_cache, _config_cache_mtime
+    with _config_lock:
+        _config_cache = None
+        _config_cache_mtime = None
+
+def load_config():
+    return dict(_get_cached_config())
 
 def save_config(config):
+    global _config_cache, _config_cache_mtime
     try:
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
             json.dump(config, f, indent=2, ensure_ascii=False)
     except Exception as e:
         print(f"Error saving configuration: {e}")
+        invalidate_config_cache()
+        return
+    snapshot = dict(DEFAULT_CONFIG)
+    snapshot.update(config)
+    with _config_lock:
+        _config_cache = snapshot
+        _config_cache_mtime = _get_config_mtime()
+
+class ConfigView:
+    def __init__(self, data):
+        self._data = data
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    @property
+    def current_service(self):
+        return self._data.get("current_service", "openrouter")
+
+    def api_key(self, service=None):
+        if service is None:
+            service = self.current_service
+        if service == "local":
+            return "local"  # Local APIs don't need real API keys
+        api_key = (self._data.get(f"{service}_api_key", "") or "").strip()
+        return api_key or None
+
+    def base_url(self, service=None):
+        if service is None:
+            service = self.current_service
+        return self._data.get(f"{service}_base_url", "")
+
+    @property
+    def default_model(self):
+        return self._data.get("default_model", "google/gemini-2.5-flash-lite-preview-06-17")
+
+    @property
+    def default_cot_model(self):
+        return self._data.get("default_cot_model", "google/gemini-2.5-flash-lite-preview-06-17")
+
+    @property
+    def default_utility_model(self):
+        return self._data.get("default_utility_model", "google/gemini-2.5-flash-lite-preview-06-17")
+
+    @property
+    def default_temperature(self):
+        return self._data.get("default_temperature", 0.3)
+
+    @property
+    def default_max_tokens(self):
+        return self._data.get("default_max_tokens", 2048)
+
+    @property
+    def http_pool_size(self):
+        try:
+            return max(1, int(self._data.get("http_pool_size", 8)))
+        except (TypeError, ValueError):
+            return 8
+
+    @property
+    def npc_max_concurrency(self):
+        try:
+            return max(1, int(self._data.get("npc_max_concurrency", 1)))
+        except (TypeError, ValueError):
+            return 1
+
+    @property
+    def rule_batch_size(self):
+        try:
+            return max(1, int(self._data.get("rule_batch_size", 8)))
+        except (TypeError, ValueError):
+            return 8
+
+    @property
+    def rule_pipeline_workers(self):
+        try:
+            return max(0, int(self._data.get("rule_pipeline_workers", 4)))
+        except (TypeError, ValueError):
+            return 4
+
+    @property
+    def response_cache_enabled(self):
+        return bool(self._data.get("response_cache_enabled", True))
+
+    def context_token_budget(self, model=None):
+        budgets = self._data.get("context_token_budgets") or {}
+        budget = self._data.get("context_token_budget", 0)
+        if model and isinstance(budgets, dict):
+            matches = [key for key in budgets if model.startswith(key)]
+            if matches:
+                budget = budgets[max(matches, key=len)]
+        try:
+            budget = max(0, int(budget))
+        except (TypeError, ValueError):
+            budget = 0
+        if budget or not model:
+            return budget
+        matches = [key for key in KNOWN_CONTEXT_WINDOWS if model.startswith(key)]
+        if not matches:
+            return 0
+        return int(KNOWN_CONTEXT_WINDOWS[max(matches, key=len)] * CONTEXT_WINDOW_SAFETY_RATIO)
+
+    @property
+    def context_summary_enabled(self):
+        return bool(self._data.get("context_summary_enabled", True))
+
+def get_config():
+    return ConfigView(_get_cached_config())
 
 def get_current_service():
-    config = load_config()
-    return config.get("current_service", "openrouter")
+    return get_config().current_service
 
 def get_api_key_for_service(service=None):
-    if service is None:
-        service = get_current_service()
-    config = load_config()
-    
-    if service == "local":
-        return "local"  # Local APIs don't need real API keys
-    
-    api_key = config.get(f"{service}_api_key", "").strip()
-    if not api_key:
-        return None
-    return api_key
+    return get_config().api_key(service)
 
 def get_base_url_for_service(service=None):
-    if service is None:
-        service = get_current_service()
-    config = load_config()
-    return config.get(f"{service}_base_url", "")
+    return get_config().base_url(service)
 
 def get_openrouter_api_key():
     return get_api_key_for_service("openrouter")
@@ -70,16 +221,28 @@ def get_openrouter_base_url():
     return get_base_url_for_service("openrouter")
 
 def get_default_model():
-    config = load_config()
-    return config.get("default_model", "google/gemini-2.5-flash-lite-preview-06-17")
+    return get_config().default_model
 
 def get_default_cot_model():
-    config = load_config()
-    return config.get("default_cot_model", "google/gemini-2.5-flash-lite-preview-06-17")
+    return get_config().default_cot_model
 
 def get_default_utility_model():
-    config = load_config()
-    return config.get("default_utility_model", "google/gemini-2.5-flash-lite-preview-06-17")
+    return get_config().default_utility_model
+
+def get_http_pool_size():
+    return get_config().http_pool_size
+
+def get_npc_max_concurrency():
+    return get_config().npc_max_concurrency
+
+def get_rule_batch_size():
+    return get_config().rule_batch_size
+
+def get_rule_pipeline_workers():
+    return get_config().rule_pipeline_workers
+
+def is_response_cache_enabled():
+    return get_config().response_cache_enabled
 
 def update_config(key, value):
     config = load_config()
@@ -94,4 +257,10 @@ def update_default_models(main_model=None, cot_model=None, utility_model=None):
         config["default_cot_model"] = cot_model
     if utility_model:
         config["default_utility_model"] = utility_model
-    save_config(config) 
\ No newline at end of file
+    save_config(config) 
+
+def get_context_token_budget(model=None):
+    return get_config().context_token_budget(model)
+
+def get_context_summary_enabled():
+    return get_config().context_summary_enabled
@@ -27,6 +27,7 @@ from rules.rules_manager_ui import create_pair_widget
 from editor_panel.notes_manager import NotesManagerWidget
 from rules.rules_toggle_manager import RulesToggleManager
 from rules.timer_rules_manager import _load_timer_rules
+from rules.condition_compiler import compile_rules_conditions
 from editor_panel.inventory_manager import InventoryManagerWidget
 from config import get_default_model, get_default_cot_model
 
@@ -269,6 +270,7 @@ DEFAULT_TAB_SETTINGS = {
     "temperature": 0.5,
     "streaming_enabled": False,
     "streaming_speed": 35, 
+    "live_token_streaming": False,
     "cot_model": get_default_cot_model(),
     "crt_enabled": True,
     "crt_speed": 160
@@ -1701,6 +1703,7 @@ def add_new_tab(self, name=None, log_file=None, notes_file=None, context_file=No
              print("Error: tab_data not properly initialized before rule loading.")
         else:
              tab_data['thought_rules'] = loaded_rules
+             compile_rules_conditions(loaded_rules)
              if hasattr(self, '_update_rules_display') and 'rules_list' in locals():
                  self._update_rules_display(loaded_rules, rules_list)
              try:
@@ -0,0 +1,66 @@
+import random
+import time
+from core.context_log import get_scene_index, shared_scene_messages
+
+CONTEXT_SIZES = (500, 1000, 2000, 3000)
+MESSAGES_PER_SCENE = 30
+ROUNDS = 5
+_ACTORS = ['Guard', 'Innkeeper', 'Merchant', 'Thief', 'Priest', 'Narrator']
+
+def build_context(rng, message_count, messages_per_scene=MESSAGES_PER_SCENE):
+    context = []
+    for position in range(message_count):
+        scene = position // messages_per_scene + 1
+        if rng.random() < 0.35:
+            context.append({'role': 'user', 'content': f"player line {position}", 'scene': scene})
+        else:
+            context.append({
+                'role': 'assistant',
+                'content': f"actor line {position}",
+                'scene': scene,
+                'metadata': {'character_name': rng.choice(_ACTORS)}
+            })
+    return context
+
+def quadratic_shared_scene_messages(current_context, actor_name, followed_name, before_scene):
+    messages_to_summarize = []
+    for msg in current_context:
+        scene_num = msg.get('scene', 1)
+        if msg.get('role') != 'system' and scene_num < before_scene:
+            involved_actors = {m.get('metadata', {}).get('character_name') for m in current_context if m.get('scene') == scene_num}
+            if msg.get('role') == 'user':
+                involved_actors.add('Player')
+            if actor_name in involved_actors and (followed_name in involved_actors or (followed_name.lower() == 'player' and 'Player' in involved_actors)):
+                messages_to_summarize.append(msg)
+    return messages_to_summarize
+
+def _time(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return (time.perf_counter() - start) / rounds, result
+
+def run_benchmark(sizes=CONTEXT_SIZES, rounds=ROUNDS, seed=11):
+    rng = random.Random(seed)
+    results = []
+    print(f"follower memory selection, {rounds} rounds per size")
+    for size in sizes:
+        context = build_context(rng, size)
+        current_scene = context[-1]['scene']
+        quadratic_time, expected = _time(lambda: quadratic_shared_scene_messages(context, 'Guard', 'Player', current_scene), 1)
+        get_scene_index(context)
+        indexed_time, actual = _time(lambda: shared_scene_messages(context, 'Guard', 'Player', current_scene), rounds)
+        if actual != expected:
+            raise AssertionError(f"Indexed and quadratic selections differ for {size} messages")
+        context.append({'role': 'user', 'content': "one more line", 'scene': current_scene})
+        appended_time, _ = _time(lambda: shared_scene_messages(context, 'Guard', 'Player', current_scene), 1)
+        results.append((size, quadratic_time, indexed_time))
+        print(f"  {size:>5} messages: quadratic {quadratic_time * 1000:9.1f} ms, indexed {indexed_time * 1000:6.2f} ms "
+              f"({indexed_time / size * 1e6:.2f} us/message), after append {appended_time * 1000:6.2f} ms")
+    first_size, _, first_time = results[0]
+    last_size, _, last_time = results[-1]
+    print(f"  indexed cost grew {last_time / first_time:.1f}x for {last_size / first_size:.1f}x more messages")
+    return results
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -3,6 +3,7 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QColor
 import os
 import json
+from core.entity_registry import note_entity_file_saved
 
 class CharacterGeneratorWidget(QWidget):
     character_complete = pyqtSignal(int)
@@ -171,6 +172,7 @@ class CharacterGeneratorWidget(QWidget):
             }
             with open(player_file_path, 'w', encoding='utf-8') as f:
                 json.dump(player_data, f, indent=2, ensure_ascii=False)
+            note_entity_file_saved(player_file_path, player_data)
             self._update_player_name_in_settings(workflow_data_dir, char_name)
             return True
         except Exception as e:
@@ -237,6 +239,7 @@ class CharacterGeneratorWidget(QWidget):
                                         if 'game' in file_path:
                                             with open(file_path, 'w', encoding='utf-8') as f:
                                                 json.dump(setting_data, f, indent=2, ensure_ascii=False)
+                                            note_entity_file_saved(file_path, setting_data)
                                             updated_count += 1
                                         else:
                                             relative_path = os.path.relpath(file_path, os.path.join(workflow_data_dir, 'resources', 'data files', 'settings'))
@@ -244,6 +247,7 @@ class CharacterGeneratorWidget(QWidget):
                                             os.makedirs(os.path.dirname(game_file_path), exist_ok=True)
                                             with open(game_file_path, 'w', encoding='utf-8') as f:
                                                 json.dump(setting_data, f, indent=2, ensure_ascii=False)
+                                            note_entity_file_saved(game_file_path, setting_data)
                                             updated_count += 1
                             except Exception as e:
                                 continue
@@ -4,10 +4,13 @@ import re
 import traceback
 from PyQt5.QtCore import QTimer
 from core.utils import _get_player_character_name, _load_json_safely, _find_actor_file_path, _prepare_condition_text, _get_player_current_setting_name
-from rules.rule_evaluator import _evaluate_conditions, _apply_rule_action, _apply_rule_actions_and_continue
+from rules.rule_evaluator import _evaluate_conditions, _apply_rule_action, _apply_rule_actions_and_continue, _begin_rule_chain
 from core.memory import get_npc_notes_from_character_file, format_npc_notes_for_context, add_npc_note_to_character_file
-from config import get_default_model, get_default_cot_model
+from config import get_default_model, get_default_cot_model, get_npc_max_concurrency
 from core.process_keywords import inject_keywords_into_context, get_location_info_for_keywords
+from core.npc_scheduler import NpcRoundScheduler
+from core.context_log import get_scene_messages, shared_scene_messages
+from core.context_budget import fit_context_to_budget
 
 def _get_player_name_for_context(workflow_data_dir):
     try:
@@ -106,6 +109,7 @@ def _start_npc_inference_threads(self):
             except Exception as e:
                 print(f"[WARN] Could not load variables to check chat mode: {e}")
         system2 = variables.get('system2', 'parallel').lower()
+        _cancel_npc_round_scheduler(self)
         self._npc_message_queue = []
         self._npc_inference_queue = []
         self._npc_inference_in_progress = False
@@ -468,14 +472,20 @@ def _start_npc_inference_threads(self):
             npc_context_for_llm.append({"role": "system", "content": system_msg_base_intro})
             npc_context_for_llm.append({"role": "user", "content": char_sheet_str})
             scenes_to_recall = 1
+            depends_on_previous = tab_data.get('npc_mode_sequential', False)
             npc_file_path = _find_actor_file_path(self, workflow_data_dir, char)
             if npc_file_path:
                 try:
                     with open(npc_file_path, 'r', encoding='utf-8') as f:
                         npc_data = json.load(f)
                     variables = npc_data.get('variables', {})
-                    if variables.get('following', '').strip().lower() == 'player':
+                    followed_name = str(variables.get('following', '')).strip()
+                    if followed_name.lower() == 'player':
                         scenes_to_recall = 2
+                    elif followed_name and followed_name in npcs_in_scene_filtered:
+                        depends_on_previous = True
+                    if str(variables.get('system2', '')).strip().lower() == 'sequential':
+                        depends_on_previous = True
                 except Exception as e:
                     print(f"Error reading NPC file for follower check: {e}")
             chars_in_scene = set()
@@ -539,11 +549,16 @@ def _start_npc_inference_threads(self):
                 print(f"[SKIP POST] Character '{char}' marked to skip posting - skipping inference")
                 characters_to_skip.discard(char)
                 continue
+            npc_context_for_llm = fit_context_to_budget(
+                npc_context_for_llm, history_to_add, model_to_use, self.max_tokens,
+                workflow_data_dir, current_scene, char
+            )
             npc_inference_data = {
                 'character': char,
                 'context': npc_context_for_llm,
                 'model': model_to_use,
-                'tag': tag_for_this_npc
+                'tag': tag_for_this_npc,
+                'depends_on_previous': depends_on_previous
             }
             if (
                 char not in tab_data.get('_characters_to_exit_rules', set())
@@ -649,23 +664,17 @@ def _start_next_npc_inference(self):
         if hasattr(self, 'timer_manager') and self.timer_manager:
             self.timer_manager.resume_timers()
         return
+    if _can_launch_parallel_npc_batch(self, tab_data):
+        _launch_parallel_npc_batch(self, tab_data)
+        return
     npc_data = self._npc_inference_queue.pop(0)
     character = npc_data['character']
     context = npc_data['context']
     model = npc_data['model']
     tag = npc_data['tag']
-    try:
-        tab_data = self.get_current_tab_data()
-        if tab_data:
-            if (
-                character in tab_data.get('_characters_to_exit_rules', set())
-                or character in tab_data.get('_characters_to_skip', set())
-                or tab_data.get('_exit_rule_processing')
-            ):
-                _start_next_npc_inference(self)
-                return
-    except Exception:
-        pass
+    if _should_skip_npc_inference(self, character):
+        _start_next_npc_inference(self)
+        return
     timer_final_instruction = tab_data.get('_timer_final_instruction') if tab_data else None
     if timer_final_instruction:
         context.append({"role": "user", "content": f"({timer_final_instruction})"})
@@ -683,97 +692,236 @@ def _start_next_npc_inference(self):
     self._current_npc_model = model
 
     
+    thread = _create_npc_inference_thread(self, character, context, model, stream=self._is_token_streaming_enabled(tab_data))
+    npc_result_handler = _create_npc_result_handler(self, character, tag)
+    thread.result_signal.connect(npc_result_handler)
+    thread.error_signal.connect(lambda err, c=character: print(f"[NPC INFERENCE ERROR] for character {c}: {err}"))
+    def on_npc_thread_finished():
+        _on_npc_inference_finished(self)
+        self._npc_inference_in_progress = False
+    thread.finished.connect(on_npc_thread_finished)
+    self.npc_inference_threads.append(thread)
+    QTimer.singleShot(0, lambda t=thread: t.start())
+
+def _should_skip_npc_inference(self, character):
+    try:
+        tab_data = self.get_current_tab_data()
+        if tab_data:
+            return (
+                character in tab_data.get('_characters_to_exit_rules', set())
+                or character in tab_data.get('_characters_to_skip', set())
+                or tab_data.get('_exit_rule_processing')
+            )
+    except Exception:
+        pass
+    return False
+
+def _create_npc_inference_thread(self, character, context, model, stream=False):
     from chatBotRPG import InferenceThread
     thread = InferenceThread(
         context,
         character,
         model,
         self.max_tokens,
-        self.get_current_temperature()
+        self.get_current_temperature(),
+        stream=stream
     )
+    if stream:
+        streamed_character_name = get_actual_character_name(self, character)
+        thread.partial_signal.connect(lambda text, c=streamed_character_name: self.display_partial_message(text, character_name=c))
+    return thread
 
-    def create_npc_result_handler(character_name, tag_to_use):
-        def handler(msg):
+def _cancel_npc_round_scheduler(self):
+    scheduler = getattr(self, '_npc_round_scheduler', None)
+    if scheduler is not None:
+        scheduler.cancel()
+    self._npc_round_scheduler = None
 
-            if isinstance(msg, str) and any(msg.strip().lower().startswith(failure_start) for failure_start in ['i\'m', 'sorry', 'ext']):
-                print(f"[FALLBACK] Detected failure response '{msg}' for {character_name}, retrying with fallback models...")
-                _retry_npc_inference_with_fallback(self, character_name, tag_to_use)
+def _can_launch_parallel_npc_batch(self, tab_data):
+    if not tab_data or tab_data.get('npc_mode_sequential', False):
+        return False
+    if get_npc_max_concurrency() <= 1:
+        return False
+    if getattr(self, '_npc_round_scheduler', None) is not None:
+        return False
+    if not self._npc_inference_queue or self._npc_inference_queue[0].get('depends_on_previous', False):
+        return False
+    return len(self._npc_inference_queue) > 1 and not self._npc_inference_queue[1].get('depends_on_previous', False)
+
+def _launch_parallel_npc_batch(self, tab_data):
+    batch = []
+    while self._npc_inference_queue and not self._npc_inference_queue[0].get('depends_on_previous', False):
+        batch.append(self._npc_inference_queue.pop(0))
+    timer_final_instruction = tab_data.get('_timer_final_instruction') if tab_data else None
+    stream_enabled = self._is_token_streaming_enabled(tab_data)
+    scheduler = None
+
+    def start_slot(index, npc_data):
+        character = npc_data.get('character')
+        context = npc_data.get('context')
+        if not character or not context or _should_skip_npc_inference(self, character):
+            return False
+        if timer_final_instruction:
+            context.append({"role": "user", "content": f"({timer_final_instruction})"})
+        from chatBotRPG import FALLBACK_MODEL_1, FALLBACK_MODEL_2, FALLBACK_MODEL_3
+        run_slot_model(index, npc_data, npc_data.get('model'), [FALLBACK_MODEL_1, FALLBACK_MODEL_2, FALLBACK_MODEL_3])
+        return True
+
+    def run_slot_model(index, npc_data, model, fallback_models):
+        character = npc_data['character']
+        thread = _create_npc_inference_thread(
+            self, character, npc_data['context'], model,
+            stream=stream_enabled and scheduler.is_next_to_release(index)
+        )
+        def on_result(msg, i=index):
+            if scheduler.cancelled:
                 return
-            
-            actual_character_name = get_actual_character_name(self, character_name)
-            if actual_character_name and isinstance(msg, str):
-                prefix = f"{actual_character_name}:"
-                if msg.strip().startswith(prefix):
-                    msg = msg.strip()[len(prefix):].lstrip()
-            if isinstance(msg, str):
-                msg = re.sub(r'<think>[\s\S]*?</think>', '', msg, flags=re.IGNORECASE).strip()
-            tab_data = self.get_current_tab_data()
-            has_llm_reply_rules = False
-            print(f"[NPC INFERENCE] Checking for LLM reply rules for character: '{actual_character_name}'")
-            if tab_data and 'thought_rules' in tab_data:
-                for rule in tab_data.get('thought_rules', []):
-                    rule_applies_to = rule.get('applies_to')
-                    rule_scope = rule.get('scope')
-                    rule_character_name = rule.get('character_name', '')
-                    print(f"[NPC INFERENCE] Rule check: applies_to='{rule_applies_to}', scope='{rule_scope}', character_name='{rule_character_name}'")
-                    if (rule_applies_to == 'Character' and 
-                        rule_scope in ['llm_reply', 'convo_llm_reply'] and
-                        (rule_character_name is None or 
-                         rule_character_name == '' or 
-                         rule_character_name == 'unknown' or 
-                         rule_character_name == 'None' or
-                         (rule_character_name and actual_character_name and rule_character_name.lower() == actual_character_name.lower()))):
-                        has_llm_reply_rules = True
-                        print(f"[NPC INFERENCE] Found matching rule for character '{actual_character_name}'")
-                        break
-            try:
-                is_duplicate = False
-                if tab_data and isinstance(msg, str):
-                    ctx = tab_data.get('context', []) or []
-                    candidate = msg.strip()
-                    for m in ctx:
-                        try:
-                            if m.get('role') == 'assistant':
-                                prev = str(m.get('content', '')).strip()
-                                if prev == candidate:
-                                    is_duplicate = True
-                                    break
-                        except Exception:
-                            continue
-                if is_duplicate:
-                    if not hasattr(self, '_npc_dedupe_retry_done'):
-                        self._npc_dedupe_retry_done = set()
-                    if actual_character_name not in self._npc_dedupe_retry_done:
-                        self._npc_dedupe_retry_done.add(actual_character_name)
-                        print(f"[DEDUPE] NPC post for '{actual_character_name}' duplicates a previous post. Retrying with fallback models...")
-                        _retry_npc_inference_with_fallback(self, actual_character_name, tag_to_use)
-                        return
-                    else:
-                        print(f"[DEDUPE] Duplicate detected for '{actual_character_name}', but fallback already attempted. Proceeding.")
-            except Exception:
-                pass
+            retry_reason = _npc_fallback_reason(self, character, msg)
+            if retry_reason and fallback_models:
+                print(f"[FALLBACK] {retry_reason} for {character}, retrying with fallback model {fallback_models[0]}...")
+                run_slot_model(i, npc_data, fallback_models[0], fallback_models[1:])
+                return
+            if retry_reason == 'failure response':
+                print(f"[FALLBACK] All fallback models failed for {character}")
+                npc_data['fallback_failed'] = True
+                msg = f"{get_actual_character_name(self, character)} seems to be having trouble responding right now."
+            npc_data['model'] = model
+            scheduler.complete(i, msg)
+        thread.result_signal.connect(on_result)
+        def on_error(err, i=index, c=character):
+            print(f"[NPC INFERENCE ERROR] for character {c}: {err}")
+            scheduler.complete(i, None)
+        thread.error_signal.connect(on_error)
+        thread.finished.connect(lambda t=thread: _on_npc_inference_finished(self, t))
+        self.npc_inference_threads.append(thread)
+        QTimer.singleShot(0, lambda t=thread: t.start())
 
-            if has_llm_reply_rules:
-                print(f"[NPC INFERENCE] Processing LLM reply rules for character '{actual_character_name}'")
-                _process_character_llm_reply_rules(self, actual_character_name, msg, tag_to_use)
-            else:
-                character_text_tag = None
-                if hasattr(self, '_character_tags') and actual_character_name in self._character_tags:
-                    character_text_tag = self._character_tags[actual_character_name]
-                    print(f"[CHARACTER INFERENCE] Found character text tag for {actual_character_name}: '{character_text_tag}'")
-                _generate_and_save_npc_note(self, actual_character_name, msg)
-                character_post_effects = _get_character_post_effects(self, actual_character_name)
-                _queue_npc_message(self, msg, actual_character_name, character_text_tag or tag_to_use, character_post_effects)
-        return handler
-    npc_result_handler = create_npc_result_handler(character, tag)
-    thread.result_signal.connect(npc_result_handler)
-    thread.error_signal.connect(lambda err, c=character: print(f"[NPC INFERENCE ERROR] for character {c}: {err}"))
-    def on_npc_thread_finished():
-        _on_npc_inference_finished(self)
+    def release_slot(npc_data, msg):
+        if self._npc_round_scheduler is not scheduler:
+            return
+        if msg is None:
+            return
+        if npc_data.get('fallback_failed'):
+            actual_character_name = get_actual_character_name(self, npc_data['character'])
+            _queue_npc_message(self, msg, actual_character_name, npc_data.get('tag'), {})
+            return
+        self._current_npc_context = list(npc_data.get('context') or [])
+        self._current_npc_model = npc_data.get('model')
+        _create_npc_result_handler(self, npc_data['character'], npc_data.get('tag'), allow_fallback=False)(msg)
+
+    def on_drained():
+        if self._npc_round_scheduler is not scheduler:
+            return
+        self._npc_round_scheduler = None
         self._npc_inference_in_progress = False
-    thread.finished.connect(on_npc_thread_finished)
-    self.npc_inference_threads.append(thread)
-    QTimer.singleShot(0, lambda t=thread: t.start())
+        QTimer.singleShot(10, lambda: _check_process_npc_queue(self))
+
+    scheduler = NpcRoundScheduler(get_npc_max_concurrency(), start_slot, release_slot, on_drained)
+    for npc_data in batch:
+        scheduler.add(npc_data)
+    print(f"[NPC SCHEDULER] Launching {len(batch)} independent NPC inferences (max {scheduler.max_concurrency} concurrent)")
+    self._npc_round_scheduler = scheduler
+    self._npc_inference_in_progress = True
+    scheduler.launch_ready()
+
+def _is_npc_failure_response(msg):
+    return isinstance(msg, str) and any(msg.strip().lower().startswith(failure_start) for failure_start in ['i\'m', 'sorry', 'ext'])
+
+def _npc_fallback_reason(self, character_name, msg):
+    if _is_npc_failure_response(msg):
+        return 'failure response'
+    if not isinstance(msg, str):
+        return None
+    tab_data = self.get_current_tab_data()
+    actual_character_name = get_actual_character_name(self, character_name)
+    candidate = re.sub(r'<think>[\s\S]*?</think>', '', msg, flags=re.IGNORECASE).strip()
+    prefix = f"{actual_character_name}:"
+    if candidate.startswith(prefix):
+        candidate = candidate[len(prefix):].strip()
+    ctx = (tab_data.get('context', []) or []) if tab_data else []
+    if not any(m.get('role') == 'assistant' and str(m.get('content', '')).strip() == candidate for m in ctx if isinstance(m, dict)):
+        return None
+    if not hasattr(self, '_npc_dedupe_retry_done'):
+        self._npc_dedupe_retry_done = set()
+    if actual_character_name in self._npc_dedupe_retry_done:
+        print(f"[DEDUPE] Duplicate detected for '{actual_character_name}', but fallback already attempted. Proceeding.")
+        return None
+    self._npc_dedupe_retry_done.add(actual_character_name)
+    return 'duplicate post'
+
+def _create_npc_result_handler(self, character_name, tag_to_use, allow_fallback=True):
+    def handler(msg):
+
+        if allow_fallback and _is_npc_failure_response(msg):
+            print(f"[FALLBACK] Detected failure response '{msg}' for {character_name}, retrying with fallback models...")
+            _retry_npc_inference_with_fallback(self, character_name, tag_to_use)
+            return
+
+        actual_character_name = get_actual_character_name(self, character_name)
+        if actual_character_name and isinstance(msg, str):
+            prefix = f"{actual_character_name}:"
+            if msg.strip().startswith(prefix):
+                msg = msg.strip()[len(prefix):].lstrip()
+        if isinstance(msg, str):
+            msg = re.sub(r'<think>[\s\S]*?</think>', '', msg, flags=re.IGNORECASE).strip()
+        tab_data = self.get_current_tab_data()
+        has_llm_reply_rules = False
+        print(f"[NPC INFERENCE] Checking for LLM reply rules for character: '{actual_character_name}'")
+        if tab_data and 'thought_rules' in tab_data:
+            for rule in tab_data.get('thought_rules', []):
+                rule_applies_to = rule.get('applies_to')
+                rule_scope = rule.get('scope')
+                rule_character_name = rule.get('character_name', '')
+                print(f"[NPC INFERENCE] Rule check: applies_to='{rule_applies_to}', scope='{rule_scope}', character_name='{rule_character_name}'")
+                if (rule_applies_to == 'Character' and 
+                    rule_scope in ['llm_reply', 'convo_llm_reply'] and
+                    (rule_character_name is None or 
+                     rule_character_name == '' or 
+                     rule_character_name == 'unknown' or 
+                     rule_character_name == 'None' or
+                     (rule_character_name and actual_character_name and rule_character_name.lower() == actual_character_name.lower()))):
+                    has_llm_reply_rules = True
+                    print(f"[NPC INFERENCE] Found matching rule for character '{actual_character_name}'")
+                    break
+        try:
+            is_duplicate = False
+            if tab_data and isinstance(msg, str):
+                ctx = tab_data.get('context', []) or []
+                candidate = msg.strip()
+                for m in ctx:
+                    try:
+                        if m.get('role') == 'assistant':
+                            prev = str(m.get('content', '')).strip()
+                            if prev == candidate:
+                                is_duplicate = True
+                                break
+                    except Exception:
+                        continue
+            if is_duplicate and allow_fallback:
+                if not hasattr(self, '_npc_dedupe_retry_done'):
+                    self._npc_dedupe_retry_done = set()
+                if actual_character_name not in self._npc_dedupe_retry_done:
+                    self._npc_dedupe_retry_done.add(actual_character_name)
+                    print(f"[DEDUPE] NPC post for '{actual_character_name}' duplicates a previous post. Retrying with fallback models...")
+                    _retry_npc_inference_with_fallback(self, actual_character_name, tag_to_use)
+                    return
+                else:
+                    print(f"[DEDUPE] Duplicate detected for '{actual_character_name}', but fallback already attempted. Proceeding.")
+        except Exception:
+            pass
+
+        if has_llm_reply_rules:
+            print(f"[NPC INFERENCE] Processing LLM reply rules for character '{actual_character_name}'")
+            _process_character_llm_reply_rules(self, actual_character_name, msg, tag_to_use)
+        else:
+            character_text_tag = None
+            if hasattr(self, '_character_tags') and actual_character_name in self._character_tags:
+                character_text_tag = self._character_tags[actual_character_name]
+                print(f"[CHARACTER INFERENCE] Found character text tag for {actual_character_name}: '{character_text_tag}'")
+            _generate_and_save_npc_note(self, actual_character_name, msg)
+            character_post_effects = _get_character_post_effects(self, actual_character_name)
+            _queue_npc_message(self, msg, actual_character_name, character_text_tag or tag_to_use, character_post_effects)
+    return handler
 
 def _retry_npc_inference_with_fallback(self, character_name, tag_to_use):
     """Retry NPC inference with fallback models when primary model fails"""
@@ -799,8 +947,10 @@ def _retry_npc_inference_with_fallback(self, character_name, tag_to_use):
                     character_name,
                     fallback_model,
                     self.max_tokens,
-                    self.get_current_temperature()
+                    self.get_current_temperature(),
+                    stream=self._is_token_streaming_enabled(tab_data)
                 )
+                fallback_thread.partial_signal.connect(lambda text, c=character_name: self.display_partial_message(text, character_name=c))
                 
                 def create_fallback_result_handler(fallback_char_name, fallback_tag, fallback_model_name):
                     def fallback_handler(msg):
@@ -972,6 +1122,8 @@ def _check_process_npc_queue(self):
         if not self._processing_npc_queue:
             _display_next_npc_message(self)
         return
+    if getattr(self, '_npc_round_scheduler', None) is not None:
+        return
     if self._npc_inference_queue:
         if not self._processing_npc_queue:
             _start_next_npc_inference(self)
@@ -1018,6 +1170,7 @@ def _check_process_npc_queue(self):
         QTimer.singleShot(0, fn_last_final_executor)
         return
     def after_end_of_round():
+        self.clear_partial_message()
         if hasattr(self, '_last_user_msg_for_post_rules') and self._last_user_msg_for_post_rules:
             self._last_user_msg_for_post_rules = None
         self._re_enable_input_after_pipeline()
@@ -1146,17 +1299,7 @@ def _get_follower_memories_for_context(self, workflow_data_dir, actor_name, char
             return None
         current_scene = tab_data.get('scene_number', 1)
         prior_scene = current_scene - 1
-        messages_to_summarize = []
-        for msg in current_context:
-            scene_num = msg.get('scene', 1)
-            if msg.get('role') != 'system' and scene_num < prior_scene:
-                meta = msg.get('metadata', {})
-                char_name = meta.get('character_name', None)
-                involved_actors = {m.get('metadata', {}).get('character_name') for m in current_context if m.get('scene') == scene_num}
-                if msg.get('role') == 'user': 
-                    involved_actors.add('Player')
-                if actor_name in involved_actors and (followed_name in involved_actors or (followed_name.lower() == 'player' and 'Player' in involved_actors)):
-                    messages_to_summarize.append(msg)
+        messages_to_summarize = shared_scene_messages(current_context, actor_name, followed_name, prior_scene)
         unique_summarize_msgs = {(msg.get('scene'), msg.get('content')): msg for msg in messages_to_summarize}
         messages_to_summarize = list(unique_summarize_msgs.values())
         if messages_to_summarize:
@@ -1180,8 +1323,8 @@ def _get_follower_memories_for_context(self, workflow_data_dir, actor_name, char
                 traceback.print_exc()
         if prior_scene >= 1:
             scene_msgs = []
-            for m in current_context:
-                if m.get('scene', 1) == prior_scene and m.get('role') != 'system':
+            for m in get_scene_messages(current_context, prior_scene):
+                if m.get('role') != 'system':
                     meta = m.get('metadata', {})
                     char_name = meta.get('character_name', None)
                     role = m.get('role', '')
@@ -1241,8 +1384,9 @@ def _should_suppress_narrator(self, tab_data=None):
         return True
     return False
 
-def _on_npc_inference_finished(self):
-    finished_thread = self.sender()
+def _on_npc_inference_finished(self, finished_thread=None):
+    if finished_thread is None:
+        finished_thread = self.sender()
     if not finished_thread:
         return
     if finished_thread in self.npc_inference_threads:
@@ -1386,6 +1530,7 @@ def _process_character_llm_reply_rules(self, character_name, character_message,
         self._character_llm_reply_current_character = character_name
         self._character_llm_reply_rules_queue = character_llm_reply_rules
         self._character_llm_reply_rule_index = 0
+        _begin_rule_chain(self)
         if not hasattr(self, '_character_text_tags'):
             self._character_text_tags = {}
         existing_character_tag = self._character_tags.get(character_name, "")
@@ -0,0 +1,336 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import get_context_token_budget, get_context_summary_enabled, get_default_utility_model
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_MAX_TOKENS = 600
+SUMMARY_HEADROOM_RATIO = 0.25
+SUMMARY_TRIGGER_RATIO = 0.8
+MIN_KEPT_HISTORY_MESSAGES = 2
+MAX_SUMMARIES_PER_SCENE = 16
+SCENES_TO_KEEP = 3
+SUMMARY_PREFIX = "(Summary of earlier events in this scene: "
+OMISSION_NOTE = "(Earlier messages from this scene were omitted to fit the context window.)"
+
+_tokenizers = {}
+_tiktoken_encoding = None
+_tokenizer_lock = threading.Lock()
+
+_summary_caches = {}
+_summary_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+def heuristic_token_count(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def register_tokenizer(model_prefix, count_tokens):
+    with _tokenizer_lock:
+        if count_tokens is None:
+            _tokenizers.pop(model_prefix, None)
+        else:
+            _tokenizers[model_prefix] = count_tokens
+
+def _tiktoken_count(text):
+    global _tiktoken_encoding
+    if _tiktoken_encoding is None:
+        _tiktoken_encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_tiktoken_encoding.encode(text, disallowed_special=()))
+
+def _tokenizer_for(model):
+    model = model or ''
+    with _tokenizer_lock:
+        matches = [prefix for prefix in _tokenizers if model.startswith(prefix)]
+        if matches:
+            return _tokenizers[max(matches, key=len)]
+    return _tiktoken_count if TIKTOKEN_AVAILABLE else heuristic_token_count
+
+def _content_text(content):
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part.get('text', '') for part in content if isinstance(part, dict))
+    return '' if content is None else str(content)
+
+def estimate_tokens(text, model=None):
+    if not text:
+        return 0
+    count_tokens = _tokenizer_for(model)
+    try:
+        return count_tokens(text)
+    except Exception as e:
+        print(f"[CONTEXT BUDGET] Tokenizer failed for model '{model}', using heuristic: {e}")
+        return heuristic_token_count(text)
+
+def estimate_message_tokens(message, model=None):
+    return MESSAGE_OVERHEAD_TOKENS + estimate_tokens(_content_text(message.get('content')), model)
+
+def estimate_context_tokens(messages, model=None):
+    return sum(estimate_message_tokens(message, model) for message in messages)
+
+def prompt_token_budget(model, max_tokens):
+    try:
+        reply_tokens = max(0, int(max_tokens or 0))
+    except (TypeError, ValueError):
+        reply_tokens = 0
+    return max(0, get_context_token_budget(model) - reply_tokens)
+
+def _history_digest(history, count):
+    digest = hashlib.sha1()
+    for message in history[:count]:
+        digest.update(message.get('role', '').encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(_content_text(message.get('content')).encode('utf-8', 'replace'))
+        digest.update(b'\1')
+    return digest.hexdigest()
+
+class SceneSummaryCache:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.last_scene = None
+        self._scenes = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._scenes is not None:
+            return
+        self._scenes = {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            scenes = data.get('scenes', {}) if isinstance(data, dict) else {}
+            for scene, entries in scenes.items():
+                if isinstance(entries, list):
+                    self._scenes[str(scene)] = [entry for entry in entries if isinstance(entry, dict)]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"[CONTEXT BUDGET] Could not read scene summaries from {self.file_path}: {e}")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            with open(self.file_path, 'w', encoding='utf-8') as f:
+                json.dump({'scenes': self._scenes}, f, indent=2, ensure_ascii=False)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[CONTEXT BUDGET] Could not save scene summaries to {self.file_path}: {e}")
+
+    def summaries(self, scene):
+        with self._lock:
+            self._load()
+            return list(self._scenes.get(str(scene), []))
+
+    def best_summary(self, scene, history, min_covered=0, max_covered=None):
+        best = None
+        for entry in self.summaries(scene):
+            covered = entry.get('covered', 0)
+            if covered < min_covered or (max_covered is not None and covered > max_covered) or covered > len(history):
+                continue
+            if best is not None and covered <= best.get('covered', 0):
+                continue
+            if entry.get('digest') == _history_digest(history, covered):
+                best = entry
+        return best
+
+    def store(self, scene, covered, digest, summary):
+        with self._lock:
+            self._load()
+            entries = [entry for entry in self._scenes.get(str(scene), []) if entry.get('digest') != digest]
+            entries.append({'covered': covered, 'digest': digest, 'summary': summary})
+            self._scenes[str(scene)] = entries[-MAX_SUMMARIES_PER_SCENE:]
+            numeric_scenes = sorted(int(key) for key in self._scenes if key.lstrip('-').isdigit())
+            for old_scene in numeric_scenes[:-SCENES_TO_KEEP]:
+                self._scenes.pop(str(old_scene), None)
+            self._save()
+
+    def claim(self, key):
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._pending.discard(key)
+
+def get_scene_summary_cache(workflow_data_dir):
+    if not workflow_data_dir:
+        return None
+    file_path = os.path.normpath(os.path.join(workflow_data_dir, 'game', 'scene_summaries.json'))
+    with _summary_lock:
+        cache = _summary_caches.get(file_path)
+        if cache is None:
+            cache = SceneSummaryCache(file_path)
+            _summary_caches[file_path] = cache
+        return cache
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scene-summary")
+        return _executor
+
+def _summarize_history(previous_summary, messages, character_name):
+    from core.make_inference import make_inference
+    lines = []
+    for message in messages:
+        text = _content_text(message.get('content')).strip()
+        if text:
+            lines.append(f"{message.get('role', 'user')}: {text}")
+    instruction = (
+        "You are a highly skilled text summarizer. Create a concise yet detailed summary of the roleplay below. "
+        "Preserve all key events, character actions, important dialogue, and significant emotional shifts. "
+        "Do not add new information or continue the conversation. Output only the summary."
+    )
+    if previous_summary:
+        instruction += f"\n\nThe events before this part were already summarized as: {previous_summary}\nMerge that summary with the new events into one summary."
+    summary = make_inference(
+        context=[{"role": "user", "content": f"{instruction}\n\nTEXT TO SUMMARIZE:\n" + "\n".join(lines)}],
+        user_message="",
+        character_name=character_name,
+        url_type=get_default_utility_model(),
+        max_tokens=SUMMARY_MAX_TOKENS,
+        temperature=0.3,
+        is_utility_call=True,
+        allow_summarization_retry=False
+    )
+    if not summary or "Sorry, API error" in summary:
+        return None
+    return summary.strip()
+
+def schedule_scene_summary(workflow_data_dir, scene, history, covered, character_name=None):
+    cache = get_scene_summary_cache(workflow_data_dir)
+    if cache is None or covered <= 0 or not get_context_summary_enabled():
+        return None
+    covered = min(covered, len(history))
+    history = [dict(message) for message in history[:covered]]
+    digest = _history_digest(history, covered)
+    key = (str(scene), digest)
+    if not cache.claim(key):
+        return None
+
+    def run():
+        try:
+            base = cache.best_summary(scene, history, max_covered=covered - 1)
+            start = base.get('covered', 0) if base else 0
+            summary = _summarize_history(base.get('summary') if base else None, history[start:covered], character_name)
+            if summary:
+                cache.store(scene, covered, digest, summary)
+            else:
+                print(f"[CONTEXT BUDGET] Background summary for scene {scene} failed.")
+        except Exception as e:
+            print(f"[CONTEXT BUDGET] Error summarizing scene {scene}: {e}")
+        finally:
+            cache.release(key)
+    return _get_executor().submit(run)
+
+def _history_positions(messages, history):
+    history_ids = {id(message) for message in history}
+    return [index for index, message in enumerate(messages) if id(message) in history_ids]
+
+def _drop_count(history_tokens, fixed, replacement_tokens, budget, start, max_droppable):
+    dropped = start
+    kept_tokens = sum(history_tokens[dropped:])
+    while dropped < max_droppable and fixed + replacement_tokens + kept_tokens > budget:
+        kept_tokens -= history_tokens[dropped]
+        dropped += 1
+    return dropped
+
+def _summary_target(history_tokens, fixed, budget, max_droppable):
+    headroom = int(budget * SUMMARY_HEADROOM_RATIO)
+    summary_tokens = MESSAGE_OVERHEAD_TOKENS + SUMMARY_MAX_TOKENS
+    return max(1, _drop_count(history_tokens, fixed, summary_tokens, budget - headroom, 0, max_droppable))
+
+def _scene_history(messages, scene):
+    from core.context_log import get_scene_messages
+    history = []
+    for message in get_scene_messages(messages, scene):
+        content = message.get('content')
+        if message.get('role') == 'system' or not content or "Sorry, API error" in content:
+            continue
+        character_name = (message.get('metadata') or {}).get('character_name')
+        if message.get('role') == 'assistant' and character_name and not content.strip().startswith(f"{character_name}:"):
+            content = f"{character_name}: {content}"
+        history.append({"role": message['role'], "content": content})
+    return history
+
+def note_current_scene(workflow_data_dir, scene, messages, model):
+    cache = get_scene_summary_cache(workflow_data_dir)
+    if cache is None:
+        return
+    closed_scene, cache.last_scene = cache.last_scene, scene
+    if closed_scene is None or closed_scene == scene or not messages or not get_context_token_budget(model):
+        return
+    history = _scene_history(messages, closed_scene)
+    if history and not cache.best_summary(closed_scene, history, min_covered=len(history)):
+        schedule_scene_summary(workflow_data_dir, closed_scene, history, len(history))
+
+def fit_context_to_budget(messages, history, model, max_tokens, workflow_data_dir=None, scene=1, character_name=None):
+    budget = prompt_token_budget(model, max_tokens)
+    if not budget or not history:
+        return messages
+    total = estimate_context_tokens(messages, model)
+    if total <= budget * SUMMARY_TRIGGER_RATIO:
+        return messages
+    positions = _history_positions(messages, history)
+    history = [messages[index] for index in positions]
+    max_droppable = max(0, len(history) - MIN_KEPT_HISTORY_MESSAGES)
+    cache = get_scene_summary_cache(workflow_data_dir)
+    if total <= budget:
+        if max_droppable and cache and not cache.best_summary(scene, history, max_covered=max_droppable):
+            history_tokens = [estimate_message_tokens(message, model) for message in history]
+            target = _summary_target(history_tokens, total - sum(history_tokens), budget, max_droppable)
+            schedule_scene_summary(workflow_data_dir, scene, history, target, character_name)
+        return messages
+    if not max_droppable:
+        print(f"[CONTEXT BUDGET] Prompt for {character_name or 'model'} is ~{total} tokens (budget {budget}) and has no history to trim.")
+        return messages
+    history_tokens = [estimate_message_tokens(message, model) for message in history]
+    fixed = total - sum(history_tokens)
+
+    def replacement_tokens(text):
+        return estimate_message_tokens({"content": text}, model)
+
+    needed = _drop_count(history_tokens, fixed, replacement_tokens(OMISSION_NOTE), budget, 0, max_droppable)
+    entry = cache.best_summary(scene, history, min_covered=needed, max_covered=max_droppable) if cache else None
+    if entry is None and cache:
+        entry = cache.best_summary(scene, history, max_covered=needed)
+    if entry:
+        covered = entry.get('covered', 0)
+        replacement = f"{SUMMARY_PREFIX}{entry['summary']})"
+        dropped = _drop_count(history_tokens, fixed, replacement_tokens(replacement), budget, max(covered, needed), max_droppable)
+        if dropped > covered:
+            replacement = f"{SUMMARY_PREFIX}{entry['summary']} ... some later messages were omitted.)"
+            dropped = _drop_count(history_tokens, fixed, replacement_tokens(replacement), budget, dropped, max_droppable)
+    else:
+        replacement = OMISSION_NOTE
+        dropped = needed
+    if not entry or entry.get('covered', 0) < needed:
+        target = max(needed, _summary_target(history_tokens, fixed, budget, max_droppable))
+        schedule_scene_summary(workflow_data_dir, scene, history, target, character_name)
+    drop_positions = set(positions[:dropped])
+    fitted = []
+    for index, message in enumerate(messages):
+        if index in drop_positions:
+            if index == positions[0]:
+                fitted.append({"role": "user", "content": replacement})
+            continue
+        fitted.append(message)
+    new_total = estimate_context_tokens(fitted, model)
+    print(f"[CONTEXT BUDGET] {character_name or 'Prompt'}: ~{total} -> ~{new_total} tokens (budget {budget}), "
+          f"replaced {dropped} history message(s) with {'a summary' if entry else 'an omission note'}.")
+    return fitted
@@ -0,0 +1,340 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+
+LOG_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".index.json"
+COMPACT_AFTER_RECORDS = 200
+INDEX_FORMAT = 3
+
+SCENE_INDEX_CACHE_SIZE = 8
+
+_logs = {}
+_scene_indexes = OrderedDict()
+_generations = {}
+_lock = threading.Lock()
+
+def _serialize(message):
+    return json.dumps(message, ensure_ascii=False, sort_keys=True)
+
+def _fingerprint(message):
+    return hash(repr(message))
+
+def _is_narrator_post(message):
+    if message.get('role') != 'assistant':
+        return False
+    character_name = message.get('metadata', {}).get('character_name')
+    return character_name == "Narrator" or not character_name
+
+class ContextIndex:
+    def __init__(self):
+        self.count = 0
+        self.scene_ranges = {}
+        self.scene_participants = {}
+        self.assistant_count = 0
+        self.narrator_scenes = set()
+        self.last_scene = None
+        self.max_scene = 1
+        self.last_message = None
+        self.generation = 0
+
+    def add(self, position, message):
+        scene = message.get('scene', 1)
+        ranges = self.scene_ranges.setdefault(scene, [])
+        if ranges and ranges[-1][1] == position:
+            ranges[-1][1] = position + 1
+        else:
+            ranges.append([position, position + 1])
+        participants = self.scene_participants.get(message.get('scene'))
+        if participants is None:
+            participants = self.scene_participants[message.get('scene')] = set()
+        participants.add((message.get('metadata') or {}).get('character_name'))
+        if message.get('role') == 'assistant':
+            self.assistant_count += 1
+        if _is_narrator_post(message):
+            self.narrator_scenes.add(scene)
+        if isinstance(scene, int) and scene > self.max_scene:
+            self.max_scene = scene
+        self.last_scene = scene
+        self.last_message = message
+        self.count = position + 1
+
+    def extend(self, messages):
+        for position in range(self.count, len(messages)):
+            self.add(position, messages[position])
+
+    @classmethod
+    def build(cls, messages):
+        index = cls()
+        index.extend(messages)
+        return index
+
+    def matches(self, messages):
+        if self.count > len(messages):
+            return False
+        if self.count == 0:
+            return True
+        last = messages[self.count - 1]
+        if self.last_message is None:
+            return last.get('scene', 1) == self.last_scene
+        return last is self.last_message
+
+    def current_scene(self):
+        if isinstance(self.last_scene, int) and self.last_scene >= 1:
+            return self.last_scene
+        return self.max_scene
+
+    def scene_start(self, scene):
+        ranges = self.scene_ranges.get(scene)
+        return ranges[0][0] if ranges else None
+
+    def scene_positions(self, scene):
+        for start, end in self.scene_ranges.get(scene, ()):
+            yield from range(start, end)
+
+    def to_dict(self):
+        return {
+            "format": INDEX_FORMAT,
+            "count": self.count,
+            "scene_ranges": [[scene, ranges] for scene, ranges in self.scene_ranges.items()],
+            "scene_participants": [[scene, sorted(names, key=str)] for scene, names in self.scene_participants.items()],
+            "assistant_count": self.assistant_count,
+            "narrator_scenes": sorted(self.narrator_scenes, key=str),
+            "last_scene": self.last_scene,
+            "max_scene": self.max_scene
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        index.count = int(data.get('count', 0))
+        index.scene_ranges = {scene: [[int(start), int(end)] for start, end in ranges]
+                              for scene, ranges in data.get('scene_ranges', [])}
+        index.scene_participants = {scene: set(names) for scene, names in data.get('scene_participants', [])}
+        index.assistant_count = int(data.get('assistant_count', 0))
+        index.narrator_scenes = set(data.get('narrator_scenes', []))
+        index.last_scene = data.get('last_scene')
+        index.max_scene = data.get('max_scene', 1)
+        return index
+
+class ContextLog:
+    def __init__(self, context_file):
+        self.context_file = context_file
+        base = os.path.splitext(context_file)[0]
+        self.log_file = base + LOG_SUFFIX
+        self.index_file = base + INDEX_SUFFIX
+        self._persisted = []
+        self._fingerprints = []
+        self._log_records = 0
+        self._loaded = False
+        self.index = ContextIndex()
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.context_file):
+            return []
+        with open(self.context_file, "r", encoding="utf-8") as f:
+            content = f.read()
+        if not content.strip():
+            return []
+        parsed = json.loads(content)
+        return parsed if isinstance(parsed, list) else []
+
+    def _snapshot_size(self):
+        try:
+            return os.path.getsize(self.context_file)
+        except OSError:
+            return 0
+
+    def _replay_log(self, messages):
+        records = 0
+        if not os.path.exists(self.log_file):
+            return records
+        with open(self.log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Ignoring damaged record in {self.log_file}")
+                    break
+                if 'base' in record:
+                    if record['base'] != self._snapshot_size():
+                        print(f"Ignoring {self.log_file}: it belongs to an older snapshot")
+                        return 0
+                elif 't' in record:
+                    del messages[int(record['t']):]
+                elif 'm' in record:
+                    messages.append(record['m'])
+                records += 1
+        return records
+
+    def _read_index(self, messages):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            index = ContextIndex.from_dict(data) if data.get('format') == INDEX_FORMAT else ContextIndex()
+            if index.count == len(messages) and index.matches(messages):
+                return index
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+        return ContextIndex.build(messages)
+
+    def load(self):
+        messages = self._read_snapshot()
+        self._log_records = self._replay_log(messages)
+        self.index = self._read_index(messages)
+        self.index.last_message = messages[-1] if messages else None
+        self._remember_persisted(messages)
+        self._loaded = True
+        _remember_scene_index(messages, self.index)
+        return messages
+
+    def _remember_persisted(self, messages):
+        self._persisted = list(messages)
+        self._fingerprints = [_fingerprint(message) for message in messages]
+
+    def _first_difference(self, messages):
+        limit = min(len(messages), len(self._persisted))
+        for position in range(limit):
+            message = messages[position]
+            if message is not self._persisted[position] or _fingerprint(message) != self._fingerprints[position]:
+                return position
+        return limit
+
+    def save(self, messages):
+        if not self._loaded:
+            self.compact(messages)
+            return
+        first = self._first_difference(messages)
+        if first == len(self._persisted) == len(messages):
+            return
+        records = []
+        if first < len(self._persisted):
+            records.append(json.dumps({"t": first}))
+        appended = [_serialize(message) for message in messages[first:]]
+        records.extend('{"m": ' + serialized + '}' for serialized in appended)
+        truncated = first < len(self._persisted)
+        if self._log_records + len(records) > COMPACT_AFTER_RECORDS:
+            self.compact(messages)
+            return
+        log_dir = os.path.dirname(self.log_file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        if self._log_records == 0 or not os.path.exists(self.log_file):
+            records.insert(0, json.dumps({"base": self._snapshot_size()}))
+            mode = "w"
+        else:
+            mode = "a"
+        with open(self.log_file, mode, encoding="utf-8") as f:
+            f.write('\n'.join(records) + '\n')
+        self._log_records += len(records)
+        del self._persisted[first:]
+        del self._fingerprints[first:]
+        self._persisted.extend(messages[first:])
+        self._fingerprints.extend(_fingerprint(message) for message in messages[first:])
+        if truncated or not self.index.matches(messages):
+            self.index = ContextIndex.build(messages)
+        else:
+            self.index.extend(messages)
+        _remember_scene_index(messages, self.index)
+        self._write_index()
+
+    def compact(self, messages):
+        context_dir = os.path.dirname(self.context_file)
+        if context_dir and not os.path.exists(context_dir):
+            os.makedirs(context_dir)
+        tmp_file = self.context_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(messages, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.context_file)
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        self._log_records = 0
+        self._remember_persisted(messages)
+        self._loaded = True
+        self.index = ContextIndex.build(messages)
+        _remember_scene_index(messages, self.index)
+        self._write_index()
+
+    def reset(self):
+        self.compact([])
+
+    def _write_index(self):
+        try:
+            with open(self.index_file, "w", encoding="utf-8") as f:
+                json.dump(self.index.to_dict(), f)
+        except (OSError, TypeError) as e:
+            print(f"Error writing context index {self.index_file}: {e}")
+
+def get_context_log(context_file):
+    key = os.path.normpath(context_file)
+    with _lock:
+        log = _logs.get(key)
+        if log is None:
+            log = ContextLog(context_file)
+            _logs[key] = log
+        return log
+
+def _remember_scene_index(messages, index):
+    with _lock:
+        cached = _scene_indexes.get(id(messages))
+        if cached is not None and cached[0] is not messages:
+            _generations.pop(id(messages), None)
+        index.generation = _generations.get(id(messages), 0)
+        _scene_indexes[id(messages)] = (messages, index)
+        _scene_indexes.move_to_end(id(messages))
+        while len(_scene_indexes) > SCENE_INDEX_CACHE_SIZE:
+            evicted, _ = _scene_indexes.popitem(last=False)
+            _generations.pop(evicted, None)
+
+def bump_context_generation(messages):
+    with _lock:
+        cached = _scene_indexes.get(id(messages))
+        if cached is not None and cached[0] is messages:
+            _generations[id(messages)] = _generations.get(id(messages), 0) + 1
+
+def get_scene_index(messages):
+    with _lock:
+        cached = _scene_indexes.get(id(messages))
+        index = cached[1] if cached and cached[0] is messages else None
+        generation = _generations.get(id(messages), 0)
+    if (index is None or index.generation != generation or index.count > len(messages)
+            or not index.matches(messages)):
+        index = ContextIndex.build(messages)
+    elif index.count < len(messages):
+        index.extend(messages)
+    _remember_scene_index(messages, index)
+    return index
+
+def get_scene_messages(messages, scene):
+    if not messages:
+        return []
+    index = get_scene_index(messages)
+    return [messages[position] for position in index.scene_positions(scene)]
+
+def scene_participants(messages, scene):
+    if not messages:
+        return set()
+    return set(get_scene_index(messages).scene_participants.get(scene, ()))
+
+def shared_scene_messages(messages, actor_name, followed_name, before_scene):
+    if not messages:
+        return []
+    participants_by_scene = get_scene_index(messages).scene_participants
+    follows_player = followed_name.lower() == 'player'
+    shared = []
+    for message in messages:
+        scene = message.get('scene', 1)
+        if message.get('role') == 'system' or not scene < before_scene:
+            continue
+        participants = participants_by_scene.get(scene, ())
+        is_user = message.get('role') == 'user'
+        actor_involved = actor_name in participants or (is_user and actor_name == 'Player')
+        followed_involved = (followed_name in participants or (is_user and followed_name == 'Player')
+                             or (follows_player and ('Player' in participants or is_user)))
+        if actor_involved and followed_involved:
+            shared.append(message)
+    return shared
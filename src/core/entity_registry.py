@@ -0,0 +1,352 @@
+import os
+import json
+import threading
+
+LAYER_ORDER = ('game', 'resources')
+_LAYER_SUBDIRS = {
+    ('actors', 'game'): ('game', 'actors'),
+    ('actors', 'resources'): ('resources', 'data files', 'actors'),
+    ('settings', 'game'): ('game', 'settings'),
+    ('settings', 'resources'): ('resources', 'data files', 'settings'),
+}
+
+_layers = {}
+_registries = {}
+_lock = threading.RLock()
+
+def normalize_actor_key(name):
+    return name.strip().lower().replace(' ', '_')
+
+def _entity_fields(data):
+    if not isinstance(data, dict) or not data:
+        return None, None, False
+    name = data.get('name')
+    characters = data.get('characters')
+    if isinstance(characters, list):
+        characters = tuple(c for c in characters if isinstance(c, str))
+    else:
+        characters = None
+    return (name if isinstance(name, str) else None), characters, data.get('isPlayer') is True
+
+def _read_entity(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+        if not content:
+            return None, None, False
+        data = json.loads(content)
+    except (json.JSONDecodeError, OSError, UnicodeDecodeError):
+        return None, None, False
+    return _entity_fields(data)
+
+class EntityLayer:
+    def __init__(self, root_dir, kind):
+        self.root_dir = os.path.normpath(root_dir)
+        self.kind = kind
+        self.recursive = kind == 'settings'
+        self.generation = 0
+        self._dirs = {}
+        self._files = {}
+        self._index = None
+        self._by_character = {}
+        self._player_file = None
+
+    def _matches(self, filename):
+        lower = filename.lower()
+        if self.kind == 'settings':
+            return lower.endswith('_setting.json')
+        return lower.endswith('.json')
+
+    def _scan_dir(self, dir_path, mtime):
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if self.recursive and entry.name.lower() != 'saves':
+                            subdirs.append(entry.path)
+                    elif entry.is_file() and self._matches(entry.name):
+                        files.append(entry.path)
+        except OSError:
+            return None
+        return mtime, tuple(sorted(subdirs)), tuple(sorted(files))
+
+    def _stat_file(self, file_path):
+        try:
+            return os.stat(file_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _index_file(self, file_path, mtime):
+        cached = self._files.get(file_path)
+        if cached is not None and cached[0] == mtime:
+            return False
+        fields = _read_entity(file_path)
+        self._files[file_path] = (mtime,) + fields
+        return cached is None or cached[1:] != fields
+
+    def validate(self, check_files=False):
+        changed = False
+        seen_dirs = set()
+        live_files = []
+        stack = [self.root_dir]
+        while stack:
+            dir_path = stack.pop()
+            try:
+                mtime = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
+            cached = self._dirs.get(dir_path)
+            if cached is None or cached[0] != mtime:
+                cached = self._scan_dir(dir_path, mtime)
+                if cached is None:
+                    continue
+                self._dirs[dir_path] = cached
+            seen_dirs.add(dir_path)
+            live_files.extend(cached[2])
+            stack.extend(reversed(cached[1]))
+        for dir_path in [d for d in self._dirs if d not in seen_dirs]:
+            del self._dirs[dir_path]
+        live_set = set(live_files)
+        for file_path in [p for p in self._files if p not in live_set]:
+            del self._files[file_path]
+            changed = True
+        for file_path in live_files:
+            if file_path in self._files and not check_files:
+                continue
+            mtime = self._stat_file(file_path)
+            if mtime is None:
+                self._files.pop(file_path, None)
+                changed = True
+            elif self._index_file(file_path, mtime):
+                changed = True
+        if changed or self._index is None:
+            self._rebuild_index(live_files)
+
+    def _rebuild_index(self, ordered_files):
+        index = {}
+        by_character = {}
+        player_file = None
+        for file_path in ordered_files:
+            entry = self._files.get(file_path)
+            if not entry:
+                continue
+            if entry[2]:
+                for character in entry[2]:
+                    paths = by_character.setdefault(character, [])
+                    if not paths or paths[-1] != file_path:
+                        paths.append(file_path)
+            if entry[1] is None:
+                continue
+            name = entry[1]
+            if entry[3] and name and player_file is None:
+                player_file = file_path
+            if self.kind == 'actors':
+                keys = (normalize_actor_key(name), os.path.splitext(os.path.basename(file_path))[0].strip().lower())
+            else:
+                keys = (name,)
+            for key in keys:
+                index.setdefault(key, (file_path, name))
+        self._index = index
+        self._by_character = by_character
+        self._player_file = player_file
+        self.generation += 1
+
+    def _lookup(self, name):
+        if self.kind != 'actors':
+            return self._index.get(name)
+        return self._index.get(normalize_actor_key(name)) or self._index.get(name.strip().lower())
+
+    def _is_current(self, file_path):
+        cached = self._files.get(file_path)
+        return cached is not None and self._stat_file(file_path) == cached[0]
+
+    def find(self, name):
+        if not isinstance(name, str) or not name:
+            return None
+        self.validate()
+        hit = self._lookup(name)
+        if hit and self._is_current(hit[0]):
+            return hit[0]
+        self.validate(check_files=True)
+        hit = self._lookup(name)
+        return hit[0] if hit else None
+
+    def find_character(self, character_name):
+        if not isinstance(character_name, str) or not character_name:
+            return None, None
+        self.validate()
+        paths = self._by_character.get(character_name)
+        if not paths or not self._is_current(paths[0]):
+            self.validate(check_files=True)
+            paths = self._by_character.get(character_name)
+        if not paths:
+            return None, None
+        name = self._files[paths[0]][1]
+        return paths[0], name if name is not None else os.path.basename(os.path.dirname(paths[0]))
+
+    def settings_with_character(self, character_name):
+        self.validate(check_files=True)
+        return list(self._by_character.get(character_name, ()))
+
+    def find_player(self):
+        self.validate()
+        file_path = self._player_file
+        if not file_path or not self._is_current(file_path):
+            self.validate(check_files=True)
+            file_path = self._player_file
+        if not file_path:
+            return None, None
+        return file_path, self._files[file_path][1]
+
+    def check(self, repair=True):
+        self.validate()
+        mismatched = []
+        for file_path, entry in list(self._files.items()):
+            mtime = self._stat_file(file_path)
+            fields = _read_entity(file_path) if mtime is not None else None
+            if fields is None or entry[1:] != fields:
+                mismatched.append(file_path)
+                if repair:
+                    if fields is None:
+                        del self._files[file_path]
+                    else:
+                        self._files[file_path] = (mtime,) + fields
+        if repair and mismatched:
+            self._index = None
+            self.validate()
+        return mismatched
+
+    def names(self):
+        self.validate()
+        return {key: entry[1] for key, entry in self._index.items()}
+
+    def note_saved(self, file_path, data):
+        if not self._matches(os.path.basename(file_path)):
+            return
+        parent = os.path.dirname(file_path)
+        if not self.recursive and parent != self.root_dir:
+            return
+        mtime = self._stat_file(file_path)
+        if mtime is None:
+            return
+        fields = _entity_fields(data)
+        cached = self._files.get(file_path)
+        self._files[file_path] = (mtime,) + fields
+        if cached is None or cached[1:] != fields:
+            self._index = None
+
+    def contains(self, file_path):
+        return file_path == self.root_dir or file_path.startswith(self.root_dir + os.sep)
+
+def get_entity_layer(root_dir, kind):
+    key = (os.path.normpath(root_dir), kind)
+    with _lock:
+        layer = _layers.get(key)
+        if layer is None:
+            layer = EntityLayer(root_dir, kind)
+            _layers[key] = layer
+        return layer
+
+def find_entity_in_dir(root_dir, kind, name):
+    with _lock:
+        return get_entity_layer(root_dir, kind).find(name)
+
+class EntityRegistry:
+    def __init__(self, workflow_data_dir):
+        self.workflow_data_dir = workflow_data_dir
+        self._layers = {
+            key: get_entity_layer(os.path.join(workflow_data_dir, *subdirs), key[0])
+            for key, subdirs in _LAYER_SUBDIRS.items()
+        }
+
+    def layer(self, kind, layer_name):
+        return self._layers[(kind, layer_name)]
+
+    def _find(self, kind, name, layers):
+        with _lock:
+            for layer_name in layers:
+                file_path = self._layers[(kind, layer_name)].find(name)
+                if file_path:
+                    return file_path, layer_name
+        return None, None
+
+    def refresh(self):
+        with _lock:
+            for layer in self._layers.values():
+                layer.validate(check_files=True)
+
+    def find_actor(self, actor_name, layers=LAYER_ORDER):
+        return self._find('actors', actor_name, layers)[0]
+
+    def find_setting(self, setting_name, layers=LAYER_ORDER):
+        return self._find('settings', setting_name, layers)
+
+    def find_character_setting(self, character_name, layers=LAYER_ORDER):
+        with _lock:
+            for layer_name in layers:
+                file_path, setting_name = self._layers[('settings', layer_name)].find_character(character_name)
+                if file_path:
+                    return file_path, setting_name, layer_name
+        return None, None, None
+
+    def check(self, repair=True):
+        with _lock:
+            mismatched = []
+            for layer in self._layers.values():
+                mismatched.extend(layer.check(repair))
+            return mismatched
+
+    def actor_names(self):
+        with _lock:
+            merged = {}
+            for layer_name in LAYER_ORDER:
+                for key, name in self._layers[('actors', layer_name)].names().items():
+                    merged.setdefault(key, name)
+            return merged
+
+    def actor_generation(self):
+        with _lock:
+            return tuple(self._layers[('actors', layer_name)].generation for layer_name in LAYER_ORDER)
+
+def get_entity_registry(workflow_data_dir):
+    key = os.path.normpath(workflow_data_dir)
+    with _lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = EntityRegistry(key)
+            _registries[key] = registry
+        return registry
+
+def note_entity_file_saved(file_path, data):
+    if not file_path:
+        return
+    file_path = os.path.normpath(file_path)
+    with _lock:
+        for layer in _layers.values():
+            if layer.contains(file_path):
+                layer.note_saved(file_path, data)
+
+def invalidate_entity_registry(workflow_data_dir=None):
+    with _lock:
+        if workflow_data_dir is None:
+            _layers.clear()
+            _registries.clear()
+            return
+        prefix = os.path.normpath(workflow_data_dir)
+        for key in [k for k, layer in _layers.items() if layer.root_dir.startswith(prefix + os.sep)]:
+            del _layers[key]
+        _registries.pop(prefix, None)
+
+def rebuild_entity_registry(workflow_data_dir):
+    invalidate_entity_registry(workflow_data_dir)
+    registry = get_entity_registry(workflow_data_dir)
+    registry.refresh()
+    return registry
+
+def check_entity_registry(workflow_data_dir, repair=True):
+    mismatched = get_entity_registry(workflow_data_dir).check(repair)
+    if mismatched:
+        print(f"[ENTITY REGISTRY] {len(mismatched)} stale entries {'repaired' if repair else 'found'} in {workflow_data_dir}")
+    return mismatched
@@ -3,6 +3,8 @@ import pyfiglet
 import json
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtWidgets import QApplication
+from core.save_store import list_save_slots
+from core.variable_store import get_variable_store
 
 def handle_intro_load_requested(ui_instance, tab_index):
     if not (0 <= tab_index < len(ui_instance.tabs_data) and ui_instance.tabs_data[tab_index]):
@@ -287,13 +289,7 @@ def check_saves_exist_for_tab(ui_instance, tab_index):
     saves_dir = os.path.join(tab_dir, "saves")
     if not os.path.isdir(saves_dir):
         return False
-    try:
-        for item in os.listdir(saves_dir):
-            if os.path.isdir(os.path.join(saves_dir, item)):
-                return True
-        return False
-    except OSError:
-        return False
+    return bool(list_save_slots(saves_dir))
 
 def show_introduction(ui_instance, tab_index):
     if not (0 <= tab_index < len(ui_instance.tabs_data) and ui_instance.tabs_data[tab_index]):
@@ -380,29 +376,7 @@ def load_variables(ui_instance, tab_index):
         return {}
     if not os.path.exists(variables_file):
         return {}
-    try:
-        with open(variables_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            if not content.strip():
-                return {}
-            variables = json.loads(content)
-
-            return variables
-    except (json.JSONDecodeError, FileNotFoundError) as e:
-        print(f"Warning: Could not load or parse variables file {variables_file}. Returning empty. Error: {e}")
-        try:
-            variables_dir = os.path.dirname(variables_file)
-            if variables_dir and not os.path.exists(variables_dir):
-                os.makedirs(variables_dir)
-            with open(variables_file, 'w', encoding='utf-8') as f:
-                json.dump({}, f)
-        except Exception as create_err:
-            print(f"  Additionally failed to create empty variables file: {create_err}")
-
-        return {}
-    except Exception as e:
-        print(f"Unexpected error loading variables from {variables_file}: {e}")
-        return {}
+    return get_variable_store().variables(variables_file)
 
 def begin_intro_text_streaming(ui_instance, tab_index, intro_messages):
     intro_sequence = []
@@ -3,6 +3,10 @@ import json
 import pyfiglet
 from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
+from core.save_store import list_save_slots
+from core.context_log import get_context_log
+from core.transcript_log import get_transcript_log
+from core.entity_registry import rebuild_entity_registry
 
 
 def trigger_game_over(ui_instance, tab_index, game_over_message="Game Over"):
@@ -91,6 +95,7 @@ def _perform_game_over_reset(ui_instance, tab_index, tab_data):
                 shutil.rmtree(game_actors_dir)
         except Exception as e:
             pass
+        rebuild_entity_registry(workflow_data_dir)
     output_widget = tab_data.get('output')
     context_file = tab_data.get('context_file')
     log_file = tab_data.get('log_file')
@@ -104,19 +109,12 @@ def _perform_game_over_reset(ui_instance, tab_index, tab_data):
     tab_data['_remembered_selected_message'] = None
     if context_file:
         try:
-            with open(context_file, "w", encoding="utf-8") as f:
-                json.dump([], f)
+            get_context_log(context_file).reset()
         except Exception as e:
             pass
     if log_file:
         try:
-            empty_html = """<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" "http://www.w3.org/TR/REC-html40/strict.dtd">
-<html><head><meta name=\"qrichtext\" content=\"1\" /><style type=\"text/css\">
-p, li { white-space: pre-wrap; }
-</style></head><body style=\" font-family:'Arial'; font-size:16pt; font-weight:400; font-style:normal;\">
-<p style=\"-qt-paragraph-type:empty; margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\"><br /></p></body></html>"""
-            with open(log_file, "w", encoding="utf-8") as f:
-                f.write(empty_html)
+            get_transcript_log(log_file).reset()
         except Exception as e:
             pass
     variables = ui_instance._load_variables(tab_index)
@@ -133,8 +131,6 @@ p, li { white-space: pre-wrap; }
             cleanup_template_files_from_npc_notes(workflow_data_dir)
         except Exception as e:
             pass
-    if hasattr(ui_instance, '_actor_name_to_file_cache'):
-        ui_instance._actor_name_to_file_cache.clear()
     if hasattr(ui_instance, '_actor_name_to_actual_name'):
         ui_instance._actor_name_to_actual_name.clear()
     if tab_data is not None:
@@ -259,13 +255,7 @@ def _check_saves_exist_for_tab(ui_instance, tab_index):
     saves_dir = os.path.join(tab_dir, "saves")
     if not os.path.isdir(saves_dir):
         return False
-    try:
-        for item in os.listdir(saves_dir):
-            if os.path.isdir(os.path.join(saves_dir, item)):
-                return True
-        return False
-    except OSError:
-        return False
+    return bool(list_save_slots(saves_dir))
 
 def handle_keypress_for_game_over(ui_instance, event):
     tab_data = ui_instance.get_current_tab_data()
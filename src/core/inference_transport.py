@@ -0,0 +1,58 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import get_http_pool_size
+
+try:
+    from google import genai
+    GOOGLE_GENAI_AVAILABLE = True
+except ImportError:
+    GOOGLE_GENAI_AVAILABLE = False
+
+_sessions = {}
+_genai_clients = {}
+_lock = threading.Lock()
+
+def _normalize_base_url(base_url):
+    return (base_url or "").rstrip('/')
+
+def get_http_session(base_url, pool_size=None):
+    key = _normalize_base_url(base_url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is not None:
+            return session
+        if pool_size is None:
+            pool_size = get_http_pool_size()
+        pool_size = max(1, int(pool_size))
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _sessions[key] = session
+        return session
+
+def get_genai_client(api_key):
+    if not GOOGLE_GENAI_AVAILABLE:
+        return None
+    with _lock:
+        client = _genai_clients.get(api_key)
+        if client is None:
+            client = genai.Client(api_key=api_key)
+            _genai_clients[api_key] = client
+        return client
+
+def reset_transport(base_url=None):
+    with _lock:
+        if base_url is None:
+            sessions = list(_sessions.values())
+            _sessions.clear()
+            _genai_clients.clear()
+        else:
+            session = _sessions.pop(_normalize_base_url(base_url), None)
+            sessions = [session] if session is not None else []
+    for session in sessions:
+        try:
+            session.close()
+        except Exception as e:
+            print(f"Error closing HTTP session: {e}")
@@ -1,13 +1,12 @@
 import random
 import requests
 import json
-from config import get_api_key_for_service, get_base_url_for_service, get_current_service, get_default_utility_model
+from config import get_api_key_for_service, get_base_url_for_service, get_current_service, get_default_utility_model, is_response_cache_enabled
+from core.response_cache import get_response_cache, make_cache_key, is_cacheable_temperature
+from core.inference_transport import GOOGLE_GENAI_AVAILABLE, get_genai_client, get_http_session
 
-try:
+if GOOGLE_GENAI_AVAILABLE:
     from google import genai
-    GOOGLE_GENAI_AVAILABLE = True
-except ImportError:
-    GOOGLE_GENAI_AVAILABLE = False
 
 def _convert_model_name_for_google(model_name):
     if model_name.startswith("google/"):
@@ -33,24 +32,101 @@ def _internal_summarize_chunk(text_chunk, instruction, original_user_message_for
         return "[Summarization failed to produce content]"
     return summary
 
+def _format_messages_for_google(context):
+    formatted_messages = []
+    for msg in context:
+        role = msg.get('role', 'user')
+        content = msg.get('content', '')
+        if role == 'system':
+            formatted_messages.append(genai.types.Content(role='user', parts=[genai.types.Part(text=f"[SYSTEM] {content}")]))
+        elif role == 'user':
+            formatted_messages.append(genai.types.Content(role='user', parts=[genai.types.Part(text=content)]))
+        elif role == 'assistant':
+            formatted_messages.append(genai.types.Content(role='model', parts=[genai.types.Part(text=content)]))
+    return formatted_messages
+
+def _build_chat_completion_headers(current_service, api_key):
+    headers = { "Content-Type": "application/json" }
+    if current_service == "openrouter":
+        headers["Authorization"] = f"Bearer {api_key}"
+        headers["HTTP-Referer"] = "https://github.com/your-repo/your-project"
+        headers["X-Title"] = "ChatBot RPG"
+    elif current_service == "local":
+        if api_key and api_key != "local":
+            headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+def _stream_google_genai_request(context, model_name, max_tokens, temperature, api_key):
+    if not GOOGLE_GENAI_AVAILABLE:
+        raise RuntimeError("google-genai package not installed. Please install it with 'pip install google-genai'")
+    client = get_genai_client(api_key)
+    config = genai.types.GenerateContentConfig(
+        max_output_tokens=max_tokens,
+        temperature=temperature,
+        top_p=0.95
+    )
+    for chunk in client.models.generate_content_stream(
+        model=_convert_model_name_for_google(model_name),
+        contents=_format_messages_for_google(context),
+        config=config
+    ):
+        text = getattr(chunk, 'text', None)
+        if text:
+            yield text
+
+def _iter_sse_deltas(response):
+    for raw_line in response.iter_lines(decode_unicode=True):
+        if not raw_line or raw_line.startswith(':'):
+            continue
+        if not raw_line.startswith('data:'):
+            continue
+        payload = raw_line[5:].strip()
+        if payload == '[DONE]':
+            break
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+        if event.get('error'):
+            error = event['error']
+            message = error.get('message') if isinstance(error, dict) else str(error)
+            raise RuntimeError(f"Stream error: {message}")
+        choices = event.get('choices') or []
+        if not choices:
+            continue
+        delta = choices[0].get('delta') or {}
+        text = delta.get('content')
+        if text:
+            yield text
+
+def stream_inference(context, url_type, max_tokens, temperature):
+    current_service = get_current_service()
+    api_key = get_api_key_for_service()
+    if not api_key and current_service != "local":
+        service_names = {"openrouter": "OpenRouter", "google": "Google GenAI"}
+        service_name = service_names.get(current_service, current_service.title())
+        raise RuntimeError(f"{service_name} API key not configured. Please check config.json file.")
+    if current_service == "google":
+        yield from _stream_google_genai_request(context, url_type, max_tokens, temperature, api_key)
+        return
+    base_url = get_base_url_for_service().rstrip('/')
+    session = get_http_session(base_url)
+    final_data = { "model": url_type, "temperature": temperature, "max_tokens": max_tokens, "top_p": 0.95, "messages": context, "stream": True }
+    headers = _build_chat_completion_headers(current_service, api_key)
+    headers["Accept"] = "text/event-stream"
+    with session.post(f"{base_url}/chat/completions", headers=headers, json=final_data, timeout=180, stream=True) as response:
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+        yield from _iter_sse_deltas(response)
+
 def _make_google_genai_request(context, model_name, max_tokens, temperature, api_key):
     if not GOOGLE_GENAI_AVAILABLE:
         return "Sorry, API error: google-genai package not installed. Please install it with 'pip install google-genai'"
     
     try:
-        client = genai.Client(api_key=api_key)
+        client = get_genai_client(api_key)
         
-        formatted_messages = []
-        for msg in context:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            
-            if role == 'system':
-                formatted_messages.append(genai.types.Content(role='user', parts=[genai.types.Part(text=f"[SYSTEM] {content}")]))
-            elif role == 'user':
-                formatted_messages.append(genai.types.Content(role='user', parts=[genai.types.Part(text=content)]))
-            elif role == 'assistant':
-                formatted_messages.append(genai.types.Content(role='model', parts=[genai.types.Part(text=content)]))
+        formatted_messages = _format_messages_for_google(context)
         
         converted_model_name = _convert_model_name_for_google(model_name)
         
@@ -76,7 +152,19 @@ def _make_google_genai_request(context, model_name, max_tokens, temperature, api
     except Exception as e:
         return f"Sorry, API error: Google GenAI request failed - {str(e)}"
 
-def make_inference(context, user_message, character_name, url_type, max_tokens, temperature, seed=None, is_utility_call=False, allow_summarization_retry=True):
+def make_inference(context, user_message, character_name, url_type, max_tokens, temperature, seed=None, is_utility_call=False, allow_summarization_retry=True, use_cache=False, cache_ttl=None, cache_dir=None, cache_accept=None):
+    if not (use_cache and is_response_cache_enabled() and is_cacheable_temperature(temperature)):
+        return _make_inference_request(context, user_message, character_name, url_type, max_tokens, temperature, seed, is_utility_call, allow_summarization_retry)
+    cache = get_response_cache()
+    cache_key = make_cache_key(f"{get_current_service()}:{url_type}", context, temperature, max_tokens, seed)
+    cached_response = cache.get(cache_key, ttl=cache_ttl, workflow_data_dir=cache_dir)
+    if cached_response is not None:
+        return cached_response
+    response = _make_inference_request(context, user_message, character_name, url_type, max_tokens, temperature, seed, is_utility_call, allow_summarization_retry)
+    cache.put(cache_key, response, workflow_data_dir=cache_dir, accept=cache_accept)
+    return response
+
+def _make_inference_request(context, user_message, character_name, url_type, max_tokens, temperature, seed=None, is_utility_call=False, allow_summarization_retry=True):
     if seed is not None:
         random.seed(seed); seed = random.randint(-1, 100000)
     current_service = get_current_service()
@@ -93,21 +181,14 @@ def make_inference(context, user_message, character_name, url_type, max_tokens,
     base_url = get_base_url_for_service()
     if base_url.endswith('/'):
         base_url = base_url.rstrip('/')
+    session = get_http_session(base_url)
     base_url = f"{base_url}/chat/completions"
     
     final_data = { "model": url_type, "temperature": temperature, "max_tokens": max_tokens, "top_p": 0.95, "messages": context }
-    headers = { "Content-Type": "application/json" }
-    
-    if current_service == "openrouter":
-        headers["Authorization"] = f"Bearer {api_key}"
-        headers["HTTP-Referer"] = "https://github.com/your-repo/your-project"
-        headers["X-Title"] = "ChatBot RPG"
-    elif current_service == "local":
-        if api_key and api_key != "local":
-            headers["Authorization"] = f"Bearer {api_key}"
+    headers = _build_chat_completion_headers(current_service, api_key)
     
     try:
-        final_response = requests.post(base_url, headers=headers, json=final_data, timeout=180)
+        final_response = session.post(base_url, headers=headers, json=final_data, timeout=180)
         final_response.raise_for_status()
         final_response_data = final_response.json()
     except requests.exceptions.Timeout:
@@ -210,7 +291,7 @@ def make_inference(context, user_message, character_name, url_type, max_tokens,
                     new_messages_for_retry.extend(trailing_system_messages)
                     final_data["messages"] = new_messages_for_retry
                     try:
-                        final_response = requests.post(base_url, headers=headers, json=final_data, timeout=180)
+                        final_response = session.post(base_url, headers=headers, json=final_data, timeout=180)
                         final_response.raise_for_status()
                         final_response_data = final_response.json()
                         if final_response_data.get("choices") and final_response_data["choices"][0].get("message"):
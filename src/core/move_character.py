@@ -3,6 +3,8 @@ import json
 import re
 from core.make_inference import make_inference
 from config import get_default_utility_model
+from core.entity_registry import note_entity_file_saved
+from core.route_planner import plan_route
 
 def _load_json_safely(file_path):
     if not file_path or not os.path.isfile(file_path):
@@ -24,6 +26,7 @@ def _save_json_safely(file_path, data):
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        note_entity_file_saved(file_path, data)
         return True
     except Exception:
         return False
@@ -57,7 +60,9 @@ Please update the summary to include the new events, keeping it concise and cont
             url_type=get_default_utility_model(),
             max_tokens=256,
             temperature=0.2,
-            is_utility_call=True
+            is_utility_call=True,
+            use_cache=True,
+            cache_dir=workflow_data_dir
         )
         if summary:
             memories[leader_name] = summary.strip()
@@ -85,7 +90,8 @@ def move_characters(
         'moved_actors': [],
         'error': None,
         'tab_data_updates': None,
-        'process_scene_change_timers': False
+        'process_scene_change_timers': False,
+        'route': None
     }
     if not workflow_data_dir or not actors_to_move:
         result['error'] = 'Missing required arguments.'
@@ -665,6 +671,11 @@ def move_characters(
                 final_player_setting_name = final_setting_data.get('name')
         if not final_player_setting_name:
             final_player_setting_name = target_setting_name
+        if current_setting_name and final_player_setting_name and current_setting_name != final_player_setting_name:
+            route = plan_route(workflow_data_dir_for_update, current_setting_name, final_player_setting_name)
+            if route:
+                result['route'] = route.to_dict()
+                print(f"[TRAVEL ROUTE] {' -> '.join(route.path)} ({route.minutes:.1f} minutes)")
         def _do_update_ui():
             try:
                 if right_splitter and workflow_data_dir_for_update and final_player_setting_name:
@@ -733,138 +744,8 @@ def _build_adjacent_move_prompt(context, connections):
     return prompt
 
 def _calculate_travel_time_between_settings(workflow_data_dir, from_setting, to_setting):
-    world_map_data = _find_world_map_data_for_settings(workflow_data_dir, from_setting, to_setting)
-    if world_map_data:
-        path_length = _calculate_path_length_between_dots(world_map_data, from_setting, to_setting)
-        if path_length > 0:
-            travel_time = _calculate_travel_time_from_path_length(world_map_data, path_length, 'world')
-            return travel_time
-    location_map_data = _find_location_map_data_for_settings(workflow_data_dir, from_setting, to_setting)
-    if location_map_data:
-        path_length = _calculate_path_length_between_dots(location_map_data, from_setting, to_setting)
-        if path_length > 0:
-            travel_time = _calculate_travel_time_from_path_length(location_map_data, path_length, 'location')
-            return travel_time
-    return 0
-
-def _find_world_map_data_for_settings(workflow_data_dir, from_setting, to_setting):
-    base_settings_dir = os.path.join(workflow_data_dir, 'resources', 'data files', 'settings')
-    for root, dirs, files in os.walk(base_settings_dir):
-        for filename in files:
-            if filename == 'world_map_data.json':
-                try:
-                    with open(os.path.join(root, filename), 'r', encoding='utf-8') as f:
-                        map_data = json.load(f)
-                    dots = map_data.get('dots', [])
-                    found_from = False
-                    found_to = False
-                    for dot in dots:
-                        if len(dot) >= 5 and dot[3] == 'small':
-                            dot_name = str(dot[4]).strip()
-                            if dot_name.lower() == from_setting.lower():
-                                found_from = True
-                            elif dot_name.lower() == to_setting.lower():
-                                found_to = True
-                    if found_from and found_to:
-                        return map_data
-                except Exception as e:
-                    print(f"Error reading world map data {filename}: {e}")
-    return None
-
-def _find_location_map_data_for_settings(workflow_data_dir, from_setting, to_setting):
-    base_settings_dir = os.path.join(workflow_data_dir, 'resources', 'data files', 'settings')
-    for root, dirs, files in os.walk(base_settings_dir):
-        for filename in files:
-            if filename == 'location_map_data.json':
-                try:
-                    with open(os.path.join(root, filename), 'r', encoding='utf-8') as f:
-                        map_data = json.load(f)
-                    dots = map_data.get('dots', [])
-                    found_from = False
-                    found_to = False
-                    for dot in dots:
-                        if len(dot) >= 5 and dot[3] == 'small':
-                            dot_name = str(dot[4]).strip()
-                            if dot_name.lower() == from_setting.lower():
-                                found_from = True
-                            elif dot_name.lower() == to_setting.lower():
-                                found_to = True
-                    
-                    if found_from and found_to:
-                        return map_data
-                except Exception as e:
-                    print(f"Error reading location map data {filename}: {e}")
-    return None
-
-def _calculate_path_length_between_dots(map_data, from_setting, to_setting):
-    import math
-    dots = map_data.get('dots', [])
-    lines = map_data.get('lines', [])
-    from_index = None
-    to_index = None
-    for i, dot in enumerate(dots):
-        if len(dot) >= 5 and dot[3] == 'small':
-            dot_name = str(dot[4]).strip()
-            if dot_name.lower() == from_setting.lower():
-                from_index = i
-            elif dot_name.lower() == to_setting.lower():
-                to_index = i
-    if from_index is None or to_index is None:
-        return 0
-    graph = {}
-    for i in range(len(dots)):
-        graph[i] = []
-    for line in lines:
-        meta = line.get('meta', {})
-        start = meta.get('start', -1)
-        end = meta.get('end', -1)
-        if start >= 0 and end >= 0 and start < len(dots) and end < len(dots):
-            points = line.get('points', [])
-            if len(points) >= 2:
-                segment_length = 0
-                for i in range(len(points) - 1):
-                    p1 = points[i]
-                    p2 = points[i + 1]
-                    if len(p1) >= 2 and len(p2) >= 2:
-                        segment_length += math.sqrt((p2[0] - p1[0])**2 + (p2[1] - p1[1])**2)
-                graph[start].append((end, segment_length))
-                graph[end].append((start, segment_length))
-    import heapq
-    distances = {i: float('inf') for i in range(len(dots))}
-    distances[from_index] = 0
-    pq = [(0, from_index)]
-    visited = set()
-    while pq:
-        current_dist, current = heapq.heappop(pq)
-        if current in visited:
-            continue
-        visited.add(current)
-        if current == to_index:
-            return distances[to_index]
-        for neighbor, edge_length in graph[current]:
-            if neighbor not in visited:
-                new_dist = current_dist + edge_length
-                if new_dist < distances[neighbor]:
-                    distances[neighbor] = new_dist
-                    heapq.heappush(pq, (new_dist, neighbor))
-    return 0
-
-def _calculate_travel_time_from_path_length(map_data, path_length, map_type):
-    scale_data = map_data.get('scale_settings', {})
-    distance_per_unit = scale_data.get('distance', 1.0)
-    time_per_unit = scale_data.get('time', 1.0)
-    unit = scale_data.get('unit', 'minutes')
-    if distance_per_unit <= 0:
-        return 0
-    time_in_units = (path_length / distance_per_unit) * time_per_unit
-    if unit == 'minutes':
-        return time_in_units
-    elif unit == 'hours':
-        return time_in_units * 60
-    elif unit == 'days':
-        return time_in_units * 60 * 24
-    else:
-        return time_in_units
+    route = plan_route(workflow_data_dir, from_setting, to_setting)
+    return route.minutes if route else 0
 
 def _advance_game_time_from_travel(workflow_data_dir, minutes_to_advance, tab_data):
     from datetime import datetime, timedelta
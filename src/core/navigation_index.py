@@ -0,0 +1,319 @@
+import os
+import json
+import heapq
+import threading
+import numpy as np
+
+WORLD_MAP_FILE = 'world_map_data.json'
+LOCATION_MAP_FILE = 'location_map_data.json'
+MAP_FILES = (WORLD_MAP_FILE, LOCATION_MAP_FILE)
+LANDMARK_COUNT = 4
+MINUTES_PER_UNIT = {'minutes': 1, 'hours': 60, 'days': 60 * 24}
+
+_indexes = {}
+_dir_scans = {}
+_lock = threading.RLock()
+
+def _file_signature(file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _line_length(points):
+    try:
+        coords = np.asarray(points, dtype=np.float64)
+    except (TypeError, ValueError):
+        coords = None
+    if coords is not None and coords.ndim == 2 and coords.shape[1] >= 2:
+        steps = np.diff(coords[:, :2], axis=0)
+        return float(np.hypot(steps[:, 0], steps[:, 1]).sum())
+    length = 0.0
+    for p1, p2 in zip(points, points[1:]):
+        if len(p1) >= 2 and len(p2) >= 2:
+            length += float(np.hypot(p2[0] - p1[0], p2[1] - p1[1]))
+    return length
+
+class NavigationIndex:
+    def __init__(self, map_data, signature=None):
+        dots = map_data.get('dots', []) or []
+        self.signature = signature
+        self.scale_settings = map_data.get('scale_settings', {}) or {}
+        self.dot_count = len(dots)
+        self.setting_dots = {}
+        self.location_dots = {}
+        self.dot_names = [str(dot[4]).strip() if len(dot) >= 5 and dot[4] else None for dot in dots]
+        self.coords = np.zeros((self.dot_count, 2))
+        for i, dot in enumerate(dots):
+            try:
+                self.coords[i] = (float(dot[0]), float(dot[1]))
+            except (TypeError, ValueError, IndexError):
+                self.coords[i] = np.nan
+            if len(dot) >= 5 and dot[3] == 'small':
+                self.setting_dots[str(dot[4]).strip().lower()] = i
+            elif len(dot) >= 5 and dot[3] in ('big', 'medium') and dot[4]:
+                self.location_dots[str(dot[4]).strip().lower()] = i
+        starts = []
+        ends = []
+        lengths = []
+        for line in map_data.get('lines', []) or []:
+            meta = line.get('meta', {}) or {}
+            start = meta.get('start', -1)
+            end = meta.get('end', -1)
+            if not isinstance(start, int) or not isinstance(end, int):
+                continue
+            if 0 <= start < self.dot_count and 0 <= end < self.dot_count:
+                points = line.get('points', [])
+                if len(points) >= 2:
+                    starts.append(start)
+                    ends.append(end)
+                    lengths.append(_line_length(points))
+        self.edge_starts = np.asarray(starts, dtype=np.int32)
+        self.edge_ends = np.asarray(ends, dtype=np.int32)
+        self.edge_lengths = np.asarray(lengths, dtype=np.float64)
+        sources = np.concatenate((self.edge_starts, self.edge_ends))
+        targets = np.concatenate((self.edge_ends, self.edge_starts))
+        weights = np.concatenate((self.edge_lengths, self.edge_lengths))
+        order = np.argsort(sources, kind='stable')
+        self._neighbors = targets[order].tolist()
+        self._weights = weights[order].tolist()
+        self._offsets = np.searchsorted(sources[order], np.arange(self.dot_count + 1)).tolist()
+        self._distances = {}
+        self._routes = {}
+        self._landmarks = None
+        self._heuristic_scale = self._admissible_scale()
+        self._lock = threading.Lock()
+
+    def _admissible_scale(self):
+        if not len(self.edge_lengths):
+            return 1.0
+        straight = np.hypot(*(self.coords[self.edge_starts] - self.coords[self.edge_ends]).T)
+        usable = np.isfinite(straight) & (straight > 0)
+        if not usable.any():
+            return 1.0
+        return float(min(1.0, np.min(self.edge_lengths[usable] / straight[usable])))
+
+    def dot_index(self, setting_name):
+        if not setting_name:
+            return None
+        return self.setting_dots.get(str(setting_name).strip().lower())
+
+    def has_settings(self, *setting_names):
+        return all(self.dot_index(name) is not None for name in setting_names)
+
+    def distances_from(self, source):
+        with self._lock:
+            cached = self._distances.get(source)
+        if cached is not None:
+            return cached
+        distances = np.full(self.dot_count, np.inf)
+        distances[source] = 0.0
+        queue = [(0.0, source)]
+        offsets, neighbors, weights = self._offsets, self._neighbors, self._weights
+        while queue:
+            current_dist, current = heapq.heappop(queue)
+            if current_dist > distances[current]:
+                continue
+            for k in range(offsets[current], offsets[current + 1]):
+                new_dist = current_dist + weights[k]
+                neighbor = neighbors[k]
+                if new_dist < distances[neighbor]:
+                    distances[neighbor] = new_dist
+                    heapq.heappush(queue, (new_dist, neighbor))
+        distances.flags.writeable = False
+        with self._lock:
+            self._distances[source] = distances
+        return distances
+
+    def all_pair_distances(self):
+        if not self.dot_count:
+            return np.zeros((0, 0))
+        return np.vstack([self.distances_from(source) for source in range(self.dot_count)])
+
+    def landmark_table(self):
+        with self._lock:
+            table = self._landmarks
+        if table is not None:
+            return table
+        rows = []
+        if self.dot_count and len(self.edge_lengths):
+            degree = np.bincount(np.concatenate((self.edge_starts, self.edge_ends)), minlength=self.dot_count)
+            nearest = np.full(self.dot_count, np.inf)
+            landmark = int(np.argmax(degree))
+            for _ in range(min(LANDMARK_COUNT, self.dot_count)):
+                row = self.distances_from(landmark)
+                rows.append(row)
+                nearest = np.minimum(nearest, row)
+                candidates = np.where(np.isfinite(nearest), nearest, -1.0)
+                landmark = int(np.argmax(candidates))
+                if candidates[landmark] <= 0:
+                    break
+        table = np.vstack(rows) if rows else np.zeros((0, self.dot_count))
+        with self._lock:
+            self._landmarks = table
+        return table
+
+    def _heuristic(self, target):
+        straight = np.hypot(*(self.coords - self.coords[target]).T) * self._heuristic_scale
+        estimate = np.where(np.isfinite(straight), straight, 0.0)
+        table = self.landmark_table()
+        if len(table):
+            to_target = table[:, target][:, None]
+            with np.errstate(invalid='ignore'):
+                bounds = np.abs(to_target - table)
+            bounds[~np.isfinite(bounds)] = 0.0
+            estimate = np.maximum(estimate, bounds.max(axis=0))
+        return estimate.tolist()
+
+    def route(self, from_index, to_index):
+        key = (from_index, to_index)
+        with self._lock:
+            cached = self._routes.get(key)
+        if cached is not None:
+            return cached
+        result = self._astar(from_index, to_index)
+        with self._lock:
+            self._routes[key] = result
+        return result
+
+    def _astar(self, source, target):
+        if source == target:
+            return (source,), 0.0
+        heuristic = self._heuristic(target)
+        offsets, neighbors, weights = self._offsets, self._neighbors, self._weights
+        best = {source: 0.0}
+        previous = {}
+        queue = [(heuristic[source], -0.0, source)]
+        closed = set()
+        while queue:
+            _, current_dist, current = heapq.heappop(queue)
+            current_dist = -current_dist
+            if current in closed:
+                continue
+            if current == target:
+                path = [target]
+                while path[-1] != source:
+                    path.append(previous[path[-1]])
+                return tuple(reversed(path)), current_dist
+            closed.add(current)
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = neighbors[k]
+                new_dist = current_dist + weights[k]
+                if neighbor not in closed and new_dist < best.get(neighbor, np.inf):
+                    best[neighbor] = new_dist
+                    previous[neighbor] = current
+                    heapq.heappush(queue, (new_dist + heuristic[neighbor], -new_dist, neighbor))
+        return None, 0.0
+
+    def travel_minutes(self, path_length):
+        return travel_minutes(self.scale_settings, path_length)
+
+    def path_length(self, from_setting, to_setting):
+        from_index = self.dot_index(from_setting)
+        to_index = self.dot_index(to_setting)
+        if from_index is None or to_index is None or from_index == to_index:
+            return 0
+        distance = self.distances_from(from_index)[to_index]
+        return float(distance) if np.isfinite(distance) else 0
+
+def travel_minutes(scale_settings, path_length):
+    scale_settings = scale_settings or {}
+    distance_per_unit = scale_settings.get('distance', 1.0)
+    time_per_unit = scale_settings.get('time', 1.0)
+    if distance_per_unit <= 0:
+        return 0
+    time_in_units = (path_length / distance_per_unit) * time_per_unit
+    return time_in_units * MINUTES_PER_UNIT.get(scale_settings.get('unit', 'minutes'), 1)
+
+def _read_map(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading map data {os.path.basename(file_path)}: {e}")
+        return None
+    return data if isinstance(data, dict) else None
+
+def get_navigation_index(map_file):
+    key = os.path.normpath(map_file)
+    signature = _file_signature(key)
+    if signature is None:
+        with _lock:
+            _indexes.pop(key, None)
+        return None
+    with _lock:
+        cached = _indexes.get(key)
+        if cached is not None and cached.signature == signature:
+            return cached
+    map_data = _read_map(key)
+    if map_data is None:
+        return None
+    try:
+        index = NavigationIndex(map_data, signature)
+    except Exception as e:
+        print(f"Error indexing map data {key}: {e}")
+        return None
+    with _lock:
+        _indexes[key] = index
+    return index
+
+def note_map_saved(map_file, map_data):
+    key = os.path.normpath(map_file)
+    signature = _file_signature(key)
+    if signature is None:
+        return None
+    try:
+        index = NavigationIndex(map_data, signature)
+    except Exception as e:
+        print(f"Error indexing map data {key}: {e}")
+        with _lock:
+            _indexes.pop(key, None)
+        return None
+    index.landmark_table()
+    with _lock:
+        _indexes[key] = index
+    return index
+
+def _scan_dir(dir_path):
+    try:
+        mtime = os.stat(dir_path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _dir_scans.get(dir_path)
+    if cached is not None and cached[0] == mtime:
+        return cached
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                elif entry.name in MAP_FILES:
+                    files.append(entry.path)
+    except OSError:
+        return None
+    cached = (mtime, tuple(sorted(subdirs)), tuple(sorted(files)))
+    _dir_scans[dir_path] = cached
+    return cached
+
+def find_map_files(workflow_data_dir, filename):
+    root = os.path.normpath(os.path.join(workflow_data_dir, 'resources', 'data files', 'settings'))
+    found = []
+    with _lock:
+        stack = [root]
+        while stack:
+            scan = _scan_dir(stack.pop())
+            if scan is None:
+                continue
+            found.extend(path for path in scan[2] if os.path.basename(path) == filename)
+            stack.extend(reversed(scan[1]))
+    return found
+
+def find_navigation_index(workflow_data_dir, filename, from_setting, to_setting):
+    for map_file in find_map_files(workflow_data_dir, filename):
+        index = get_navigation_index(map_file)
+        if index is not None and index.has_settings(from_setting, to_setting):
+            return index
+    return None
@@ -0,0 +1,64 @@
+class NpcRoundScheduler:
+    def __init__(self, max_concurrency, start_callback, release_callback, drained_callback=None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._start_callback = start_callback
+        self._release_callback = release_callback
+        self._drained_callback = drained_callback
+        self._slots = []
+        self._next_release = 0
+        self._running = 0
+        self.cancelled = False
+
+    def add(self, npc_data):
+        self._slots.append({'data': npc_data, 'state': 'pending', 'result': None})
+        return len(self._slots) - 1
+
+    def is_drained(self):
+        return self._next_release >= len(self._slots)
+
+    def is_next_to_release(self, index):
+        return index == self._next_release
+
+    def running_count(self):
+        return self._running
+
+    def launch_ready(self):
+        if self.cancelled:
+            return
+        for index, slot in enumerate(self._slots):
+            if self._running >= self.max_concurrency:
+                break
+            if slot['state'] != 'pending':
+                continue
+            slot['state'] = 'running'
+            self._running += 1
+            if not self._start_callback(index, slot['data']):
+                self.complete(index, None, launch_next=False)
+        if self.is_drained() and self._running == 0 and self._drained_callback:
+            callback = self._drained_callback
+            self._drained_callback = None
+            callback()
+
+    def complete(self, index, result, launch_next=True):
+        if self.cancelled or not (0 <= index < len(self._slots)):
+            return
+        slot = self._slots[index]
+        if slot['state'] in ('done', 'released'):
+            return
+        if slot['state'] == 'running':
+            self._running -= 1
+        slot['state'] = 'done'
+        slot['result'] = result
+        while self._next_release < len(self._slots) and self._slots[self._next_release]['state'] == 'done':
+            ready = self._slots[self._next_release]
+            ready['state'] = 'released'
+            self._next_release += 1
+            self._release_callback(ready['data'], ready['result'])
+            if self.cancelled:
+                return
+        if launch_next:
+            self.launch_ready()
+
+    def cancel(self):
+        self.cancelled = True
+        self._drained_callback = None
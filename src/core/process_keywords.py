@@ -3,46 +3,187 @@ import json
 import re
 from typing import List, Dict, Set, Optional
 from collections import defaultdict
+from core.context_log import get_scene_messages
+
+_FILTER_FIELDS = ('character', 'setting', 'world', 'region', 'location')
+
+def _split_filter_values(value) -> frozenset:
+    if not isinstance(value, str):
+        return frozenset()
+    return frozenset(v.strip().lower() for v in value.split(',') if v.strip())
+
+def _get_filter_set(entry: Dict, field: str) -> frozenset:
+    filter_sets = entry.get('_filter_sets')
+    if filter_sets is not None and field in filter_sets:
+        return filter_sets[field]
+    return _split_filter_values(entry.get(field, ''))
+
+class KeywordStore:
+    def __init__(self, workflow_data_dir: str):
+        self.workflow_data_dir = workflow_data_dir
+        self.keywords_base_dir = os.path.join(workflow_data_dir, 'resources', 'data files', 'keywords')
+        self._files = {}
+        self._file_order = []
+        self._keywords = {}
+
+    def _load_file(self, category: str, filename: str, keyword_path: str) -> List[tuple]:
+        try:
+            with open(keyword_path, 'r', encoding='utf-8') as f:
+                keyword_data = json.load(f)
+        except Exception as e:
+            print(f"Error loading keyword file {keyword_path}: {e}")
+            return []
+        keyword_name = keyword_data.get('name', filename[:-5])
+        loaded = []
+        for entry in keyword_data.get('entries', []):
+            entry['_category'] = category
+            entry['_keyword_name'] = keyword_name
+            entry['_filter_sets'] = {field: _split_filter_values(entry.get(field, '')) for field in _FILTER_FIELDS}
+            loaded.append((keyword_name.lower(), entry))
+        return loaded
+
+    def refresh(self) -> bool:
+        if not os.path.exists(self.keywords_base_dir):
+            changed = bool(self._files)
+            self._files = {}
+            self._file_order = []
+            self._keywords = {}
+            return changed
+        seen_order = []
+        changed = False
+        try:
+            for category in os.listdir(self.keywords_base_dir):
+                category_path = os.path.join(self.keywords_base_dir, category)
+                if not os.path.isdir(category_path):
+                    continue
+                with os.scandir(category_path) as it:
+                    for dir_entry in it:
+                        filename = dir_entry.name
+                        if not filename.endswith('.json') or filename == '_order.json':
+                            continue
+                        keyword_path = dir_entry.path
+                        try:
+                            mtime = dir_entry.stat().st_mtime_ns
+                        except OSError:
+                            continue
+                        seen_order.append(keyword_path)
+                        cached = self._files.get(keyword_path)
+                        if cached is not None and cached[0] == mtime:
+                            continue
+                        self._files[keyword_path] = (mtime, self._load_file(category, filename, keyword_path))
+                        changed = True
+        except Exception as e:
+            print(f"Error scanning keywords directory: {e}")
+            return False
+        if seen_order != self._file_order:
+            seen = set(seen_order)
+            for stale_path in [p for p in self._files if p not in seen]:
+                del self._files[stale_path]
+            self._file_order = seen_order
+            changed = True
+        if changed:
+            keywords_dict = defaultdict(list)
+            for keyword_path in self._file_order:
+                for keyword_key, entry in self._files[keyword_path][1]:
+                    keywords_dict[keyword_key].append(entry)
+            self._keywords = dict(keywords_dict)
+        return changed
+
+    def get_keywords(self) -> Dict[str, List[Dict]]:
+        self.refresh()
+        return self._keywords
+
+_keyword_stores = {}
+
+def get_keyword_store(workflow_data_dir: str) -> KeywordStore:
+    key = os.path.normcase(os.path.abspath(workflow_data_dir))
+    store = _keyword_stores.get(key)
+    if store is None:
+        store = KeywordStore(workflow_data_dir)
+        _keyword_stores[key] = store
+    return store
 
 def load_keywords_for_workflow(workflow_data_dir: str) -> Dict[str, List[Dict]]:
-    keywords_dict = defaultdict(list)
-    keywords_base_dir = os.path.join(workflow_data_dir, 'resources', 'data files', 'keywords')
-    if not os.path.exists(keywords_base_dir):
+    if not workflow_data_dir:
         return {}
-    try:
-        for category in os.listdir(keywords_base_dir):
-            category_path = os.path.join(keywords_base_dir, category)
-            if not os.path.isdir(category_path):
+    return get_keyword_store(workflow_data_dir).get_keywords()
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+def _has_word_boundary(text: str, index: int) -> bool:
+    before = index > 0 and _is_word_char(text[index - 1])
+    after = index < len(text) and _is_word_char(text[index])
+    return before != after
+
+def _trie_to_pattern(node: Dict) -> str:
+    alternatives = [re.escape(ch) + _trie_to_pattern(child) for ch, child in sorted(node.items()) if ch != '']
+    if '' in node:
+        alternatives.append(r'\b')
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '(?:' + '|'.join(alternatives) + ')'
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.keywords = frozenset(keywords)
+        self._has_empty_keyword = '' in self.keywords
+        trie = {}
+        for keyword in self.keywords:
+            if not keyword:
                 continue
-            for filename in os.listdir(category_path):
-                if not filename.endswith('.json') or filename == '_order.json':
-                    continue
-                keyword_path = os.path.join(category_path, filename)
-                try:
-                    with open(keyword_path, 'r', encoding='utf-8') as f:
-                        keyword_data = json.load(f)
-                    keyword_name = keyword_data.get('name', filename[:-5])
-                    entries = keyword_data.get('entries', [])
-                    for entry in entries:
-                        entry['_category'] = category
-                        entry['_keyword_name'] = keyword_name
-                        keywords_dict[keyword_name.lower()].append(entry)
-                except Exception as e:
-                    print(f"Error loading keyword file {keyword_path}: {e}")
-    except Exception as e:
-        print(f"Error scanning keywords directory: {e}")
-    return dict(keywords_dict)
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = keyword
+        self._prefix_keywords = {}
+        for keyword in self.keywords:
+            if not keyword:
+                continue
+            prefixes = []
+            node = trie
+            for i, ch in enumerate(keyword[:-1]):
+                node = node[ch]
+                if '' in node:
+                    prefixes.append(keyword[:i + 1])
+            self._prefix_keywords[keyword] = prefixes
+        self._pattern = re.compile(r'(?=\b(' + _trie_to_pattern(trie) + '))') if trie else None
+
+    def find_all(self, text: str) -> Set[str]:
+        if not text:
+            return set()
+        text_lower = text.lower()
+        found_keywords = set()
+        if self._has_empty_keyword and re.search(r'\b', text_lower):
+            found_keywords.add('')
+        if self._pattern is None:
+            return found_keywords
+        for match in self._pattern.finditer(text_lower):
+            keyword = match.group(1)
+            found_keywords.add(keyword)
+            start = match.start(1)
+            for prefix in self._prefix_keywords.get(keyword, ()):
+                if prefix not in found_keywords and _has_word_boundary(text_lower, start + len(prefix)):
+                    found_keywords.add(prefix)
+        return found_keywords
+
+_keyword_matcher_cache = {}
+_KEYWORD_MATCHER_CACHE_SIZE = 16
+
+def get_keyword_matcher(available_keywords) -> KeywordMatcher:
+    key = available_keywords if isinstance(available_keywords, frozenset) else frozenset(available_keywords)
+    matcher = _keyword_matcher_cache.pop(key, None)
+    if matcher is None:
+        matcher = KeywordMatcher(key)
+    _keyword_matcher_cache[key] = matcher
+    while len(_keyword_matcher_cache) > _KEYWORD_MATCHER_CACHE_SIZE:
+        _keyword_matcher_cache.pop(next(iter(_keyword_matcher_cache)))
+    return matcher
 
 def extract_keywords_from_text(text: str, available_keywords: Set[str]) -> Set[str]:
     if not text:
         return set()
-    found_keywords = set()
-    text_lower = text.lower()
-    for keyword in available_keywords:
-        pattern = r'\b' + re.escape(keyword) + r'\b'
-        if re.search(pattern, text_lower):
-            found_keywords.add(keyword)
-    return found_keywords
+    return get_keyword_matcher(available_keywords).find_all(text)
 
 def filter_keyword_entries(entries: List[Dict], character_name: str, setting_name: str, 
                          location_info: Dict[str, str], is_narrator: bool = False) -> Optional[Dict]:
@@ -57,11 +198,9 @@ def filter_keyword_entries(entries: List[Dict], character_name: str, setting_nam
     return None
 
 def _check_character_filter(entry: Dict, character_name: str, is_narrator: bool) -> bool:
-    char_filter = entry.get('character', '').strip()
-    if not char_filter:
+    allowed_chars_lower = _get_filter_set(entry, 'character')
+    if not allowed_chars_lower:
         return True
-    allowed_chars = [c.strip() for c in char_filter.split(',') if c.strip()]
-    allowed_chars_lower = [c.lower() for c in allowed_chars]
     if 'any' in allowed_chars_lower:
         return True
     if is_narrator and 'narrator' in allowed_chars_lower:
@@ -71,32 +210,17 @@ def _check_character_filter(entry: Dict, character_name: str, is_narrator: bool)
     return False
 
 def _check_setting_filter(entry: Dict, setting_name: str) -> bool:
-    setting_filter = entry.get('setting', '').strip()
-    if not setting_filter:
+    allowed_settings = _get_filter_set(entry, 'setting')
+    if not allowed_settings:
         return True
-    allowed_settings = [s.strip().lower() for s in setting_filter.split(',') if s.strip()]
     if setting_name and setting_name.lower() in allowed_settings:
         return True
     return False
 
 def _check_location_filters(entry: Dict, location_info: Dict[str, str]) -> bool:
-    world_filter = entry.get('world', '').strip()
-    if world_filter:
-        allowed_worlds = [w.strip().lower() for w in world_filter.split(',') if w.strip()]
-        current_world = location_info.get('world', '').lower()
-        if current_world not in allowed_worlds:
-            return False
-    region_filter = entry.get('region', '').strip()
-    if region_filter:
-        allowed_regions = [r.strip().lower() for r in region_filter.split(',') if r.strip()]
-        current_region = location_info.get('region', '').lower()
-        if current_region not in allowed_regions:
-            return False
-    location_filter = entry.get('location', '').strip()
-    if location_filter:
-        allowed_locations = [l.strip().lower() for l in location_filter.split(',') if l.strip()]
-        current_location = location_info.get('location', '').lower()
-        if current_location not in allowed_locations:
+    for field in ('world', 'region', 'location'):
+        allowed_values = _get_filter_set(entry, field)
+        if allowed_values and location_info.get(field, '').lower() not in allowed_values:
             return False
     return True
 
@@ -110,8 +234,9 @@ def build_keyword_context(scene_text: str, character_name: str, setting_name: st
     full_scene_text = ""
     if full_context and current_scene_number:
         full_scene_text = get_scene_text_for_keywords(full_context, current_scene_number)
-    all_scene_keywords = extract_keywords_from_text(full_scene_text, set(all_keywords.keys()))
-    current_turn_keywords = extract_keywords_from_text(scene_text, set(all_keywords.keys()))
+    keyword_matcher = get_keyword_matcher(all_keywords.keys())
+    all_scene_keywords = keyword_matcher.find_all(full_scene_text)
+    current_turn_keywords = keyword_matcher.find_all(scene_text)
     all_active_keywords = set()
     for keyword in all_scene_keywords:
         entries = all_keywords.get(keyword, [])
@@ -147,8 +272,8 @@ def build_keyword_context(scene_text: str, character_name: str, setting_name: st
 
 def get_scene_text_for_keywords(context: List[Dict], current_scene_number: int) -> str:
     scene_texts = []
-    for msg in context:
-        if msg.get('scene', 1) == current_scene_number and msg.get('role') != 'system':
+    for msg in get_scene_messages(context, current_scene_number):
+        if msg.get('role') != 'system':
             content = msg.get('content', '')
             if content:
                 scene_texts.append(content)
@@ -159,8 +284,8 @@ def inject_keywords_into_context(context_for_llm: List[Dict], original_context:
                                location_info: Dict[str, str], workflow_data_dir: str,
                                current_scene_number: int, is_narrator: bool = False) -> List[Dict]:
     scene_text = ""
-    for msg in reversed(original_context):
-        if msg.get('role') == 'user' and msg.get('scene', 1) == current_scene_number:
+    for msg in reversed(get_scene_messages(original_context, current_scene_number)):
+        if msg.get('role') == 'user':
             scene_text = msg.get('content', '')
             break
     keyword_context = build_keyword_context(
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+CACHE_MAX_TEMPERATURE = 0.3
+DEFAULT_MEMORY_ENTRIES = 512
+MAX_DISK_ENTRIES = 5000
+MAX_DISK_AGE_SECONDS = 30 * 24 * 60 * 60
+CACHE_DIR_NAME = "cache"
+CACHE_DB_FILE = "response_cache.sqlite3"
+_UNCACHEABLE_PREFIXES = ("Sorry, API error", "Sorry, the request timed out", "Sorry, there was an issue", "API Request failed")
+_REFUSAL_PREFIXES = ("i'm sorry", "i am sorry", "sorry", "i cannot", "i can't", "as an ai")
+
+def make_cache_key(model, messages, temperature, max_tokens, seed=None):
+    payload = {
+        "model": model,
+        "messages": [{"role": m.get('role'), "content": m.get('content')} for m in (messages or [])],
+        "temperature": round(float(temperature), 4) if temperature is not None else None,
+        "max_tokens": max_tokens,
+        "seed": seed
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def is_cacheable_temperature(temperature):
+    try:
+        return float(temperature) <= CACHE_MAX_TEMPERATURE
+    except (TypeError, ValueError):
+        return False
+
+def is_cacheable_response(response):
+    if not isinstance(response, str) or not response.strip():
+        return False
+    if response.startswith(_UNCACHEABLE_PREFIXES):
+        return False
+    return not response.strip().lower().startswith(_REFUSAL_PREFIXES)
+
+class ResponseCache:
+    def __init__(self, max_entries=DEFAULT_MEMORY_ENTRIES, max_disk_entries=MAX_DISK_ENTRIES, max_disk_age=MAX_DISK_AGE_SECONDS):
+        self.max_entries = max(1, int(max_entries))
+        self.max_disk_entries = max(1, int(max_disk_entries))
+        self.max_disk_age = max_disk_age
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_connections = {}
+
+    def _db_path(self, workflow_data_dir):
+        return os.path.join(workflow_data_dir, CACHE_DIR_NAME, CACHE_DB_FILE)
+
+    def _connect(self, workflow_data_dir):
+        db_path = self._db_path(workflow_data_dir)
+        conn = self._db_connections.get(db_path)
+        if conn is not None:
+            return conn
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        conn.commit()
+        self._prune(conn)
+        self._db_connections[db_path] = conn
+        return conn
+
+    def _prune(self, conn):
+        try:
+            if self.max_disk_age is not None:
+                conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_disk_age,))
+            conn.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY created DESC LIMIT ?)", (self.max_disk_entries,)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"[RESPONSE CACHE] Prune failed: {e}")
+
+    def _remember(self, key, response, created):
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key, ttl=None, workflow_data_dir=None):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created = entry
+                if ttl is None or now - created <= ttl:
+                    self._memory.move_to_end(key)
+                    return response
+                del self._memory[key]
+            if not workflow_data_dir:
+                return None
+            try:
+                row = self._connect(workflow_data_dir).execute(
+                    "SELECT response, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"[RESPONSE CACHE] Read failed: {e}")
+                return None
+            if not row:
+                return None
+            response, created = row
+            if ttl is not None and now - created > ttl:
+                return None
+            self._remember(key, response, created)
+            return response
+
+    def put(self, key, response, workflow_data_dir=None, accept=None):
+        if not is_cacheable_response(response):
+            return
+        if accept is not None and not accept(response):
+            return
+        created = time.time()
+        with self._lock:
+            self._remember(key, response, created)
+            if not workflow_data_dir:
+                return
+            try:
+                conn = self._connect(workflow_data_dir)
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                    (key, response, created)
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[RESPONSE CACHE] Write failed: {e}")
+
+    def clear(self, workflow_data_dir=None, older_than=None):
+        with self._lock:
+            if older_than is None:
+                self._memory.clear()
+            else:
+                cutoff = time.time() - older_than
+                for key in [k for k, (_, created) in self._memory.items() if created < cutoff]:
+                    del self._memory[key]
+            if not workflow_data_dir:
+                return
+            try:
+                conn = self._connect(workflow_data_dir)
+                if older_than is None:
+                    conn.execute("DELETE FROM responses")
+                else:
+                    conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - older_than,))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[RESPONSE CACHE] Clear failed: {e}")
+
+    def close(self):
+        with self._lock:
+            for conn in self._db_connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._db_connections.clear()
+
+_response_cache = ResponseCache()
+
+def get_response_cache():
+    return _response_cache
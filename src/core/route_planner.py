@@ -0,0 +1,200 @@
+import os
+import json
+import threading
+from core.navigation_index import WORLD_MAP_FILE, LOCATION_MAP_FILE, find_map_files, get_navigation_index
+
+MAX_CACHED_ROUTES = 4096
+
+_atlases = {}
+_lock = threading.Lock()
+
+class RouteLeg:
+    __slots__ = ('map_file', 'map_type', 'dots', 'names', 'distance', 'minutes')
+
+    def __init__(self, map_file, map_type, dots, names, distance, minutes):
+        self.map_file = map_file
+        self.map_type = map_type
+        self.dots = dots
+        self.names = names
+        self.distance = distance
+        self.minutes = minutes
+
+    def to_dict(self):
+        return {
+            'map_file': self.map_file,
+            'map_type': self.map_type,
+            'dots': list(self.dots),
+            'names': list(self.names),
+            'distance': self.distance,
+            'minutes': self.minutes
+        }
+
+class Route:
+    __slots__ = ('from_setting', 'to_setting', 'legs')
+
+    def __init__(self, from_setting, to_setting, legs):
+        self.from_setting = from_setting
+        self.to_setting = to_setting
+        self.legs = legs
+
+    @property
+    def distance(self):
+        return sum(leg.distance for leg in self.legs)
+
+    @property
+    def minutes(self):
+        return sum(leg.minutes for leg in self.legs)
+
+    @property
+    def path(self):
+        names = []
+        for leg in self.legs:
+            for name in leg.names:
+                if name and (not names or names[-1] != name):
+                    names.append(name)
+        return names
+
+    def to_dict(self):
+        return {
+            'from': self.from_setting,
+            'to': self.to_setting,
+            'path': self.path,
+            'distance': self.distance,
+            'minutes': self.minutes,
+            'legs': [leg.to_dict() for leg in self.legs]
+        }
+
+def _location_names(location_dir):
+    folder = os.path.basename(location_dir)
+    names = {folder.lower(), folder.replace('_', ' ').lower()}
+    meta_file = os.path.join(location_dir, f"{folder}_location.json")
+    if os.path.isfile(meta_file):
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for key in ('display_name', 'name'):
+                if isinstance(data.get(key), str) and data[key].strip():
+                    names.add(data[key].strip().lower())
+        except (OSError, ValueError) as e:
+            print(f"[ROUTE] Could not read location metadata {meta_file}: {e}")
+    return names
+
+class RouteAtlas:
+    def __init__(self, settings_root, world_maps, location_maps):
+        self.settings_root = settings_root
+        self.world_maps = world_maps
+        self.location_maps = location_maps
+        self.signature = tuple((path, index.signature) for path, index in world_maps + location_maps)
+        self.portals = {}
+        world_by_dir = {os.path.dirname(path): (path, index) for path, index in world_maps}
+        for path, index in location_maps:
+            world = self._world_for(path, world_by_dir)
+            if world is None:
+                continue
+            names = _location_names(os.path.dirname(path))
+            hub = next((dot for name, dot in world[1].location_dots.items() if name in names), None)
+            if hub is not None:
+                self.portals[path] = (world[0], world[1], hub)
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def _world_for(self, map_file, world_by_dir):
+        relative = os.path.relpath(os.path.dirname(map_file), self.settings_root)
+        world_dir = os.path.join(self.settings_root, relative.split(os.sep)[0])
+        return world_by_dir.get(world_dir)
+
+    def plan(self, from_setting, to_setting):
+        key = (str(from_setting).strip().lower(), str(to_setting).strip().lower())
+        with self._lock:
+            if key in self._routes:
+                return self._routes[key]
+        route = self._same_map_route(from_setting, to_setting) or self._cross_map_route(from_setting, to_setting)
+        with self._lock:
+            if len(self._routes) >= MAX_CACHED_ROUTES:
+                self._routes.clear()
+            self._routes[key] = route
+        return route
+
+    def _leg(self, map_file, map_type, index, from_dot, to_dot):
+        dots, distance = index.route(from_dot, to_dot)
+        if dots is None:
+            return None
+        return RouteLeg(map_file, map_type, dots, [index.dot_names[dot] for dot in dots], distance, index.travel_minutes(distance))
+
+    def _same_map_route(self, from_setting, to_setting):
+        maps = [(path, 'world', index) for path, index in self.world_maps]
+        maps += [(path, 'location', index) for path, index in self.location_maps]
+        for path, map_type, index in maps:
+            if not index.has_settings(from_setting, to_setting):
+                continue
+            leg = self._leg(path, map_type, index, index.dot_index(from_setting), index.dot_index(to_setting))
+            if leg and leg.distance > 0:
+                return Route(from_setting, to_setting, [leg])
+        return None
+
+    def _anchors(self, setting_name):
+        anchors = []
+        for path, index in self.world_maps:
+            dot = index.dot_index(setting_name)
+            if dot is not None:
+                anchors.append((path, index, dot, None))
+        for path, index in self.location_maps:
+            dot = index.dot_index(setting_name)
+            portal = self.portals.get(path)
+            if dot is None or portal is None:
+                continue
+            world_path, world_index, hub = portal
+            portal_leg = RouteLeg(path, 'location', (dot,), [index.dot_names[dot], world_index.dot_names[hub]], 0.0, 0)
+            anchors.append((world_path, world_index, hub, portal_leg))
+        return anchors
+
+    def _cross_map_route(self, from_setting, to_setting):
+        best = None
+        for from_path, world_index, from_dot, exit_leg in self._anchors(from_setting):
+            for to_path, _, to_dot, entry_leg in self._anchors(to_setting):
+                if to_path != from_path or (exit_leg is None and entry_leg is None):
+                    continue
+                world_leg = self._leg(from_path, 'world', world_index, from_dot, to_dot)
+                if world_leg is None:
+                    continue
+                if entry_leg is not None:
+                    entry_leg = RouteLeg(entry_leg.map_file, entry_leg.map_type, entry_leg.dots,
+                                         list(reversed(entry_leg.names)), entry_leg.distance, entry_leg.minutes)
+                legs = [leg for leg in (exit_leg, world_leg, entry_leg) if leg is not None]
+                route = Route(from_setting, to_setting, legs)
+                if best is None or route.minutes < best.minutes:
+                    best = route
+        return best
+
+def get_route_atlas(workflow_data_dir):
+    if not workflow_data_dir:
+        return None
+    settings_root = os.path.normpath(os.path.join(workflow_data_dir, 'resources', 'data files', 'settings'))
+    world_maps = []
+    location_maps = []
+    for filename, maps in ((WORLD_MAP_FILE, world_maps), (LOCATION_MAP_FILE, location_maps)):
+        for map_file in find_map_files(workflow_data_dir, filename):
+            index = get_navigation_index(map_file)
+            if index is not None:
+                maps.append((map_file, index))
+    signature = tuple((path, index.signature) for path, index in world_maps + location_maps)
+    with _lock:
+        atlas = _atlases.get(settings_root)
+        if atlas is not None and atlas.signature == signature:
+            return atlas
+    atlas = RouteAtlas(settings_root, world_maps, location_maps)
+    with _lock:
+        _atlases[settings_root] = atlas
+    return atlas
+
+def plan_route(workflow_data_dir, from_setting, to_setting):
+    if not from_setting or not to_setting:
+        return None
+    atlas = get_route_atlas(workflow_data_dir)
+    if atlas is None:
+        return None
+    try:
+        return atlas.plan(from_setting, to_setting)
+    except Exception as e:
+        print(f"[ROUTE] Error planning route from '{from_setting}' to '{to_setting}': {e}")
+        return None
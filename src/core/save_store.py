@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import re
+
+OBJECTS_DIR_NAME = ".objects"
+HASH_CACHE_FILE = ".hash_cache.json"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT = 2
+_RACY_WINDOW_NS = 2_000_000_000
+_CHUNK_SIZE = 1024 * 1024
+_SKIPPED_FILE_RE = re.compile(r'(_old_\d{20}|\.tmp\d+)$')
+
+def list_save_slots(saves_dir):
+    if not os.path.isdir(saves_dir):
+        return []
+    try:
+        return [d for d in os.listdir(saves_dir)
+                if not d.startswith('.') and os.path.isdir(os.path.join(saves_dir, d))]
+    except OSError:
+        return []
+
+def is_manifest_save(save_path):
+    return os.path.isfile(os.path.join(save_path, MANIFEST_FILE))
+
+def _hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _blob_path(saves_dir, file_hash):
+    return os.path.join(saves_dir, OBJECTS_DIR_NAME, file_hash[:2], file_hash)
+
+def _atomic_copy(src_path, dest_path):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.tmp{os.getpid()}"
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+def _atomic_write_json(file_path, data):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, file_path)
+
+def _load_json(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+class _HashCache:
+    def __init__(self, saves_dir):
+        self.path = os.path.join(saves_dir, HASH_CACHE_FILE)
+        self.entries = _load_json(self.path)
+        self.dirty = False
+
+    def hash_for(self, rel_path, file_path, stat_result=None):
+        stat_result = stat_result or os.stat(file_path)
+        entry = self.entries.get(rel_path)
+        if (isinstance(entry, list) and len(entry) == 4 and entry[0] == stat_result.st_size
+                and entry[1] == stat_result.st_mtime_ns and entry[1] < entry[3] - _RACY_WINDOW_NS):
+            return entry[2]
+        file_hash = _hash_file(file_path)
+        self.record(rel_path, file_hash, stat_result)
+        return file_hash
+
+    def record(self, rel_path, file_hash, stat_result):
+        self.entries[rel_path] = [stat_result.st_size, stat_result.st_mtime_ns, file_hash, time.time_ns()]
+        self.dirty = True
+
+    def forget_missing(self, live_paths):
+        for rel_path in [p for p in self.entries if p not in live_paths]:
+            del self.entries[rel_path]
+            self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            try:
+                _atomic_write_json(self.path, self.entries)
+            except OSError as e:
+                print(f"[SAVE STORE] Could not write hash cache: {e}")
+            self.dirty = False
+
+def _scan_game_dir(game_dir, hash_cache, dir_list=None):
+    files = {}
+    for root, dirs, filenames in os.walk(game_dir):
+        dirs.sort()
+        if dir_list is not None and root != game_dir:
+            dir_list.append(os.path.relpath(root, game_dir).replace(os.sep, '/'))
+        for filename in sorted(filenames):
+            if _SKIPPED_FILE_RE.search(filename):
+                continue
+            file_path = os.path.join(root, filename)
+            rel_path = os.path.relpath(file_path, game_dir).replace(os.sep, '/')
+            try:
+                stat_result = os.stat(file_path)
+                files[rel_path] = (hash_cache.hash_for(rel_path, file_path, stat_result), stat_result.st_size)
+            except OSError as e:
+                print(f"[SAVE STORE] Skipping unreadable file {file_path}: {e}")
+    hash_cache.forget_missing(files)
+    return files
+
+def write_save_slot(game_dir, saves_dir, slot_name):
+    slot_dir = os.path.join(saves_dir, slot_name)
+    if os.path.isdir(slot_dir) and not is_manifest_save(slot_dir):
+        shutil.rmtree(slot_dir)
+    hash_cache = _HashCache(saves_dir)
+    dirs = []
+    files = _scan_game_dir(game_dir, hash_cache, dirs)
+    new_blobs = 0
+    for rel_path, (file_hash, _) in files.items():
+        blob_path = _blob_path(saves_dir, file_hash)
+        if not os.path.exists(blob_path):
+            _atomic_copy(os.path.join(game_dir, *rel_path.split('/')), blob_path)
+            new_blobs += 1
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "created": time.time(),
+        "dirs": dirs,
+        "files": {rel_path: {"hash": file_hash, "size": size} for rel_path, (file_hash, size) in files.items()}
+    }
+    _atomic_write_json(os.path.join(slot_dir, MANIFEST_FILE), manifest)
+    hash_cache.save()
+    return new_blobs
+
+def restore_save_slot(saves_dir, slot_name, game_dir):
+    manifest = _load_json(os.path.join(saves_dir, slot_name, MANIFEST_FILE))
+    target_files = manifest.get('files')
+    if not isinstance(target_files, dict):
+        raise ValueError(f"Save '{slot_name}' has no valid manifest")
+    for rel_path, info in target_files.items():
+        if not os.path.isfile(_blob_path(saves_dir, info.get('hash', ''))):
+            raise FileNotFoundError(f"Save '{slot_name}' is missing stored data for {rel_path}")
+    os.makedirs(game_dir, exist_ok=True)
+    hash_cache = _HashCache(saves_dir)
+    current_files = _scan_game_dir(game_dir, hash_cache)
+    written = 0
+    removed = 0
+    for rel_path, info in target_files.items():
+        file_hash = info['hash']
+        current = current_files.get(rel_path)
+        if current and current[0] == file_hash:
+            continue
+        dest_path = os.path.join(game_dir, *rel_path.split('/'))
+        _atomic_copy(_blob_path(saves_dir, file_hash), dest_path)
+        hash_cache.record(rel_path, file_hash, os.stat(dest_path))
+        written += 1
+    for rel_path in current_files:
+        if rel_path in target_files:
+            continue
+        try:
+            os.remove(os.path.join(game_dir, *rel_path.split('/')))
+            removed += 1
+        except OSError as e:
+            print(f"[SAVE STORE] Could not remove {rel_path}: {e}")
+    for rel_dir in manifest.get('dirs', []):
+        os.makedirs(os.path.join(game_dir, *rel_dir.split('/')), exist_ok=True)
+    hash_cache.forget_missing(target_files)
+    hash_cache.save()
+    return written, removed
+
+def delete_save_slot(saves_dir, slot_name):
+    slot_dir = os.path.join(saves_dir, slot_name)
+    if os.path.exists(slot_dir):
+        shutil.rmtree(slot_dir)
+    return collect_garbage(saves_dir)
+
+def collect_garbage(saves_dir):
+    objects_dir = os.path.join(saves_dir, OBJECTS_DIR_NAME)
+    if not os.path.isdir(objects_dir):
+        return 0
+    referenced = set()
+    for slot_name in list_save_slots(saves_dir):
+        slot_dir = os.path.join(saves_dir, slot_name)
+        if not is_manifest_save(slot_dir):
+            continue
+        files = _load_json(os.path.join(slot_dir, MANIFEST_FILE)).get('files')
+        if not isinstance(files, dict):
+            print(f"[SAVE STORE] Unreadable manifest in '{slot_name}', skipping garbage collection")
+            return 0
+        referenced.update(info.get('hash') for info in files.values() if isinstance(info, dict))
+    removed = 0
+    for root, dirs, filenames in os.walk(objects_dir, topdown=False):
+        for filename in filenames:
+            if filename not in referenced:
+                try:
+                    os.remove(os.path.join(root, filename))
+                    removed += 1
+                except OSError as e:
+                    print(f"[SAVE STORE] Could not remove blob {filename}: {e}")
+        if root != objects_dir and not os.listdir(root):
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+    return removed
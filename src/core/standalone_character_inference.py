@@ -4,6 +4,7 @@ import re
 import traceback
 from core.utils import _find_actor_file_path, _load_json_safely, _find_player_character_file, _get_player_current_setting_name, _get_player_character_name
 from rules.rule_evaluator import _evaluate_conditions, _apply_rule_actions_and_continue
+from core.context_log import get_scene_messages, shared_scene_messages
 
 def _get_player_name_for_context(workflow_data_dir):
     try:
@@ -53,17 +54,7 @@ def _get_follower_memories_for_context(self, workflow_data_dir, actor_name, char
             needs_update = True
         
         if needs_update and prior_scene > 0:
-            messages_to_summarize = []
-            for msg in current_context:
-                scene_num = msg.get('scene', 1)
-                if msg.get('role') != 'system' and scene_num < current_scene:
-                    meta = msg.get('metadata', {})
-                    char_name = meta.get('character_name', None)
-                    involved_actors = {m.get('metadata', {}).get('character_name') for m in current_context if m.get('scene') == scene_num}
-                    if msg.get('role') == 'user': 
-                        involved_actors.add('Player')
-                    if actor_name in involved_actors and (followed_name in involved_actors or (followed_name.lower() == 'player' and 'Player' in involved_actors)):
-                        messages_to_summarize.append(msg)
+            messages_to_summarize = shared_scene_messages(current_context, actor_name, followed_name, current_scene)
             
             unique_summarize_msgs = {(msg.get('scene'), msg.get('content')): msg for msg in messages_to_summarize}
             messages_to_summarize = list(unique_summarize_msgs.values())
@@ -103,8 +94,8 @@ def _get_follower_memories_for_context(self, workflow_data_dir, actor_name, char
         
         if prior_scene >= 1:
             scene_msgs = []
-            for m in current_context:
-                if m.get('scene', 1) == prior_scene and m.get('role') != 'system':
+            for m in get_scene_messages(current_context, prior_scene):
+                if m.get('role') != 'system':
                     meta = m.get('metadata', {})
                     char_name = meta.get('character_name', None)
                     role = m.get('role', '')
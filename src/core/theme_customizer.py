@@ -276,6 +276,7 @@ class ThemeCustomizationDialog(QDialog):
             "contrast": 0.35,
             "streaming_enabled": False,
             "streaming_speed": 50,
+            "live_token_streaming": False,
             "crt_enabled": True,
             "crt_speed": 120
         }
@@ -562,8 +563,14 @@ class ThemeCustomizationDialog(QDialog):
         self.streaming_checkbox.setFont(QFont('Arial', 12))
         self.streaming_checkbox.setChecked(self.current_theme.get("streaming_enabled", False))
         self.streaming_checkbox.stateChanged.connect(self.update_streaming_enabled)
+        self.live_token_streaming_checkbox = QCheckBox("Show Tokens Live")
+        self.live_token_streaming_checkbox.setFont(QFont('Arial', 12))
+        self.live_token_streaming_checkbox.setToolTip("Render narrator and character replies while the model is still generating them")
+        self.live_token_streaming_checkbox.setChecked(self.current_theme.get("live_token_streaming", False))
+        self.live_token_streaming_checkbox.stateChanged.connect(self.update_live_token_streaming)
         streaming_check_layout.addWidget(self.streaming_label)
         streaming_check_layout.addWidget(self.streaming_checkbox)
+        streaming_check_layout.addWidget(self.live_token_streaming_checkbox)
         streaming_check_layout.addStretch(1)
         content_layout.addLayout(streaming_check_layout)
         streaming_speed_layout = QHBoxLayout()
@@ -694,6 +701,9 @@ class ThemeCustomizationDialog(QDialog):
         self.streaming_speed_slider.setEnabled(enabled)
         self.streaming_speed_value.setEnabled(enabled)
 
+    def update_live_token_streaming(self, state):
+        self.result_theme["live_token_streaming"] = state == Qt.Checked
+
     def update_streaming_speed(self, value):
         self.result_theme["streaming_speed"] = value
         self.streaming_speed_value.setText(f"{value} ms")
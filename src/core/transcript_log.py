@@ -0,0 +1,143 @@
+import os
+import json
+import html
+import threading
+
+STREAM_SUFFIX = ".transcript"
+STATE_SUFFIX = ".transcript.json"
+
+LOG_HTML_HEADER = """<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" "http://www.w3.org/TR/REC-html40/strict.dtd">
+<html><head><meta name=\"qrichtext\" content=\"1\" /><style type=\"text/css\">
+p, li { white-space: pre-wrap; }
+</style></head><body style=\" font-family:'Arial'; font-size:16pt; font-weight:400; font-style:normal;\">
+"""
+LOG_HTML_FOOTER = "</body></html>"
+EMPTY_LOG_HTML = LOG_HTML_HEADER + """<p style=\"-qt-paragraph-type:empty; margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\"><br /></p>""" + LOG_HTML_FOOTER
+
+_logs = {}
+_lock = threading.Lock()
+
+def _message_html(message):
+    role = message.get('role', '')
+    if role == 'system':
+        return ''
+    content = message.get('content')
+    if not isinstance(content, str) or not content:
+        return ''
+    character_name = message.get('metadata', {}).get('character_name')
+    if role == 'user':
+        speaker = character_name or "You"
+    else:
+        speaker = character_name or "Narrator"
+    body = html.escape(content).replace('\n', '<br />')
+    return (f'<p class="{html.escape(role)}" data-scene="{html.escape(str(message.get("scene", 1)))}">'
+            f'<b>{html.escape(speaker)}:</b> {body}</p>\n')
+
+class TranscriptLog:
+    def __init__(self, log_file):
+        self.log_file = log_file
+        base = os.path.splitext(log_file)[0]
+        self.stream_file = base + STREAM_SUFFIX
+        self.state_file = base + STATE_SUFFIX
+        self.count = 0
+        self.offset = 0
+        self._last_message = None
+        self._loaded = False
+
+    def _stream_size(self):
+        try:
+            return os.path.getsize(self.stream_file)
+        except OSError:
+            return 0
+
+    def _load_state(self):
+        self._loaded = True
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.count = int(state.get('count', 0))
+            self.offset = int(state.get('offset', 0))
+        except (OSError, ValueError, TypeError, AttributeError):
+            self.count = 0
+            self.offset = 0
+
+    def _write_state(self):
+        try:
+            with open(self.state_file, "w", encoding="utf-8") as f:
+                json.dump({"count": self.count, "offset": self.offset}, f)
+        except OSError as e:
+            print(f"Error writing transcript state {self.state_file}: {e}")
+
+    def _is_current(self, messages):
+        if self.count > len(messages) or self._stream_size() != self.offset:
+            return False
+        if self.count and self._last_message is not None:
+            return messages[self.count - 1] is self._last_message
+        return True
+
+    def _write(self, messages, start, mode):
+        fragments = ''.join(_message_html(message) for message in messages[start:]).encode('utf-8')
+        stream_dir = os.path.dirname(self.stream_file)
+        if stream_dir and not os.path.exists(stream_dir):
+            os.makedirs(stream_dir)
+        with open(self.stream_file, mode) as f:
+            if mode == "ab":
+                f.seek(self.offset)
+                f.truncate()
+            f.write(fragments)
+        self.offset = (self.offset if mode == "ab" else 0) + len(fragments)
+        self.count = len(messages)
+        self._last_message = messages[-1] if messages else None
+        self._write_state()
+
+    def append_messages(self, messages):
+        if not self._loaded:
+            self._load_state()
+        if not self._is_current(messages):
+            self._write(messages, 0, "wb")
+        elif self.count < len(messages):
+            self._write(messages, self.count, "ab")
+        elif messages and self._last_message is None:
+            self._last_message = messages[-1]
+
+    def read_fragments(self):
+        try:
+            with open(self.stream_file, "rb") as f:
+                return f.read(self.offset).decode('utf-8', errors='replace')
+        except OSError:
+            return ''
+
+    def export_html(self, export_path=None):
+        export_path = export_path or self.log_file
+        if not self._loaded:
+            self._load_state()
+        fragments = self.read_fragments()
+        content = LOG_HTML_HEADER + fragments + LOG_HTML_FOOTER if fragments else EMPTY_LOG_HTML
+        export_dir = os.path.dirname(export_path)
+        if export_dir and not os.path.exists(export_dir):
+            os.makedirs(export_dir)
+        tmp_path = export_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, export_path)
+        return export_path
+
+    def reset(self):
+        self._loaded = True
+        self.count = 0
+        self.offset = 0
+        self._last_message = None
+        with open(self.stream_file, "wb"):
+            pass
+        self._write_state()
+        with open(self.log_file, "w", encoding="utf-8") as f:
+            f.write(EMPTY_LOG_HTML)
+
+def get_transcript_log(log_file):
+    key = os.path.normpath(log_file)
+    with _lock:
+        log = _logs.get(key)
+        if log is None:
+            log = TranscriptLog(log_file)
+            _logs[key] = log
+        return log
@@ -407,6 +407,7 @@ class ChatMessageListWidget(QScrollArea):
         self.setFrameShape(QFrame.NoFrame)
         self._event_filter_installed = False
         self._last_theme = None
+        self._live_message_widget = None
     def eventFilter(self, source, event):
         if source is self.viewport() and event.type() == QEvent.MouseButtonPress:
             if event.button() == Qt.LeftButton:
@@ -471,6 +472,46 @@ class ChatMessageListWidget(QScrollArea):
         except Exception as e:
             pass
     def add_message(self, role, content, immediate=False, text_tag=None, scene_number=1, latest_scene_in_context=1, prompt_finished_callback=None, character_name=None, post_effects=None, portrait_data=None):
+        live_widget = self._live_message_widget
+        if live_widget is not None:
+            name_to_use = character_name if character_name is not None else self.character_name
+            if not is_valid_widget(live_widget):
+                self._live_message_widget = None
+            elif role == 'assistant' and live_widget.character_name == name_to_use:
+                self.clear_live_message()
+                immediate = True
+        msg_widget = self._append_message_widget(role, content, immediate, text_tag, scene_number, latest_scene_in_context, prompt_finished_callback, character_name, post_effects, portrait_data)
+        if self._live_message_widget is not None:
+            self.layout.removeWidget(self._live_message_widget)
+            self.layout.addWidget(self._live_message_widget)
+        return msg_widget
+    def update_live_message(self, role, content, text_tag=None, scene_number=1, latest_scene_in_context=1, character_name=None, portrait_data=None):
+        name_to_use = character_name if character_name is not None else self.character_name
+        live_widget = self._live_message_widget
+        if live_widget is not None and (not is_valid_widget(live_widget) or live_widget.character_name != name_to_use):
+            self.clear_live_message()
+            live_widget = None
+        if live_widget is None:
+            self._live_message_widget = self._append_message_widget(
+                role, content, True, text_tag, scene_number, latest_scene_in_context,
+                None, name_to_use, None, portrait_data
+            )
+            return self._live_message_widget
+        live_widget.content = content
+        live_widget.set_message_content(immediate=True)
+        self._scroll_to_bottom()
+        return live_widget
+    def clear_live_message(self):
+        live_widget = self._live_message_widget
+        self._live_message_widget = None
+        if live_widget is None or not is_valid_widget(live_widget):
+            return False
+        live_widget.stop_timers()
+        self.layout.removeWidget(live_widget)
+        live_widget.setParent(None)
+        live_widget.deleteLater()
+        return True
+    def _append_message_widget(self, role, content, immediate, text_tag, scene_number, latest_scene_in_context, prompt_finished_callback, character_name, post_effects, portrait_data):
         if not self._event_filter_installed:
             self.viewport().installEventFilter(self)
             self.container.installEventFilter(self)
@@ -490,6 +531,7 @@ class ChatMessageListWidget(QScrollArea):
         self._scroll_to_bottom()
         return msg_widget
     def clear_messages(self):
+        self._live_message_widget = None
         while self.layout.count() > 0:
             item = self.layout.takeAt(0)
             widget = item.widget()
@@ -9,6 +9,9 @@ from datetime import datetime
 from PyQt5.QtWidgets import QMessageBox, QApplication
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel
 from PyQt5.QtCore import Qt
+from core.save_store import list_save_slots, is_manifest_save, write_save_slot, restore_save_slot, delete_save_slot, collect_garbage
+from core.entity_registry import get_entity_registry, get_entity_layer, find_entity_in_dir, note_entity_file_saved, rebuild_entity_registry
+from core.variable_store import get_variable_store
 
 BASE_VARIABLES_FILE = "variables.json"
 
@@ -140,11 +143,11 @@ def save_game_state(self):
         else:
             return
     try:
-        if overwrite:
-            shutil.rmtree(save_dest_path)
         if hasattr(self, 'timer_manager'):
             self.timer_manager.save_timer_state(tab_data)
-        shutil.copytree(game_dir, save_dest_path)
+        write_save_slot(game_dir, saves_dir, sanitized_save_name)
+        if overwrite:
+            collect_garbage(saves_dir)
         if hasattr(self, 'medium_click_sound') and self.medium_click_sound:
             try:
                 self.medium_click_sound.play()
@@ -170,11 +173,7 @@ def load_game_state(self):
     if not os.path.isdir(saves_dir):
         QMessageBox.information(self, "No Saves Found", f"No saves directory found for workflow '{tab_name}'.")
         return
-    try:
-        available_saves = [d for d in os.listdir(saves_dir) if os.path.isdir(os.path.join(saves_dir, d))]
-    except OSError as e:
-        QMessageBox.critical(self, "Load Error", f"Could not read available saves.\nError: {e}")
-        return
+    available_saves = list_save_slots(saves_dir)
     if not available_saves:
         QMessageBox.information(self, "No Saves Found", f"No saved states found in '{saves_dir}'.")
         return
@@ -313,11 +312,8 @@ def load_game_state(self):
         if not current_item:
             return
         save_name = current_item.text()
-        save_path = os.path.join(saves_dir, save_name)
         try:
-            import shutil
-            if os.path.exists(save_path):
-                shutil.rmtree(save_path)
+            delete_save_slot(saves_dir, save_name)
             row = saves_list.row(current_item)
             saves_list.takeItem(row)
             if hasattr(self, 'hover_message_sound') and self.hover_message_sound:
@@ -377,73 +373,81 @@ def load_game_state(self):
     gc.collect()
     try:
         renamed_files = []
-        if os.path.exists(game_dir):
+        if is_manifest_save(save_src_path):
             try:
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
-                for item_name in os.listdir(game_dir):
-                    item_path = os.path.join(game_dir, item_name)
-                    if os.path.isfile(item_path):
-                        base, ext = os.path.splitext(item_name)
-                        new_name = f"{base}{ext}_old_{timestamp}"
-                        new_path = os.path.join(game_dir, new_name)
-                        try:
-                            os.rename(item_path, new_path)
-                            renamed_files.append(new_path)
-                        except OSError as file_rename_err:
-                            for old_file_path in renamed_files:
-                                try:
-                                    original_name = os.path.basename(old_file_path).replace(f"_old_{timestamp}", "")
-                                    os.rename(old_file_path, os.path.join(game_dir, original_name))
-                                except OSError:
-                                    pass
-                            QMessageBox.critical(self, "Load Error - File Rename Failed",
-                                                f"Could not rename file: {item_name}\nReason: {file_rename_err}\n\nLoad operation cancelled.")
-                            return
-            except Exception as list_rename_err:
-                QMessageBox.critical(self, "Load Error - File Access", f"Could not access files in {game_dir} for renaming.\nLoad cancelled.")
+                restore_save_slot(saves_dir, selected_save, game_dir)
+            except Exception as restore_err:
+                QMessageBox.critical(self, "Load Error - Restore Failed", f"Could not restore saved files.\nReason: {restore_err}\n\nLoad operation cancelled.")
                 return
-        copied_files = []
-        try:
-            if not os.path.exists(game_dir):
-                os.makedirs(game_dir)
-            for item_name in os.listdir(save_src_path):
-                source_item_path = os.path.join(save_src_path, item_name)
-                dest_item_path = os.path.join(game_dir, item_name)
-                if os.path.isfile(source_item_path):
-                    shutil.copy2(source_item_path, dest_item_path)
-                    copied_files.append(dest_item_path)
-                elif os.path.isdir(source_item_path):
-                    if os.path.exists(dest_item_path):
-                        shutil.rmtree(dest_item_path)
-                    shutil.copytree(source_item_path, dest_item_path)
-            actors_dir = os.path.join(game_dir, 'actors')
-            if os.path.exists(actors_dir):
-                for actor_file in os.listdir(actors_dir):
-                    if actor_file.endswith('.json'):
-                        actor_path = os.path.join(actors_dir, actor_file)
-                        try:
-                            with open(actor_path, 'r', encoding='utf-8') as f:
-                                actor_data = json.load(f)
-                            notes = actor_data.get('npc_notes', '')
-                            if notes:
-                                note_count = len([line for line in notes.split('\n') if line.strip().startswith('[')])
-                            else:
-                                pass
-                        except Exception:
-                            pass
-        except Exception as copy_err:
-            for copied_file in copied_files:
-                try: os.remove(copied_file) 
-                except OSError: pass
-            for old_file_path in renamed_files:
+        else:
+            if os.path.exists(game_dir):
                 try:
-                    match = re.match(r"(.+?)_old_(\d{20})$", os.path.basename(old_file_path))
-                    if match:
-                        original_name = match.group(1)
-                        os.rename(old_file_path, os.path.join(game_dir, original_name))
-                except OSError: pass
-            QMessageBox.critical(self, "Load Error - Copy Failed", f"Could not copy saved files.\nReason: {copy_err}\n\nLoad operation cancelled.")
-            return
+                    timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+                    for item_name in os.listdir(game_dir):
+                        item_path = os.path.join(game_dir, item_name)
+                        if os.path.isfile(item_path):
+                            base, ext = os.path.splitext(item_name)
+                            new_name = f"{base}{ext}_old_{timestamp}"
+                            new_path = os.path.join(game_dir, new_name)
+                            try:
+                                os.rename(item_path, new_path)
+                                renamed_files.append(new_path)
+                            except OSError as file_rename_err:
+                                for old_file_path in renamed_files:
+                                    try:
+                                        original_name = os.path.basename(old_file_path).replace(f"_old_{timestamp}", "")
+                                        os.rename(old_file_path, os.path.join(game_dir, original_name))
+                                    except OSError:
+                                        pass
+                                QMessageBox.critical(self, "Load Error - File Rename Failed",
+                                                    f"Could not rename file: {item_name}\nReason: {file_rename_err}\n\nLoad operation cancelled.")
+                                return
+                except Exception as list_rename_err:
+                    QMessageBox.critical(self, "Load Error - File Access", f"Could not access files in {game_dir} for renaming.\nLoad cancelled.")
+                    return
+            copied_files = []
+            try:
+                if not os.path.exists(game_dir):
+                    os.makedirs(game_dir)
+                for item_name in os.listdir(save_src_path):
+                    source_item_path = os.path.join(save_src_path, item_name)
+                    dest_item_path = os.path.join(game_dir, item_name)
+                    if os.path.isfile(source_item_path):
+                        shutil.copy2(source_item_path, dest_item_path)
+                        copied_files.append(dest_item_path)
+                    elif os.path.isdir(source_item_path):
+                        if os.path.exists(dest_item_path):
+                            shutil.rmtree(dest_item_path)
+                        shutil.copytree(source_item_path, dest_item_path)
+                actors_dir = os.path.join(game_dir, 'actors')
+                if os.path.exists(actors_dir):
+                    for actor_file in os.listdir(actors_dir):
+                        if actor_file.endswith('.json'):
+                            actor_path = os.path.join(actors_dir, actor_file)
+                            try:
+                                with open(actor_path, 'r', encoding='utf-8') as f:
+                                    actor_data = json.load(f)
+                                notes = actor_data.get('npc_notes', '')
+                                if notes:
+                                    note_count = len([line for line in notes.split('\n') if line.strip().startswith('[')])
+                                else:
+                                    pass
+                            except Exception:
+                                pass
+            except Exception as copy_err:
+                for copied_file in copied_files:
+                    try: os.remove(copied_file) 
+                    except OSError: pass
+                for old_file_path in renamed_files:
+                    try:
+                        match = re.match(r"(.+?)_old_(\d{20})$", os.path.basename(old_file_path))
+                        if match:
+                            original_name = match.group(1)
+                            os.rename(old_file_path, os.path.join(game_dir, original_name))
+                    except OSError: pass
+                QMessageBox.critical(self, "Load Error - Copy Failed", f"Could not copy saved files.\nReason: {copy_err}\n\nLoad operation cancelled.")
+                return
+        rebuild_entity_registry(tab_data.get('workflow_data_dir') or tab_dir)
         self.load_conversation_for_tab(self.current_tab_index)
         self._load_variables(self.current_tab_index)
         system_context_content = self.get_system_context(self.current_tab_index)
@@ -464,8 +468,6 @@ def load_game_state(self):
             self.timer_manager.stop_timers_for_tab(tab_data)
         if tab_data and hasattr(self, 'timer_manager'):
             self.timer_manager.load_timer_state(tab_data)
-        if hasattr(self, '_actor_name_to_file_cache'):
-            self._actor_name_to_file_cache.clear()
         if hasattr(self, '_actor_name_to_actual_name'):
             self._actor_name_to_actual_name.clear()
         loaded_context_check = tab_data.get('context', [])
@@ -566,6 +568,7 @@ def _filter_conversation_history_by_visibility(conversation_history, target_char
     if not conversation_history:
         return conversation_history
     actual_player_name = _get_player_character_name(workflow_data_dir)
+    snapshot = _visibility_snapshot(target_character_name, workflow_data_dir, tab_data)
     filtered_history = []
     for msg in conversation_history:
         if msg.get('role') == 'system':
@@ -580,13 +583,34 @@ def _filter_conversation_history_by_visibility(conversation_history, target_char
         condition_type = visibility_data.get('condition_type', 'Name Match')
         should_show = _evaluate_post_visibility(
             mode, condition_type, visibility_data, 
-            target_character_name, actual_player_name, workflow_data_dir, tab_data
+            target_character_name, actual_player_name, workflow_data_dir, tab_data, snapshot
         )
         if should_show:
             filtered_history.append(msg)
     return filtered_history
 
-def _evaluate_post_visibility(mode, condition_type, visibility_data, target_character_name, actual_player_name, workflow_data_dir, tab_data):
+_VISIBILITY_SCOPES = ('Global', 'Character', 'Player', 'Setting')
+
+def _visibility_snapshot(target_character_name, workflow_data_dir, tab_data):
+    from core.variable_substitution import VariableSnapshot
+    return VariableSnapshot(tab_data or {'workflow_data_dir': workflow_data_dir}, target_character_name)
+
+def _visibility_scope_variables(snapshot, scope):
+    from rules.condition_compiler import scope_variables
+    return scope_variables(snapshot, scope.lower(), snapshot.actor_name_context) or {}
+
+def _resolve_visibility_variables(snapshot, var_name):
+    for scope in _VISIBILITY_SCOPES:
+        variables = _visibility_scope_variables(snapshot, scope)
+        if var_name in variables:
+            return variables
+    return {}
+
+def _compare_visibility_value(variables, var_name, operator, value):
+    from rules.condition_compiler import compare_variable, smart_convert
+    return compare_variable(variables, var_name, operator, value, smart_convert(value))
+
+def _evaluate_post_visibility(mode, condition_type, visibility_data, target_character_name, actual_player_name, workflow_data_dir, tab_data, snapshot=None):
     is_inclusionary = (mode == "Visible Only To")
     if condition_type == "Name Match":
         actor_names = visibility_data.get('actor_names', [])
@@ -612,10 +636,12 @@ def _evaluate_post_visibility(mode, condition_type, visibility_data, target_char
         variable_conditions = visibility_data.get('variable_conditions', [])
         if not variable_conditions:
             return True if is_inclusionary else False
+        if snapshot is None:
+            snapshot = _visibility_snapshot(target_character_name, workflow_data_dir, tab_data)
         conditions_met = []
         for cond in variable_conditions:
             condition_met = _evaluate_variable_condition(
-                cond, target_character_name, actual_player_name, workflow_data_dir, tab_data
+                cond, target_character_name, actual_player_name, workflow_data_dir, tab_data, snapshot
             )
             conditions_met.append(condition_met)
         all_conditions_met = all(conditions_met)
@@ -625,93 +651,17 @@ def _evaluate_post_visibility(mode, condition_type, visibility_data, target_char
             return not all_conditions_met
     return True
 
-def _evaluate_variable_condition(condition, target_character_name, actual_player_name, workflow_data_dir, tab_data):
+def _evaluate_variable_condition(condition, target_character_name, actual_player_name, workflow_data_dir, tab_data, snapshot=None):
     try:
+        if snapshot is None:
+            snapshot = _visibility_snapshot(target_character_name, workflow_data_dir, tab_data)
         if isinstance(condition, dict):
             var_name = condition.get('var_name')
             operator = condition.get('operator')
             value = condition.get('value')
             var_scope = condition.get('variable_scope', 'Global')
-            var_value = None
-            if var_scope == 'Global':
-                if tab_data and 'variables' in tab_data:
-                    global_vars = tab_data['variables']
-                    if var_name in global_vars:
-                        var_value = global_vars[var_name]
-            elif var_scope == 'Character':
-                if target_character_name and workflow_data_dir:
-                    from core.utils import _find_actor_file_path, _load_json_safely
-                    class DummySelf:
-                        pass
-                    dummy_self = DummySelf()
-                    actor_file_path = _find_actor_file_path(dummy_self, workflow_data_dir, target_character_name)
-                    if actor_file_path:
-                        actor_data = _load_json_safely(actor_file_path)
-                        if actor_data and 'variables' in actor_data:
-                            char_vars = actor_data['variables']
-                            if var_name in char_vars:
-                                var_value = char_vars[var_name]
-            elif var_scope == 'Player':
-                if actual_player_name and workflow_data_dir:
-                    from core.utils import _find_actor_file_path, _load_json_safely
-                    class DummySelf:
-                        pass
-                    dummy_self = DummySelf()
-                    player_file_path = _find_actor_file_path(dummy_self, workflow_data_dir, actual_player_name)
-                    if player_file_path:
-                        player_data = _load_json_safely(player_file_path)
-                        if player_data and 'variables' in player_data:
-                            player_vars = player_data['variables']
-                            if var_name in player_vars:
-                                var_value = player_vars[var_name]
-            elif var_scope == 'Setting':
-                if workflow_data_dir:
-                    from core.utils import _get_player_current_setting_name, _find_setting_file_prioritizing_game_dir, _load_json_safely
-                    current_setting_name = _get_player_current_setting_name(workflow_data_dir)
-                    if current_setting_name and current_setting_name != "Unknown Setting":
-                        class DummySelf:
-                            pass
-                        dummy_self = DummySelf()
-                        setting_file_path, _ = _find_setting_file_prioritizing_game_dir(dummy_self, workflow_data_dir, current_setting_name)
-                        if setting_file_path:
-                            setting_data = _load_json_safely(setting_file_path)
-                            if setting_data and 'variables' in setting_data:
-                                setting_vars = setting_data['variables']
-                                if var_name in setting_vars:
-                                    var_value = setting_vars[var_name]
-            if operator == "==":
-                return str(var_value) == str(value)
-            elif operator == "!=":
-                return str(var_value) != str(value)
-            elif operator == ">":
-                try:
-                    return float(var_value) > float(value)
-                except (ValueError, TypeError):
-                    return False
-            elif operator == "<":
-                try:
-                    return float(var_value) < float(value)
-                except (ValueError, TypeError):
-                    return False
-            elif operator == ">=":
-                try:
-                    return float(var_value) >= float(value)
-                except (ValueError, TypeError):
-                    return False
-            elif operator == "<=":
-                try:
-                    return float(var_value) <= float(value)
-                except (ValueError, TypeError):
-                    return False
-            elif operator == "contains":
-                return str(value) in str(var_value)
-            elif operator == "not contains":
-                return str(value) not in str(var_value)
-            elif operator == "exists":
-                return var_value is not None and var_value != ""
-            elif operator == "not exists":
-                return var_value is None or var_value == ""
-            return False
+            variables = _visibility_scope_variables(snapshot, var_scope) if var_scope in _VISIBILITY_SCOPES else {}
+            return _compare_visibility_value(variables, var_name, operator, value)
         else:
             parts = condition.strip().split()
             if len(parts) < 2:
@@ -721,184 +671,51 @@ def _evaluate_variable_condition(condition, target_character_name, actual_player
             value = " ".join(parts[2:]) if len(parts) > 2 else None
             if operator in ["exists", "not exists"]:
                 value = None
-            var_value = _get_variable_value_for_visibility(var_name, target_character_name, actual_player_name, workflow_data_dir, tab_data)
-            if operator == "==":
-                return str(var_value) == str(value)
-            elif operator == "!=":
-                return str(var_value) != str(value)
-            elif operator == ">":
-                try:
-                    return float(var_value) > float(value)
-                except (ValueError, TypeError):
-                    return False
-            elif operator == "<":
-                try:
-                    return float(var_value) < float(value)
-                except (ValueError, TypeError):
-                    return False
-            elif operator == ">=":
-                try:
-                    return float(var_value) >= float(value)
-                except (ValueError, TypeError):
-                    return False
-            elif operator == "<=":
-                try:
-                    return float(var_value) <= float(value)
-                except (ValueError, TypeError):
-                    return False
-            elif operator == "contains":
-                return str(value) in str(var_value)
-            elif operator == "not contains":
-                return str(value) not in str(var_value)
-            elif operator == "exists":
-                return var_value is not None and var_value != ""
-            elif operator == "not exists":
-                return var_value is None or var_value == ""
-            return False
+            return _compare_visibility_value(_resolve_visibility_variables(snapshot, var_name), var_name, operator, value)
     except Exception as e:
         print(f"Error evaluating variable condition '{condition}': {e}")
         return False
 
-def _get_variable_value_for_visibility(var_name, target_character_name, actual_player_name, workflow_data_dir, tab_data):
-    if tab_data and 'variables' in tab_data:
-        global_vars = tab_data['variables']
-        if var_name in global_vars:
-            return global_vars[var_name]
-    if target_character_name and workflow_data_dir:
-        try:
-            from core.utils import _find_actor_file_path, _load_json_safely
-            class DummySelf:
-                pass
-            dummy_self = DummySelf()
-            actor_file_path = _find_actor_file_path(dummy_self, workflow_data_dir, target_character_name)
-            if actor_file_path:
-                actor_data = _load_json_safely(actor_file_path)
-                if actor_data and 'variables' in actor_data:
-                    char_vars = actor_data['variables']
-                    if var_name in char_vars:
-                        return char_vars[var_name]
-        except Exception:
-            pass
-    if actual_player_name and workflow_data_dir:
-        try:
-            from core.utils import _find_actor_file_path, _load_json_safely
-            class DummySelf:
-                pass
-            dummy_self = DummySelf()
-            player_file_path = _find_actor_file_path(dummy_self, workflow_data_dir, actual_player_name)
-            if player_file_path:
-                player_data = _load_json_safely(player_file_path)
-                if player_data and 'variables' in player_data:
-                    player_vars = player_data['variables']
-                    if var_name in player_vars:
-                        return player_vars[var_name]
-        except Exception:
-            pass
-    if workflow_data_dir:
-        try:
-            from core.utils import _get_player_current_setting_name, _find_setting_file_prioritizing_game_dir, _load_json_safely
-            current_setting_name = _get_player_current_setting_name(workflow_data_dir)
-            if current_setting_name and current_setting_name != "Unknown Setting":
-                class DummySelf:
-                    pass
-                dummy_self = DummySelf()
-                setting_file_path, _ = _find_setting_file_prioritizing_game_dir(dummy_self, workflow_data_dir, current_setting_name)
-                if setting_file_path:
-                    setting_data = _load_json_safely(setting_file_path)
-                    if setting_data and 'variables' in setting_data:
-                        setting_vars = setting_data['variables']
-                        if var_name in setting_vars:
-                            return setting_vars[var_name]
-        except Exception:
-            pass
-    return None
+def _get_variable_value_for_visibility(var_name, target_character_name, actual_player_name, workflow_data_dir, tab_data, snapshot=None):
+    if snapshot is None:
+        snapshot = _visibility_snapshot(target_character_name, workflow_data_dir, tab_data)
+    return _resolve_visibility_variables(snapshot, var_name).get(var_name)
 
 def _find_setting_file_prioritizing_game_dir(self, workflow_data_dir, target_setting_name):
-    if not target_setting_name:
+    if not target_setting_name or not workflow_data_dir:
         return None, None
-    session_settings_dir = os.path.join(workflow_data_dir, 'game', 'settings')
-    if os.path.isdir(session_settings_dir):
-        for root, dirs, files in os.walk(session_settings_dir):
-            dirs[:] = [d for d in dirs if d.lower() != 'saves']
-            for filename in files:
-                if filename.lower().endswith('_setting.json'):
-                    file_path = os.path.join(root, filename)
-                    setting_data = _load_json_safely(file_path)
-                    if setting_data.get('name') == target_setting_name:
-                        return file_path, 'game'
-    base_settings_dir = os.path.join(workflow_data_dir, 'resources', 'data files', 'settings')
-    if os.path.isdir(base_settings_dir):
-        for root, dirs, files in os.walk(base_settings_dir):
-            dirs[:] = [d for d in dirs if d.lower() != 'saves']
-            for filename in files:
-                if filename.lower().endswith('_setting.json'):
-                    file_path = os.path.join(root, filename)
-                    setting_data = _load_json_safely(file_path)
-                    if setting_data.get('name') == target_setting_name:
-                        return file_path, 'resources'
-    return None, None
+    return get_entity_registry(workflow_data_dir).find_setting(target_setting_name)
 
 def _find_actor_file_path(self, workflow_data_dir, actor_name):
-    if not hasattr(self, '_actor_name_to_file_cache'):
-        self._actor_name_to_file_cache = {}
-        self._actor_name_to_actual_name = {}
-        return _rebuild_actor_cache(self, workflow_data_dir, actor_name)
-    normalized_name = actor_name.strip().lower().replace(' ', '_')
-    if normalized_name in self._actor_name_to_file_cache:
-        file_path = self._actor_name_to_file_cache[normalized_name]
-        return file_path
-    return _rebuild_actor_cache(self, workflow_data_dir, actor_name)
+    if not isinstance(actor_name, str) or not workflow_data_dir:
+        return None
+    registry = get_entity_registry(workflow_data_dir)
+    file_path = registry.find_actor(actor_name)
+    _sync_actor_name_caches(self, registry)
+    return file_path
+
+def _sync_actor_name_caches(self, registry):
+    if self is None:
+        return
+    cache_key = (registry.workflow_data_dir, registry.actor_generation())
+    if getattr(self, '_actor_name_cache_key', None) == cache_key and getattr(self, '_actor_name_to_actual_name', None):
+        return
+    self._actor_name_to_actual_name = registry.actor_names()
+    self._actor_name_cache_key = (registry.workflow_data_dir, registry.actor_generation())
 
 def _rebuild_actor_cache(self, workflow_data_dir, actor_name=None):
-    self._actor_name_to_file_cache = {}
-    self._actor_name_to_actual_name = {}
-    found_file = None
     if actor_name is not None and not isinstance(actor_name, str):
         return None
-    session_actors_dir = os.path.join(workflow_data_dir, 'game', 'actors')
-    if os.path.isdir(session_actors_dir):
-        for filename in os.listdir(session_actors_dir):
-            if filename.lower().endswith('.json'):
-                file_path = os.path.join(session_actors_dir, filename)
-                data = _load_json_safely(file_path)
-                if data and 'name' in data:
-                    actual_name = data.get('name')
-                    filename_base = os.path.splitext(filename)[0]
-                    normalized_actual = actual_name.strip().lower().replace(' ', '_')
-                    normalized_filename = filename_base.strip().lower()
-                    self._actor_name_to_file_cache[normalized_actual] = file_path
-                    self._actor_name_to_file_cache[normalized_filename] = file_path
-                    self._actor_name_to_actual_name[normalized_actual] = actual_name
-                    self._actor_name_to_actual_name[normalized_filename] = actual_name
-                    if actor_name and (actor_name == actual_name or 
-                                        actor_name.strip().lower().replace(' ', '_') == normalized_actual or
-                                        actor_name.strip().lower() == normalized_filename):
-                        found_file = file_path
-    base_actors_dir = os.path.join(workflow_data_dir, 'resources', 'data files', 'actors')
-    if os.path.isdir(base_actors_dir):
-        for filename in os.listdir(base_actors_dir):
-            if filename.lower().endswith('.json'):
-                file_path = os.path.join(base_actors_dir, filename)
-                data = _load_json_safely(file_path)
-                if data and 'name' in data:
-                    actual_name = data.get('name')
-                    filename_base = os.path.splitext(filename)[0]
-                    normalized_actual = actual_name.strip().lower().replace(' ', '_')
-                    normalized_filename = filename_base.strip().lower()
-                    if normalized_actual not in self._actor_name_to_file_cache:
-                        self._actor_name_to_file_cache[normalized_actual] = file_path
-                        self._actor_name_to_actual_name[normalized_actual] = actual_name
-                    if normalized_filename not in self._actor_name_to_file_cache:
-                        self._actor_name_to_file_cache[normalized_filename] = file_path
-                        self._actor_name_to_actual_name[normalized_filename] = actual_name
-                    if not found_file and actor_name and (actor_name == actual_name or 
-                                                        actor_name.strip().lower().replace(' ', '_') == normalized_actual or
-                                                        actor_name.strip().lower() == normalized_filename):
-                        found_file = file_path
-    return found_file
+    registry = get_entity_registry(workflow_data_dir)
+    registry.refresh()
+    _sync_actor_name_caches(self, registry)
+    return registry.find_actor(actor_name) if actor_name else None
 
 def _load_json_safely(file_path):
-    if not file_path or not os.path.isfile(file_path):
+    if not file_path:
+        return {}
+    get_variable_store().flush(file_path)
+    if not os.path.isfile(file_path):
         return {}
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -921,6 +738,7 @@ def _save_json_safely(file_path, data):
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        note_entity_file_saved(file_path, data)
         return True
     except (IOError, OSError) as e:
         return False
@@ -931,42 +749,18 @@ def _find_player_character_file(workflow_data_dir):
     actors_dir = os.path.join(workflow_data_dir, 'resources', 'data files', 'actors')
     if not os.path.isdir(actors_dir):
         return None, None
-    for filename in os.listdir(actors_dir):
-        if filename.lower().endswith('.json'):
-            file_path = os.path.join(actors_dir, filename)
-            data = _load_json_safely(file_path)
-            if data and data.get('isPlayer') is True:
-                player_name = data.get('name')
-                if player_name:
-                    return file_path, player_name
-    return None, None
+    return get_entity_layer(actors_dir, 'actors').find_player()
 
 def _scan_settings_for_player(settings_base_dir, player_name):
     if not os.path.isdir(settings_base_dir):
         return False
-    for root, dirs, files in os.walk(settings_base_dir):
-        dirs[:] = [d for d in dirs if d.lower() != 'saves'] 
-        for filename in files:
-            if filename.lower().endswith('_setting.json'):
-                file_path = os.path.join(root, filename)
-                setting_data = _load_json_safely(file_path)
-                characters_list = setting_data.get('characters')
-                if isinstance(characters_list, list) and player_name in characters_list:
-                    return True
-    return False
+    file_path, _ = get_entity_layer(settings_base_dir, 'settings').find_character(player_name)
+    return file_path is not None
 
 def _find_setting_file_by_name(settings_base_dir, target_setting_name):
     if not os.path.isdir(settings_base_dir) or not target_setting_name:
         return None
-    for root, dirs, files in os.walk(settings_base_dir):
-        dirs[:] = [d for d in dirs if d.lower() != 'saves']
-        for filename in files:
-            if filename.lower().endswith('_setting.json'):
-                file_path = os.path.join(root, filename)
-                setting_data = _load_json_safely(file_path)
-                if setting_data.get('name') == target_setting_name:
-                    return file_path
-    return None
+    return find_entity_in_dir(settings_base_dir, 'settings', target_setting_name)
 
 def ensure_player_in_origin_setting(workflow_data_dir):
     player_file_path, player_name = _find_player_character_file(workflow_data_dir)
@@ -998,56 +792,14 @@ def _get_player_current_setting_name(workflow_data_dir):
     player_file_path, player_name = _find_player_character_file(workflow_data_dir)
     if not player_name:
         return "Unknown Setting"
-    session_settings_dir = os.path.join(workflow_data_dir, 'game', 'settings')
-    if os.path.isdir(session_settings_dir):
-        found_settings = []
-        for root, dirs, files in os.walk(session_settings_dir):
-            dirs[:] = [d for d in dirs if d.lower() != 'saves']
-            for filename in files:
-                if filename.lower().endswith('_setting.json'):
-                    file_path = os.path.join(root, filename)
-                    setting_data = _load_json_safely(file_path)
-                    if setting_data:
-                        characters_list = setting_data.get('characters')
-                        setting_name = setting_data.get('name', os.path.basename(root))
-                        found_settings.append({
-                            'path': file_path,
-                            'name': setting_name,
-                            'characters': characters_list,
-                            'has_player': isinstance(characters_list, list) and player_name in characters_list
-                        })
-        for setting in found_settings:
-            if setting['has_player']:
-                return setting['name']
-    settings_base_dir = os.path.join(workflow_data_dir, 'resources', 'data files', 'settings')
-    if not os.path.isdir(settings_base_dir):
-        variables_file = os.path.join(workflow_data_dir, 'game', BASE_VARIABLES_FILE)
-        variables_data = _load_json_safely(variables_file)
-        origin_setting_name = variables_data.get('origin', "Unknown Setting") if variables_data else "Unknown Setting"
-        return origin_setting_name
-    found_base_settings = []
-    for root, dirs, files in os.walk(settings_base_dir):
-        dirs[:] = [d for d in dirs if d.lower() != 'saves']
-        for filename in files:
-            if filename.lower().endswith('_setting.json'):
-                file_path = os.path.join(root, filename)
-                setting_data = _load_json_safely(file_path)
-                if setting_data:
-                    characters_list = setting_data.get('characters')
-                    setting_name = setting_data.get('name', os.path.basename(root))
-                    found_base_settings.append({
-                        'path': file_path,
-                        'name': setting_name,
-                        'characters': characters_list,
-                        'has_player': isinstance(characters_list, list) and player_name in characters_list
-                    })
-    for setting in found_base_settings:
-        if setting['has_player']:
-            return setting['name']
+    _, setting_name, _ = get_entity_registry(workflow_data_dir).find_character_setting(player_name)
+    if setting_name:
+        return setting_name
     variables_file = os.path.join(workflow_data_dir, 'game', BASE_VARIABLES_FILE)
     variables_data = _load_json_safely(variables_file)
     origin_setting_name = variables_data.get('origin', "Unknown Setting") if variables_data else "Unknown Setting"
     return origin_setting_name
+
 def update_top_splitter_location_text(tab_data):
     if not tab_data or not isinstance(tab_data, dict):
         return
@@ -1076,26 +828,17 @@ def reset_player_to_origin(workflow_data_dir):
     if not origin_setting_file:
         return False
     player_removed = False
-    for root, dirs, files in os.walk(settings_base_dir):
-        dirs[:] = [d for d in dirs if d.lower() != 'saves']
-        for filename in files:
-            if filename.lower().endswith('_setting.json'):
-                file_path = os.path.join(root, filename)
-                setting_data = _load_json_safely(file_path)
-                if not isinstance(setting_data, dict) or 'characters' not in setting_data:
-                    continue
-                characters_list = setting_data.get('characters', [])
-                if not isinstance(characters_list, list):
-                    setting_data['characters'] = []
-                    characters_list = []
-                if player_name in characters_list:
-                    setting_name = setting_data.get('name', os.path.basename(root))
-                    if file_path == origin_setting_file:
-                        return False
-                    characters_list.remove(player_name)
-                    setting_data['characters'] = characters_list
-                    if _save_json_safely(file_path, setting_data):
-                        player_removed = True
+    for file_path in get_entity_layer(settings_base_dir, 'settings').settings_with_character(player_name):
+        setting_data = _load_json_safely(file_path)
+        characters_list = setting_data.get('characters')
+        if not isinstance(characters_list, list) or player_name not in characters_list:
+            continue
+        if file_path == origin_setting_file:
+            return False
+        characters_list.remove(player_name)
+        setting_data['characters'] = characters_list
+        if _save_json_safely(file_path, setting_data):
+            player_removed = True
     origin_data = _load_json_safely(origin_setting_file)
     if not isinstance(origin_data, dict):
         return False
@@ -0,0 +1,285 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+from core.entity_registry import note_entity_file_saved
+
+GLOBAL_SCOPE = 'global'
+ACTOR_SCOPE = 'actor'
+SETTING_SCOPE = 'setting'
+NESTED_VARIABLES_KEY = 'variables'
+
+_store = None
+_store_lock = threading.Lock()
+
+class VariableChange:
+    __slots__ = ('scope', 'owner', 'name', 'old_value', 'new_value', 'file_path')
+
+    def __init__(self, scope, owner, name, old_value, new_value, file_path):
+        self.scope = scope
+        self.owner = owner
+        self.name = name
+        self.old_value = old_value
+        self.new_value = new_value
+        self.file_path = file_path
+
+    def __repr__(self):
+        return f"VariableChange({self.scope}:{self.owner or ''}.{self.name}: {self.old_value!r} -> {self.new_value!r})"
+
+class VariableNamespace:
+    def __init__(self, file_path, nested_key, scope, owner):
+        self.file_path = file_path
+        self.nested_key = nested_key
+        self.scope = scope
+        self.owner = owner
+        self.values = {}
+        self.signature = None
+        self.loaded = False
+        self.dirty = set()
+        self.replaced = False
+
+def _file_signature(file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _read_json(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+        if not content:
+            return {}
+        data = json.loads(content)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, UnicodeDecodeError) as e:
+        print(f"Warning: Could not read variables from {file_path}: {e}")
+        return None
+    return data if isinstance(data, dict) else None
+
+def _diff(namespace, old_values, new_values):
+    changes = []
+    for name in old_values.keys() | new_values.keys():
+        old_value = old_values.get(name)
+        new_value = new_values.get(name)
+        if old_value != new_value or (name in old_values) != (name in new_values):
+            changes.append(VariableChange(namespace.scope, namespace.owner, name, old_value, new_value, namespace.file_path))
+    return changes
+
+class VariableStore:
+    def __init__(self):
+        self._namespaces = {}
+        self._subscribers = {}
+        self._next_token = 0
+        self._batch_depth = 0
+        self._lock = threading.RLock()
+
+    def _namespace(self, file_path, nested_key, scope, owner):
+        key = os.path.normpath(file_path)
+        namespace = self._namespaces.get(key)
+        if namespace is None:
+            namespace = VariableNamespace(key, nested_key, scope, owner)
+            self._namespaces[key] = namespace
+        elif owner and not namespace.owner:
+            namespace.owner = owner
+        return namespace
+
+    def _refresh(self, namespace, changes):
+        signature = _file_signature(namespace.file_path)
+        if namespace.loaded and signature == namespace.signature:
+            return
+        data = _read_json(namespace.file_path) if signature is not None else {}
+        if data is None:
+            if not namespace.loaded:
+                namespace.loaded = True
+                namespace.signature = signature
+            return
+        values = data.get(namespace.nested_key, {}) if namespace.nested_key else data
+        values = dict(values) if isinstance(values, dict) else {}
+        if namespace.replaced:
+            values = dict(namespace.values)
+        else:
+            for name in namespace.dirty:
+                if name in namespace.values:
+                    values[name] = namespace.values[name]
+                else:
+                    values.pop(name, None)
+        if namespace.loaded:
+            changes.extend(_diff(namespace, namespace.values, values))
+        namespace.values = values
+        namespace.signature = signature
+        namespace.loaded = True
+
+    def _write(self, namespace):
+        if namespace.nested_key:
+            data = _read_json(namespace.file_path)
+            if data is None or _file_signature(namespace.file_path) is None:
+                print(f"Error saving variables: {namespace.file_path} is missing or unreadable")
+                return False
+            data[namespace.nested_key] = dict(namespace.values)
+        else:
+            data = dict(namespace.values)
+        try:
+            file_dir = os.path.dirname(namespace.file_path)
+            if file_dir:
+                os.makedirs(file_dir, exist_ok=True)
+            with open(namespace.file_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error saving variables file {namespace.file_path}: {e}")
+            return False
+        if namespace.nested_key:
+            note_entity_file_saved(namespace.file_path, data)
+        namespace.signature = _file_signature(namespace.file_path)
+        namespace.dirty.clear()
+        namespace.replaced = False
+        return True
+
+    def _notify(self, changes):
+        if not changes:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for callback, scope, names in subscribers:
+            relevant = [change for change in changes
+                        if (scope is None or change.scope == scope) and (names is None or change.name in names)]
+            if not relevant:
+                continue
+            try:
+                callback(relevant)
+            except Exception as e:
+                print(f"Error in variable change subscriber {callback}: {e}")
+
+    def variables(self, file_path, nested_key=None, scope=GLOBAL_SCOPE, owner=None):
+        if not file_path:
+            return {}
+        changes = []
+        with self._lock:
+            namespace = self._namespace(file_path, nested_key, scope, owner)
+            self._refresh(namespace, changes)
+            values = dict(namespace.values)
+        self._notify(changes)
+        return values
+
+    def get(self, file_path, name, default=None, nested_key=None, scope=GLOBAL_SCOPE, owner=None):
+        return self.variables(file_path, nested_key, scope, owner).get(name, default)
+
+    def modify(self, file_path, mutator, nested_key=None, scope=GLOBAL_SCOPE, owner=None):
+        if not file_path:
+            return False
+        changes = []
+        with self._lock:
+            namespace = self._namespace(file_path, nested_key, scope, owner)
+            self._refresh(namespace, changes)
+            values = dict(namespace.values)
+            mutator(values)
+            own_changes = _diff(namespace, namespace.values, values)
+            if not own_changes:
+                saved = True
+            else:
+                namespace.values = values
+                namespace.dirty.update(change.name for change in own_changes)
+                saved = True if self._batch_depth else self._write(namespace)
+            changes.extend(own_changes)
+        self._notify(changes)
+        return saved
+
+    def set(self, file_path, name, value, nested_key=None, scope=GLOBAL_SCOPE, owner=None):
+        return self.modify(file_path, lambda values: values.__setitem__(name, value), nested_key, scope, owner)
+
+    def update(self, file_path, updates, nested_key=None, scope=GLOBAL_SCOPE, owner=None):
+        return self.modify(file_path, lambda values: values.update(updates), nested_key, scope, owner)
+
+    def replace(self, file_path, new_values, nested_key=None, scope=GLOBAL_SCOPE, owner=None):
+        if not file_path:
+            return False
+        changes = []
+        with self._lock:
+            namespace = self._namespace(file_path, nested_key, scope, owner)
+            self._refresh(namespace, changes)
+            new_values = dict(new_values or {})
+            own_changes = _diff(namespace, namespace.values, new_values)
+            namespace.values = new_values
+            namespace.replaced = True
+            saved = True if self._batch_depth else self._write(namespace)
+            changes.extend(own_changes)
+        self._notify(changes)
+        return saved
+
+    def flush(self, file_path=None):
+        changes = []
+        with self._lock:
+            if file_path:
+                namespace = self._namespaces.get(os.path.normpath(file_path))
+                pending = [namespace] if namespace else []
+            else:
+                pending = list(self._namespaces.values())
+            ok = True
+            for namespace in pending:
+                if namespace.dirty or namespace.replaced:
+                    self._refresh(namespace, changes)
+                    ok = self._write(namespace) and ok
+        self._notify(changes)
+        return ok
+
+    @contextmanager
+    def batch(self):
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
+
+    def subscribe(self, callback, scope=None, names=None):
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = (callback, scope, set(names) if names is not None else None)
+            return self._next_token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+def get_variable_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = VariableStore()
+        return _store
+
+def global_variables_file(workflow_data_dir):
+    if not workflow_data_dir:
+        return None
+    return os.path.join(workflow_data_dir, 'game', 'variables.json')
+
+def actor_variables_file(ui, workflow_data_dir, actor_name):
+    if not workflow_data_dir or not actor_name:
+        return None
+    from core.utils import _find_actor_file_path
+    return _find_actor_file_path(ui, workflow_data_dir, actor_name)
+
+def setting_variables_file(ui, workflow_data_dir, setting_name):
+    if not workflow_data_dir or not setting_name or setting_name == "Unknown Setting":
+        return None
+    from core.utils import _find_setting_file_prioritizing_game_dir
+    return _find_setting_file_prioritizing_game_dir(ui, workflow_data_dir, setting_name)[0]
+
+def load_actor_variables(ui, workflow_data_dir, actor_name):
+    file_path = actor_variables_file(ui, workflow_data_dir, actor_name)
+    return get_variable_store().variables(file_path, NESTED_VARIABLES_KEY, ACTOR_SCOPE, actor_name) if file_path else {}
+
+def load_setting_variables(ui, workflow_data_dir, setting_name):
+    file_path = setting_variables_file(ui, workflow_data_dir, setting_name)
+    return get_variable_store().variables(file_path, NESTED_VARIABLES_KEY, SETTING_SCOPE, setting_name) if file_path else {}
+
+def set_actor_variable(actor_path, actor_name, name, value):
+    return get_variable_store().set(actor_path, name, value, NESTED_VARIABLES_KEY, ACTOR_SCOPE, actor_name)
+
+def set_setting_variable(setting_path, setting_name, name, value):
+    return get_variable_store().set(setting_path, name, value, NESTED_VARIABLES_KEY, SETTING_SCOPE, setting_name)
@@ -0,0 +1,159 @@
+import re
+from functools import lru_cache
+from core.utils import _get_player_character_name, _get_player_current_setting_name
+from core.variable_store import get_variable_store, global_variables_file, load_actor_variables, load_setting_variables
+
+TEMPLATE_CACHE_SIZE = 2048
+_VARIABLE_PATTERN = r'\[(global|player|actor|character|setting),\s*([^,\]]+?)\s*\]'
+_TOKEN_PATTERN = r'\((?i:character|player|setting)\)'
+_TEMPLATE_RE = re.compile(_VARIABLE_PATTERN + '|' + _TOKEN_PATTERN)
+_CHARACTER_GUARD_RE = re.compile(r'[^,\]]*\]')
+_NAME_TOKEN_RE = re.compile(r'\((player|setting)\)', re.IGNORECASE)
+_PLACEHOLDER_RE = re.compile(r'\((player|character|setting)\)', re.IGNORECASE)
+
+class VariableSnapshot:
+    def __init__(self, tab_data, actor_name_context=None, global_loader=None, ui=None):
+        self.tab_data = tab_data
+        self.actor_name_context = actor_name_context
+        self.workflow_data_dir = tab_data.get('workflow_data_dir') if tab_data else None
+        self._global_loader = global_loader
+        self._ui = ui
+        self._values = {}
+        self._actor_variables = {}
+
+    def _memo(self, key, loader):
+        if key not in self._values:
+            try:
+                self._values[key] = loader()
+            except Exception as e:
+                print(f"Error resolving '{key}' for variable substitution: {e}")
+                self._values[key] = None
+        return self._values[key]
+
+    def player_name(self):
+        if not self.workflow_data_dir:
+            return None
+        return self._memo('player_name', lambda: _get_player_character_name(self.workflow_data_dir))
+
+    def setting_name(self):
+        if not self.workflow_data_dir:
+            return None
+        return self._memo('setting_name', lambda: _get_player_current_setting_name(self.workflow_data_dir))
+
+    def _load_global_variables(self):
+        if self._global_loader is not None:
+            return self._global_loader()
+        return get_variable_store().variables(global_variables_file(self.workflow_data_dir))
+
+    def _load_setting_variables(self):
+        return load_setting_variables(self._ui, self.workflow_data_dir, self.setting_name())
+
+    def actor_variables(self, actor_name):
+        if not actor_name or not self.workflow_data_dir:
+            return {}
+        if actor_name not in self._actor_variables:
+            try:
+                variables = load_actor_variables(self._ui, self.workflow_data_dir, actor_name)
+            except Exception as e:
+                print(f"Error loading variables for actor '{actor_name}': {e}")
+                variables = {}
+            self._actor_variables[actor_name] = variables if isinstance(variables, dict) else {}
+        return self._actor_variables[actor_name]
+
+    def scope_variables(self, scope):
+        if not self.workflow_data_dir:
+            return {}
+        if scope == 'global':
+            variables = self._memo('global', self._load_global_variables)
+        elif scope == 'player':
+            return self.actor_variables(self.player_name())
+        elif scope in ('actor', 'character'):
+            return self.actor_variables(self.actor_name_context)
+        elif scope == 'setting':
+            variables = self._memo('setting', self._load_setting_variables)
+        else:
+            return {}
+        return variables if isinstance(variables, dict) else {}
+
+    def get(self, scope, var_name):
+        if not var_name:
+            return ""
+        return self.scope_variables(scope).get(var_name, "")
+
+    def token_value(self, token):
+        if token == 'character':
+            return self.actor_name_context or None
+        if token == 'player':
+            return self.player_name() or None
+        if token == 'setting':
+            setting_name = self.setting_name()
+            if setting_name and setting_name != "Unknown Setting":
+                return setting_name
+        return None
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(text):
+    segments = []
+    position = 0
+    for match in _TEMPLATE_RE.finditer(text):
+        start, end = match.span()
+        if match.group(1):
+            var_name = match.group(2).strip()
+            segment = ('var', match.group(1).lower(), var_name, bool(_NAME_TOKEN_RE.search(var_name)), match.group(0))
+        else:
+            token = match.group(0)[1:-1].lower()
+            if token == 'character' and ((start > 0 and text[start - 1] == '[') or _CHARACTER_GUARD_RE.match(text, end)):
+                continue
+            segment = ('token', token, match.group(0))
+        if start > position:
+            segments.append(text[position:start])
+        segments.append(segment)
+        position = end
+    if not segments:
+        return None
+    if position < len(text):
+        segments.append(text[position:])
+    return tuple(segments)
+
+def _resolve_var_name(var_name, snapshot):
+    def replace_token(match):
+        value = snapshot.token_value(match.group(1).lower())
+        return value if value else match.group(0)
+    return _NAME_TOKEN_RE.sub(replace_token, var_name).strip()
+
+def render_template(text, snapshot):
+    if not text or not isinstance(text, str):
+        return text
+    segments = compile_template(text)
+    if segments is None:
+        return text
+    parts = []
+    for segment in segments:
+        if isinstance(segment, str):
+            parts.append(segment)
+        elif segment[0] == 'token':
+            value = snapshot.token_value(segment[1])
+            parts.append(value if value else segment[2])
+        elif not snapshot.workflow_data_dir:
+            parts.append(segment[4])
+        else:
+            var_name = _resolve_var_name(segment[2], snapshot) if segment[3] else segment[2]
+            parts.append(str(snapshot.get(segment[1], var_name)))
+    return ''.join(parts)
+
+def render_templates(texts, snapshot):
+    return [render_template(text, snapshot) for text in texts]
+
+def substitute_placeholders(value_string, snapshot):
+    if not value_string or not isinstance(value_string, str):
+        return value_string
+    if '(' not in value_string:
+        return value_string
+    def replace_placeholder(match):
+        placeholder = match.group(1).lower()
+        if placeholder == 'character':
+            return snapshot.actor_name_context or ""
+        if placeholder == 'player':
+            return snapshot.player_name() or ""
+        return snapshot.setting_name() or ""
+    return _PLACEHOLDER_RE.sub(replace_placeholder, value_string)
@@ -6,6 +6,7 @@ import pygame
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QLabel, QPushButton, QMessageBox, QRadioButton, QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox, QCheckBox
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtWidgets import QApplication
+from rules.condition_compiler import compile_rules_conditions
 
 def is_valid_widget(widget):
     if not widget:
@@ -1904,6 +1905,7 @@ def _refresh_rules_from_json(main_ui, tab_index, rules_list):
                 except Exception as e:
                     print(f"Error loading rule from {fpath}: {e}")
         tab_data['thought_rules'] = loaded_rules
+        compile_rules_conditions(loaded_rules)
         main_ui._update_rules_display(loaded_rules, rules_list)
         if 'timer_rules_widget' in tab_data and tab_data['timer_rules_widget']:
             from rules.timer_rules_manager import _load_timer_rules
@@ -1,5 +1,6 @@
 import os
 import json
+import heapq
 import random
 import time
 import threading
@@ -7,6 +8,10 @@ from datetime import datetime, timedelta
 from PyQt5.QtCore import QObject, QTimer, pyqtSignal, Qt
 from PyQt5.QtGui import QFont
 from core.standalone_character_inference import run_single_character_post
+from core.variable_store import get_variable_store, actor_variables_file, ACTOR_SCOPE, SETTING_SCOPE, NESTED_VARIABLES_KEY
+
+MAX_TIMER_WAIT_MS = 2 ** 31 - 1
+TIMER_RETRY_MS = 1000
 
 class TimerInstance:
     def __init__(self, rule_data, character=None, tab_data=None):
@@ -18,6 +23,9 @@ class TimerInstance:
         self.interval_ms = self._calculate_interval_ms()
         self.start_time = None
         self.next_fire_time = None
+        self.time_multiplier = None
+        self.scheduler = None
+        self.generation = 0
 
     def _calculate_interval_ms(self):
         interval_ms = 60000
@@ -26,6 +34,7 @@ class TimerInstance:
             game_seconds = self._calculate_game_time_interval()
             if game_seconds > 0:
                 time_multiplier = self._get_time_multiplier()
+                self.time_multiplier = time_multiplier
                 real_seconds = game_seconds / time_multiplier if time_multiplier > 0 else game_seconds
                 interval_ms = int(real_seconds * 1000)
         else:
@@ -97,20 +106,47 @@ class TimerInstance:
         
         return 1.0
 
-    def start(self):
+    def _reschedule(self):
+        self.generation += 1
+        if self.scheduler is not None:
+            self.scheduler._schedule_timer(self)
+
+    def start(self, delay_ms=None):
         self.is_running = True
         self.start_time = datetime.now()
         if not hasattr(self, 'interval_ms') or self.interval_ms is None:
             self.interval_ms = self._calculate_interval_ms()
-        self.next_fire_time = self.start_time + timedelta(milliseconds=self.interval_ms)
+        self.next_fire_time = self.start_time + timedelta(milliseconds=self.interval_ms if delay_ms is None else delay_ms)
+        self._reschedule()
 
     def stop(self):
         self.is_running = False
+        self._reschedule()
 
     def recalculate_interval(self):
         self.interval_ms = self._calculate_interval_ms()
         if self.is_running:
             self.next_fire_time = datetime.now() + timedelta(milliseconds=self.interval_ms)
+            self._reschedule()
+
+    def apply_time_multiplier(self, time_multiplier):
+        try:
+            time_multiplier = float(time_multiplier)
+        except (TypeError, ValueError):
+            return False
+        if not self._should_use_game_time() or time_multiplier <= 0:
+            return False
+        old_multiplier = self.time_multiplier or 1.0
+        if old_multiplier == time_multiplier:
+            return False
+        scale = old_multiplier / time_multiplier
+        self.time_multiplier = time_multiplier
+        self.interval_ms = int(self.interval_ms * scale)
+        if self.is_running and self.next_fire_time:
+            remaining_ms = self.time_remaining_ms() * scale
+            self.next_fire_time = datetime.now() + timedelta(milliseconds=remaining_ms)
+            self._reschedule()
+        return True
 
     def time_remaining_ms(self):
         if not self.is_running or not self.next_fire_time:
@@ -131,23 +167,111 @@ class TimerInstance:
 
 class TimerManager(QObject):
     timer_action_signal = pyqtSignal(object, object, object)
+    _rearm_signal = pyqtSignal()
+    _variables_changed_signal = pyqtSignal(object)
     def __init__(self, parent=None):
         super().__init__(parent)
         self.active_timers = {}
         self.lock = threading.RLock()
         self.main_timer = QTimer(self)
+        self.main_timer.setSingleShot(True)
         self.main_timer.timeout.connect(self._check_timers)
-        self.main_timer.start(1000)
+        self._rearm_signal.connect(self._arm_main_timer, Qt.QueuedConnection)
+        self._timer_heap = []
+        self._timer_heap_seq = 0
         self._creating_timers = set()
         self._timers_paused = False
+        self._variables_changed_signal.connect(self._on_variables_changed, Qt.QueuedConnection)
+        self._variable_subscription = get_variable_store().subscribe(self._variables_changed_signal.emit)
+
+    def _schedule_timer(self, timer):
+        with self.lock:
+            if timer.is_running and timer.next_fire_time:
+                self._timer_heap_seq += 1
+                heapq.heappush(self._timer_heap, (timer.next_fire_time, self._timer_heap_seq, timer.generation, timer))
+        self._rearm_signal.emit()
+
+    def _adopt_timer(self, timer):
+        timer.scheduler = self
+        return timer
+
+    def _discard_stale_entries(self):
+        heap = self._timer_heap
+        while heap:
+            fire_time, _, generation, timer = heap[0]
+            if timer.is_running and timer.generation == generation and timer.scheduler is self:
+                return fire_time
+            heapq.heappop(heap)
+        return None
+
+    def _pop_due_timers(self, now):
+        due = []
+        with self.lock:
+            while True:
+                fire_time = self._discard_stale_entries()
+                if fire_time is None or fire_time > now:
+                    break
+                due.append(heapq.heappop(self._timer_heap)[3])
+        return due
+
+    def _arm_main_timer(self):
+        with self.lock:
+            if self._timers_paused:
+                self.main_timer.stop()
+                return
+            fire_time = self._discard_stale_entries()
+        if fire_time is None:
+            self.main_timer.stop()
+            return
+        wait_ms = int((fire_time - datetime.now()).total_seconds() * 1000) + 1
+        self.main_timer.start(min(max(wait_ms, 0), MAX_TIMER_WAIT_MS))
 
     def pause_timers(self):
         with self.lock:
             self._timers_paused = True
+        self._rearm_signal.emit()
 
     def resume_timers(self):
         with self.lock:
             self._timers_paused = False
+        self._rearm_signal.emit()
+
+    def on_time_multiplier_changed(self, time_multiplier, tab_data=None):
+        with self.lock:
+            for tab_id, rules_dict in self.active_timers.items():
+                for rule_id, timers_dict in rules_dict.items():
+                    for timer_key, timer in timers_dict.items():
+                        if tab_data is not None and timer.tab_data is not tab_data:
+                            continue
+                        timer.apply_time_multiplier(time_multiplier)
+
+    def _on_variables_changed(self, changes):
+        changed_names = {change.name for change in changes}
+        main_ui = self.parent()
+        for tab_data in getattr(main_ui, 'tabs_data', None) or []:
+            if not tab_data or tab_data.get('id') is None:
+                continue
+            tab_id = str(tab_data.get('id'))
+            timer_rules = tab_data.get('timer_rules', [])
+            if not timer_rules:
+                timer_rules_widget = tab_data.get('timer_rules_widget')
+                if timer_rules_widget and hasattr(timer_rules_widget, 'get_timer_rules'):
+                    timer_rules = timer_rules_widget.get_timer_rules()
+            gated_rules = []
+            with self.lock:
+                running_rules = self.active_timers.get(tab_id, {})
+                for rule in timer_rules or []:
+                    if not rule or not rule.get('enabled', True) or rule.get('condition_type') != 'Variable':
+                        continue
+                    if (rule.get('rule_scope') or rule.get('scope', 'Global')) != 'Global' or running_rules.get(rule.get('id')):
+                        continue
+                    for condition in rule.get('condition_details', []):
+                        depends_on = 'datetime' if condition.get('type') == 'Game Time' else condition.get('name')
+                        if depends_on in changed_names:
+                            gated_rules.append(rule)
+                            break
+            if gated_rules:
+                self._process_timer_rules(gated_rules, None, None, tab_data, tab_id, check_newly_enabled=True)
 
     def _evaluate_variable_condition(self, condition, tab_data, character_name=None):
         if not condition:
@@ -169,12 +293,10 @@ class TimerManager(QObject):
             if not workflow_dir:
                 return False
             try:
-                from core.utils import _get_or_create_actor_data
-                actor_data, _ = _get_or_create_actor_data(self.parent(), workflow_dir, character_name)
-                if actor_data and 'variables' in actor_data:
-                    var_value = actor_data['variables'].get(var_name)
-                else:
+                actor_path = actor_variables_file(self.parent(), workflow_dir, character_name)
+                if not actor_path:
                     return False
+                var_value = get_variable_store().get(actor_path, var_name, None, NESTED_VARIABLES_KEY, ACTOR_SCOPE, character_name)
             except Exception:
                 return False
         elif scope == 'Player':
@@ -182,15 +304,14 @@ class TimerManager(QObject):
             if not workflow_dir:
                 return False
             try:
-                from core.utils import _get_player_character_name, _get_or_create_actor_data
+                from core.utils import _get_player_character_name
                 player_name = _get_player_character_name(workflow_dir)
                 if not player_name:
                     return False
-                actor_data, _ = _get_or_create_actor_data(self.parent(), workflow_dir, player_name)
-                if actor_data and 'variables' in actor_data:
-                    var_value = actor_data['variables'].get(var_name)
-                else:
+                actor_path = actor_variables_file(self.parent(), workflow_dir, player_name)
+                if not actor_path:
                     return False
+                var_value = get_variable_store().get(actor_path, var_name, None, NESTED_VARIABLES_KEY, ACTOR_SCOPE, player_name)
             except Exception:
                 return False
         elif scope == 'Setting':
@@ -205,12 +326,7 @@ class TimerManager(QObject):
                 session_settings_dir = os.path.join(workflow_dir, 'game', 'settings')
                 setting_file = _find_setting_file_by_name(session_settings_dir, setting_name)
                 if setting_file:
-                    with open(setting_file, 'r', encoding='utf-8') as f:
-                        setting_data = json.load(f)
-                    if 'variables' in setting_data:
-                        var_value = setting_data['variables'].get(var_name)
-                    else:
-                        return False
+                    var_value = get_variable_store().get(setting_file, var_name, None, NESTED_VARIABLES_KEY, SETTING_SCOPE, setting_name)
                 else:
                     return False
             except Exception:
@@ -510,7 +626,7 @@ class TimerManager(QObject):
                         if actual_timer_key_for_dict not in self.active_timers[tab_id][rule_id]:
                             self._creating_timers.add(timer_creation_id)
                             try:
-                                new_timer = TimerInstance(rule, timer_instance_character_binding, tab_data)
+                                new_timer = self._adopt_timer(TimerInstance(rule, timer_instance_character_binding, tab_data))
                                 self.active_timers[tab_id][rule_id][actual_timer_key_for_dict] = new_timer
                                 new_timer.start()
                                 self.save_timer_state(tab_data)
@@ -640,7 +756,7 @@ class TimerManager(QObject):
                         self.active_timers[tab_id][rule_id] = {}
                     existing_timer = self.active_timers[tab_id][rule_id].get(actual_timer_key_for_dict)
                     if not existing_timer:
-                        new_timer = TimerInstance(rule, timer_instance_character_binding, tab_data)
+                        new_timer = self._adopt_timer(TimerInstance(rule, timer_instance_character_binding, tab_data))
                         self.active_timers[tab_id][rule_id][actual_timer_key_for_dict] = new_timer
                         new_timer.start()
                         self.save_timer_state(tab_data)
@@ -655,17 +771,39 @@ class TimerManager(QObject):
     def _check_timers(self):
         if self._timers_paused:
             return
+        with self.lock:
+            popped = [(timer, timer.generation) for timer in self._pop_due_timers(datetime.now())]
+        try:
+            self._fire_due_timers(set(timer for timer, _ in popped))
+        except Exception as e:
+            print(f"[TIMER] Error processing due timers: {e}")
+        finally:
+            self._requeue_unprocessed_timers(popped)
+            self._arm_main_timer()
+
+    def _requeue_unprocessed_timers(self, popped):
+        retry_time = datetime.now() + timedelta(milliseconds=TIMER_RETRY_MS)
+        for timer, generation in popped:
+            if timer.is_running and timer.generation == generation and not getattr(timer, '_is_firing', False):
+                timer.next_fire_time = max(timer.next_fire_time, retry_time)
+                self._schedule_timer(timer)
+
+    def _fire_due_timers(self, due_timers):
         expired_timers = []
         timers_to_stop = []
-        current_time_for_check = datetime.now()
-        with self.lock:
-            for tab_id, rules_dict in self.active_timers.items():
-                for rule_id, timers_dict in rules_dict.items():
-                    for timer_key, timer in timers_dict.items():
-                        if timer.is_running:
-                            if hasattr(timer, '_is_firing') and timer._is_firing:
+        try:
+            with self.lock:
+                for tab_id, rules_dict in self.active_timers.items():
+                    if not due_timers:
+                        break
+                    for rule_id, timers_dict in rules_dict.items():
+                        for timer_key, timer in timers_dict.items():
+                            if timer not in due_timers:
                                 continue
-                            if timer.is_expired():
+                            due_timers.discard(timer)
+                            if timer.is_running:
+                                if hasattr(timer, '_is_firing') and timer._is_firing:
+                                    continue
                                 rule_data = timer.rule_data
                                 tab_data = timer.tab_data
                                 character_name = timer.character
@@ -682,51 +820,7 @@ class TimerManager(QObject):
                                             self.save_timer_state(tab_data)
                                     else:
                                         timers_to_stop.append((tab_id, rule_id, timer_key, timer))
-                            else:
-                                pass
-            for tab_id, rule_id, timer_key, timer in timers_to_stop:
-                timer.stop()
-                if tab_id in self.active_timers and rule_id in self.active_timers[tab_id] and timer_key in self.active_timers[tab_id][rule_id]:
-                    del self.active_timers[tab_id][rule_id][timer_key]
-                    if not self.active_timers[tab_id][rule_id]:
-                        del self.active_timers[tab_id][rule_id]
-                    if not self.active_timers[tab_id]:
-                        del self.active_timers[tab_id]
-                    if timer.tab_data:
-                        self.save_timer_state(timer.tab_data)
-
-            for tab_id, rule_id, timer_key, timer in expired_timers:
-                rule_data = timer.rule_data
-                tab_data = timer.tab_data
-                if tab_data:
-                    if not rule_data.get('actions'):
-                        timer._is_firing = False
-                        continue
-                else:
-                    timer._is_firing = False
-                    continue
-                
-                self.timer_action_signal.emit(timer, rule_data, tab_data)
-                
-                with self.lock:
-                    if tab_id in self.active_timers and rule_id in self.active_timers[tab_id]:
-                        for other_timer_key, other_timer in self.active_timers[tab_id][rule_id].items():
-                            if other_timer_key != timer_key and other_timer.is_running:
-                                other_timer.stop()
-                                other_timer.recalculate_interval()
-                                other_timer.start()
-                        if tab_data:
-                            self.save_timer_state(tab_data)
-                
-                conditions_still_met_after_firing = self._evaluate_rule_conditions(rule_data, tab_data, timer.character)
-                is_recurring = rule_data.get('recurring', False)
-                
-                if conditions_still_met_after_firing or is_recurring:
-                    timer.recalculate_interval()
-                    timer.start()
-                    if tab_data:
-                        self.save_timer_state(tab_data)
-                else:
+                for tab_id, rule_id, timer_key, timer in timers_to_stop:
                     timer.stop()
                     if tab_id in self.active_timers and rule_id in self.active_timers[tab_id] and timer_key in self.active_timers[tab_id][rule_id]:
                         del self.active_timers[tab_id][rule_id][timer_key]
@@ -734,11 +828,56 @@ class TimerManager(QObject):
                             del self.active_timers[tab_id][rule_id]
                         if not self.active_timers[tab_id]:
                             del self.active_timers[tab_id]
+                        if timer.tab_data:
+                            self.save_timer_state(timer.tab_data)
+
+                for tab_id, rule_id, timer_key, timer in expired_timers:
+                    rule_data = timer.rule_data
+                    tab_data = timer.tab_data
+                    if tab_data:
+                        if not rule_data.get('actions'):
+                            timer._is_firing = False
+                            continue
+                    else:
+                        timer._is_firing = False
+                        continue
+                
+                    self.timer_action_signal.emit(timer, rule_data, tab_data)
+                
+                    with self.lock:
+                        if tab_id in self.active_timers and rule_id in self.active_timers[tab_id]:
+                            for other_timer_key, other_timer in self.active_timers[tab_id][rule_id].items():
+                                if other_timer_key != timer_key and other_timer.is_running:
+                                    other_timer.stop()
+                                    other_timer.recalculate_interval()
+                                    other_timer.start()
+                            if tab_data:
+                                self.save_timer_state(tab_data)
+                
+                    conditions_still_met_after_firing = self._evaluate_rule_conditions(rule_data, tab_data, timer.character)
+                    is_recurring = rule_data.get('recurring', False)
+                
+                    if conditions_still_met_after_firing or is_recurring:
+                        timer.recalculate_interval()
+                        timer.start()
                         if tab_data:
                             self.save_timer_state(tab_data)
+                    else:
+                        timer.stop()
+                        if tab_id in self.active_timers and rule_id in self.active_timers[tab_id] and timer_key in self.active_timers[tab_id][rule_id]:
+                            del self.active_timers[tab_id][rule_id][timer_key]
+                            if not self.active_timers[tab_id][rule_id]:
+                                del self.active_timers[tab_id][rule_id]
+                            if not self.active_timers[tab_id]:
+                                del self.active_timers[tab_id]
+                            if tab_data:
+                                self.save_timer_state(tab_data)
                 
+                    timer._is_firing = False
+        finally:
+            for _, _, _, timer in expired_timers:
                 timer._is_firing = False
-    
+
     def stop_all_timers(self):
         with self.lock:
             for tab_id, rules_dict in self.active_timers.items():
@@ -984,18 +1123,13 @@ class TimerManager(QObject):
                 if rule_id not in self.active_timers[tab_id]:
                     self.active_timers[tab_id][rule_id] = {}
                 try:
-                    timer_instance = TimerInstance(rule_data, character_binding, tab_data)
+                    timer_instance = self._adopt_timer(TimerInstance(rule_data, character_binding, tab_data))
                     self.active_timers[tab_id][rule_id][timer_key] = timer_instance
                     if timer_data.get('is_random', False):
                         timer_instance.recalculate_interval()
                     elif 'interval_ms' in timer_data:
                         timer_instance.interval_ms = timer_data['interval_ms']
-                    timer_instance.start()
-                    if time_remaining_ms > 0:
-                        now = datetime.now()
-                        timer_instance.next_fire_time = now + timedelta(milliseconds=time_remaining_ms)
-                    else:
-                        timer_instance.next_fire_time = datetime.now() + timedelta(milliseconds=1000)
+                    timer_instance.start(time_remaining_ms if time_remaining_ms > 0 else 1000)
                     restored_count += 1
                 except Exception:
                     pass
@@ -1125,7 +1259,7 @@ class TimerManager(QObject):
                             timer_key = 'global'
                         else:
                             timer_key = 'global'
-                        timer_instance = TimerInstance(rule, None, tab_data)
+                        timer_instance = self._adopt_timer(TimerInstance(rule, None, tab_data))
                         self.active_timers[tab_id][rule_id][timer_key] = timer_instance
                         timer_instance.start()
                     except Exception as e:
@@ -1243,6 +1377,7 @@ def _execute_set_var_action(main_ui, action, character_name, tab_data):
         from generate.generate_summary import generate_summary
         generated_value = generate_summary(main_ui, context_str, gen_instructions, var_name, scope, var_filepath, character_name, tab_data)
         var_value = generated_value
+    apply_operation = lambda variables: _apply_variable_operation(variables, var_name, var_value, operation)
     if scope == 'Character':
         if not character_name:
             character_name = action.get('actor_name', '')
@@ -1256,13 +1391,7 @@ def _execute_set_var_action(main_ui, action, character_name, tab_data):
             actor_data, actor_file = _get_or_create_actor_data(main_ui, workflow_dir, character_name)
             if not actor_data or not actor_file:
                 return
-            if 'variables' not in actor_data or not isinstance(actor_data['variables'], dict):
-                actor_data['variables'] = {}
-            _apply_variable_operation(actor_data['variables'], var_name, var_value, operation)
-            with open(actor_file, 'w', encoding='utf-8') as f:
-                json.dump(actor_data, f, indent=2, ensure_ascii=False)
-                f.flush()
-                os.fsync(f.fileno())
+            get_variable_store().modify(actor_file, apply_operation, NESTED_VARIABLES_KEY, ACTOR_SCOPE, character_name)
         except ImportError:
             pass
         except Exception as e:
@@ -1281,15 +1410,7 @@ def _execute_set_var_action(main_ui, action, character_name, tab_data):
 
             if not actor_data or not actor_file:
                 return
-            if 'variables' not in actor_data or not isinstance(actor_data['variables'], dict):
-                actor_data['variables'] = {}
-
-            _apply_variable_operation(actor_data['variables'], var_name, var_value, operation)
-
-            with open(actor_file, 'w', encoding='utf-8') as f:
-                json.dump(actor_data, f, indent=2, ensure_ascii=False)
-                f.flush()
-                os.fsync(f.fileno())
+            get_variable_store().modify(actor_file, apply_operation, NESTED_VARIABLES_KEY, ACTOR_SCOPE, player_name)
 
         except ImportError:
 
@@ -1310,15 +1431,7 @@ def _execute_set_var_action(main_ui, action, character_name, tab_data):
             setting_file = _find_setting_file_by_name(session_settings_dir, setting_name)
             if not setting_file:
                 return
-            with open(setting_file, 'r', encoding='utf-8') as f:
-                setting_data = json.load(f)
-            if 'variables' not in setting_data or not isinstance(setting_data['variables'], dict):
-                setting_data['variables'] = {}
-            _apply_variable_operation(setting_data['variables'], var_name, var_value, operation)
-            with open(setting_file, 'w', encoding='utf-8') as f:
-                json.dump(setting_data, f, indent=2, ensure_ascii=False)
-                f.flush()
-                os.fsync(f.fileno())
+            get_variable_store().modify(setting_file, apply_operation, NESTED_VARIABLES_KEY, SETTING_SCOPE, setting_name)
         except ImportError:
             pass
         except Exception as e:
@@ -0,0 +1,128 @@
+import math
+import threading
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QObject, QRect, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter, QColor
+
+CRT_TILE_SIZE = 512
+CRT_PYRAMID_CACHE_SIZE = 2
+
+_pyramids = OrderedDict()
+_lock = threading.Lock()
+
+def crt_pyramid_key(image, border_color):
+    return image.cacheKey(), QColor(border_color).rgba()
+
+def process_crt_image(image, border_color):
+    grayscale = image.convertToFormat(QImage.Format_Grayscale8)
+    processed = QImage(grayscale.size(), QImage.Format_ARGB32_Premultiplied)
+    processed.fill(Qt.transparent)
+    painter = QPainter(processed)
+    painter.drawImage(0, 0, grayscale)
+    painter.setCompositionMode(QPainter.CompositionMode_Overlay)
+    painter.fillRect(processed.rect(), QColor(20, 20, 20, 120))
+    painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+    painter.fillRect(processed.rect(), QColor(0, 0, 0, 120))
+    painter.setCompositionMode(QPainter.CompositionMode_Multiply)
+    painter.fillRect(processed.rect(), QColor(border_color))
+    painter.end()
+    return processed.convertToFormat(QImage.Format_RGB32)
+
+class CrtPyramidLevel:
+    def __init__(self, image, tile_size):
+        self.width = image.width()
+        self.height = image.height()
+        self.tiles = {}
+        for ty in range(0, self.height, tile_size):
+            for tx in range(0, self.width, tile_size):
+                tile = image.copy(tx, ty, min(tile_size, self.width - tx), min(tile_size, self.height - ty))
+                self.tiles[(tx // tile_size, ty // tile_size)] = tile
+
+class CrtPyramid:
+    def __init__(self, width, height, levels, tile_size=CRT_TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.levels = levels
+        self.tile_size = tile_size
+
+    def level_index(self, widget_pixels_per_image_pixel):
+        if widget_pixels_per_image_pixel <= 0:
+            return len(self.levels) - 1
+        index = int(math.floor(math.log2(1.0 / widget_pixels_per_image_pixel))) if widget_pixels_per_image_pixel < 1 else 0
+        return max(0, min(index, len(self.levels) - 1))
+
+    def draw(self, painter, target_rect, clip_rect):
+        visible = clip_rect.intersected(target_rect)
+        if visible.isEmpty() or target_rect.width() <= 0 or target_rect.height() <= 0:
+            return False
+        level = self.levels[self.level_index(target_rect.width() / self.width)]
+        x_scale = target_rect.width() / level.width
+        y_scale = target_rect.height() / level.height
+        first_x = max(0, int((visible.left() - target_rect.left()) / x_scale) // self.tile_size)
+        first_y = max(0, int((visible.top() - target_rect.top()) / y_scale) // self.tile_size)
+        last_x = min((level.width - 1) // self.tile_size, int((visible.right() - target_rect.left()) / x_scale) // self.tile_size)
+        last_y = min((level.height - 1) // self.tile_size, int((visible.bottom() - target_rect.top()) / y_scale) // self.tile_size)
+
+        def edge_x(pixel):
+            return int(math.floor(target_rect.left() + min(pixel, level.width) * x_scale))
+
+        def edge_y(pixel):
+            return int(math.floor(target_rect.top() + min(pixel, level.height) * y_scale))
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+        for ty in range(first_y, last_y + 1):
+            top = edge_y(ty * self.tile_size)
+            bottom = edge_y((ty + 1) * self.tile_size)
+            for tx in range(first_x, last_x + 1):
+                tile = level.tiles.get((tx, ty))
+                if tile is None:
+                    continue
+                left = edge_x(tx * self.tile_size)
+                right = edge_x((tx + 1) * self.tile_size)
+                if right > left and bottom > top:
+                    painter.drawImage(QRect(left, top, right - left, bottom - top), tile)
+        painter.restore()
+        return True
+
+def build_crt_pyramid(image, border_color, tile_size=CRT_TILE_SIZE):
+    processed = process_crt_image(image, border_color)
+    levels = [CrtPyramidLevel(processed, tile_size)]
+    while max(processed.width(), processed.height()) > tile_size:
+        processed = processed.scaled(max(1, processed.width() // 2), max(1, processed.height() // 2),
+                                     Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        levels.append(CrtPyramidLevel(processed, tile_size))
+    return CrtPyramid(image.width(), image.height(), levels, tile_size)
+
+def get_cached_crt_pyramid(key):
+    with _lock:
+        pyramid = _pyramids.get(key)
+        if pyramid is not None:
+            _pyramids.move_to_end(key)
+        return pyramid
+
+def remember_crt_pyramid(key, pyramid):
+    with _lock:
+        _pyramids[key] = pyramid
+        _pyramids.move_to_end(key)
+        while len(_pyramids) > CRT_PYRAMID_CACHE_SIZE:
+            _pyramids.popitem(last=False)
+
+class CrtPyramidBuilder(QObject):
+    pyramid_built = pyqtSignal(object, object)
+    build_failed = pyqtSignal(object, str)
+
+    def __init__(self, key, image, border_color):
+        super().__init__()
+        self.key = key
+        self.image = image
+        self.border_color = QColor(border_color)
+
+    def build(self):
+        try:
+            pyramid = build_crt_pyramid(self.image, self.border_color)
+            remember_crt_pyramid(self.key, pyramid)
+            self.pyramid_built.emit(self.key, pyramid)
+        except Exception as e:
+            self.build_failed.emit(self.key, f"Error building CRT map layer: {e}")
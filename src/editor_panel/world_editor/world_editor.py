@@ -11,6 +11,7 @@ import shutil
 from editor_panel.world_editor.world_editor_auto import handle_dot_deletion, set_automate_section_mode, generate_setting_file
 from editor_panel.world_editor.region_toolbar import update_region_border_cache, _set_region_edit_mode
 from editor_panel.world_editor.world_editor_select import select_item
+from core.navigation_index import note_map_saved
 import pygame
 
 def sanitize_path_name(name):
@@ -65,6 +66,7 @@ class WorldEditorWidget(QWidget):
         self._location_selected_item_type = None
         self._location_selected_item_index = -1
         self._location_dragging_selection = False
+        self._map_edit_count = 0
         self.setObjectName("WorldEditorContainer")
         self._map_cache = {}
         self._last_map_key = None
@@ -408,7 +410,11 @@ class WorldEditorWidget(QWidget):
         self.nested_tab_widget.style().polish(self.nested_tab_widget)
         self.nested_tab_widget.update()
 
+    def _mark_map_edited(self):
+        self._map_edit_count += 1
+
     def _save_world_map_data(self):
+        self._mark_map_edited()
         if not self.current_world_name or not self.workflow_data_dir:
             return
         world_dir = os.path.join(self.workflow_data_dir, 'resources', 'data files', 'settings', self.current_world_name)
@@ -465,6 +471,7 @@ class WorldEditorWidget(QWidget):
         try:
             with open(map_data_file, 'w', encoding='utf-8') as f:
                 json.dump(json_data, f, indent=2)
+            note_map_saved(map_data_file, json_data)
             saved_mask_count = 0
             if os.path.isdir(region_resources_dir):
                 for file in os.listdir(region_resources_dir):
@@ -617,6 +624,7 @@ class WorldEditorWidget(QWidget):
             self._load_world_scale_settings(default_scale)
 
     def _save_location_map_data(self):
+        self._mark_map_edited()
         if not hasattr(self, 'current_world_folder_name') or not self.current_world_folder_name:
             return
         if not hasattr(self, 'workflow_data_dir') or not self.workflow_data_dir:
@@ -674,6 +682,7 @@ class WorldEditorWidget(QWidget):
         try:
             with open(map_data_file, 'w', encoding='utf-8') as f:
                 json.dump(json_data, f, indent=2)
+            note_map_saved(map_data_file, json_data)
         except Exception as e:
             print(f"Error saving location map data: {e}")
 
@@ -4662,6 +4671,7 @@ class WorldEditorWidget(QWidget):
         return os.path.join(default_region, sanitized_target)
 
     def _save_location_map_data(self):
+        self._mark_map_edited()
         if not hasattr(self, 'current_world_folder_name') or not self.current_world_folder_name:
             print("[ERROR] _save_location_map_data: current_world_folder_name is not set.")
             return
@@ -4719,7 +4729,7 @@ class WorldEditorWidget(QWidget):
         try:
             with open(map_data_file, 'w', encoding='utf-8') as f:
                 json.dump(json_data, f, indent=2)
-            pass
+            note_map_saved(map_data_file, json_data)
         except Exception as e:
             print(f"Error saving location map data: {e}")
 
@@ -1,9 +1,10 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QSlider, QSplitter, QFrame, QSizePolicy, QLineEdit, QTextEdit, QCheckBox
-from PyQt5.QtCore import Qt, QTimer, QRectF, QPointF, QEvent, QObject, QSize
+from PyQt5.QtCore import Qt, QTimer, QRectF, QPointF, QEvent, QObject, QSize, QThread
 from PyQt5.QtGui import QColor, QPen, QBrush, QPainter, QPainterPath, QPixmap, QImage
 from editor_panel.world_editor.world_editor_paint import paintEvent, mousePressEvent, mouseMoveEvent, mouseReleaseEvent, _find_item_at_pos
 from editor_panel.world_editor.world_editor_auto import create_automate_section, connect_automate_checkboxes
 from editor_panel.world_editor.features_toolbar import FeaturesToolbar
+from editor_panel.world_editor.crt_pyramid import CrtPyramidBuilder, crt_pyramid_key, get_cached_crt_pyramid
 import math
 import time
 
@@ -553,6 +554,12 @@ def _create_editor_layout(world_editor_ref, parent, toolbar_title, map_space_tit
            world_setting_dropdown, location_setting_dropdown, world_unlink_setting_btn if map_type == 'world' else location_unlink_setting_btn, \
            scale_number_input, scale_time_input, scale_unit_dropdown
 
+def _stop_crt_pyramid_threads(threads):
+    for builder_thread, _builder in list(threads):
+        builder_thread.quit()
+        builder_thread.wait()
+    threads.clear()
+
 class CRTEffectLabel(QLabel):
     def __init__(self, text, parent_editor, map_type, *args, **kwargs):
         super().__init__(text, *args, **kwargs)
@@ -598,6 +605,11 @@ class CRTEffectLabel(QLabel):
         self._pulse_timer.timeout.connect(self._pulse_animate)
         self._region_border_cache = {}
         self._last_visible_rect = None
+        self._crt_pyramid = None
+        self._crt_pyramid_key = None
+        self._crt_pyramid_threads = []
+        self.destroyed.connect(lambda _=None, threads=self._crt_pyramid_threads: _stop_crt_pyramid_threads(threads))
+        self._hover_hit_cache = None
         self._show_region_fills = True
         self._is_scrolling = False
         self._scroll_timer = QTimer(self)
@@ -908,6 +920,7 @@ class CRTEffectLabel(QLabel):
 
     def setBorderColor(self, color):
         self._border_color = QColor(color)
+        self._request_crt_pyramid()
         self.update()
 
     def setPixmap(self, pixmap, orig_image=None):
@@ -932,9 +945,48 @@ class CRTEffectLabel(QLabel):
             self.setMaximumSize(16777215, 16777215)
         self._zoom_level = 0
         self._pan = [0, 0]
+        self._request_crt_pyramid()
         self.updateGeometry()
         self.update()
 
+    def _request_crt_pyramid(self):
+        if self._crt_image is None or self._crt_image.isNull():
+            self._crt_pyramid = None
+            self._crt_pyramid_key = None
+            return
+        key = crt_pyramid_key(self._crt_image, self._border_color)
+        if key == self._crt_pyramid_key:
+            return
+        self._crt_pyramid_key = key
+        self._crt_pyramid = get_cached_crt_pyramid(key)
+        if self._crt_pyramid is not None:
+            return
+        builder_thread = QThread()
+        builder = CrtPyramidBuilder(key, self._crt_image, self._border_color)
+        builder.moveToThread(builder_thread)
+        self._crt_pyramid_threads.append((builder_thread, builder))
+        builder_thread.started.connect(builder.build)
+        builder.pyramid_built.connect(self._on_crt_pyramid_built)
+        builder.pyramid_built.connect(builder_thread.quit)
+        builder.build_failed.connect(lambda _key, message: print(message))
+        builder.build_failed.connect(builder_thread.quit)
+        builder_thread.finished.connect(builder.deleteLater)
+        builder_thread.finished.connect(builder_thread.deleteLater)
+        def cleanup_thread():
+            if (builder_thread, builder) in self._crt_pyramid_threads:
+                self._crt_pyramid_threads.remove((builder_thread, builder))
+        builder_thread.finished.connect(cleanup_thread)
+        builder_thread.start()
+
+    def closeEvent(self, event):
+        _stop_crt_pyramid_threads(self._crt_pyramid_threads)
+        super().closeEvent(event)
+
+    def _on_crt_pyramid_built(self, key, pyramid):
+        if key == self._crt_pyramid_key:
+            self._crt_pyramid = pyramid
+            self.update()
+
     def wheelEvent(self, event):
         angle = event.angleDelta().y()
         old_zoom_level = self._zoom_level
@@ -1033,6 +1085,7 @@ class CRTEffectLabel(QLabel):
                                 old_dot[0] = image_pos[0]
                                 old_dot[1] = image_pos[1]
                                 dots[selected_index] = tuple(old_dot)
+                                self.parent_editor._mark_map_edited()
                         self._last_mouse_pos = event.pos()
                         self.update()
                     return
@@ -1094,6 +1147,7 @@ class CRTEffectLabel(QLabel):
                             if len(dot_data) >= 6:
                                 dot_data[5] = new_region
                                 dots[selected_index] = tuple(dot_data)
+                                self.parent_editor._mark_map_edited()
                     save_method = f"_save_{self.map_type}_map_data"
                     if hasattr(self.parent_editor, save_method):
                         QTimer.singleShot(0, getattr(self.parent_editor, save_method))
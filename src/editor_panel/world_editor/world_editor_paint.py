@@ -742,7 +742,7 @@ def paintEvent(self, event):
     cursor_pos = self.mapFromGlobal(self.cursor().pos())
     if self.rect().contains(cursor_pos) and not getattr(self, '_is_scrolling', False):
         if not QApplication.mouseButtons():
-            item_type, item_index = self._find_item_at_pos(cursor_pos)
+            item_type, item_index = _cached_hover_hit(self, cursor_pos)
             if item_type == 'line':
                 self._hovered_line_index = item_index
     
@@ -763,7 +763,9 @@ def paintEvent(self, event):
             vis_rect = QRectF(self.rect())
             img_draw_rect = QRectF(x, y, draw_w, draw_h)
             visible_img_area_in_widget = vis_rect.intersected(img_draw_rect)
-            if not visible_img_area_in_widget.isEmpty() and draw_w > 1e-6 and draw_h > 1e-6:
+            crt_pyramid = getattr(self, '_crt_pyramid', None)
+            if (crt_pyramid is None or not crt_pyramid.draw(painter, img_draw_rect, vis_rect)) and \
+                    not visible_img_area_in_widget.isEmpty() and draw_w > 1e-6 and draw_h > 1e-6:
                 sx = max(0, (visible_img_area_in_widget.x() - x) / draw_w * img_w)
                 sy = max(0, (visible_img_area_in_widget.y() - y) / draw_h * img_h)
                 sw = min(img_w - sx, visible_img_area_in_widget.width() / draw_w * img_w)
@@ -1641,6 +1643,24 @@ def paintEvent(self, event):
     painter.end()
 
 
+def _cached_hover_hit(self, cursor_pos):
+    if self.map_type == 'world' and self.parent_editor:
+        lines, dots = self.parent_editor.get_world_draw_data()
+    elif self.map_type == 'location' and self.parent_editor:
+        lines, dots = self.parent_editor.get_location_draw_data()
+    else:
+        return self._find_item_at_pos(cursor_pos)
+    region_masks = getattr(self.parent_editor, '_region_masks', None)
+    edit_count = getattr(self.parent_editor, '_map_edit_count', 0)
+    key = (cursor_pos.x(), cursor_pos.y(), self._zoom_level, tuple(self._pan), self.width(), self.height(),
+           id(self._crt_image), id(lines), id(dots), edit_count, id(region_masks), len(region_masks or ()))
+    cached = getattr(self, '_hover_hit_cache', None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    result = self._find_item_at_pos(cursor_pos)
+    self._hover_hit_cache = (key, result)
+    return result
+
 def _find_item_at_pos(self, widget_pos):
     if not self.parent_editor:
         return None, -1
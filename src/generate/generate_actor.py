@@ -6,6 +6,7 @@ import os
 import json
 import re
 from config import get_default_utility_model
+from core.entity_registry import note_entity_file_saved
 
 class ActorData(typing.TypedDict, total=False):
     name: str
@@ -315,6 +316,7 @@ def _save_json_from_gen(file_path, data):
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        note_entity_file_saved(file_path, data)
         return True
     except (IOError, OSError) as e:
         print(f"GenerateActor: Error writing JSON to {file_path}: {e}")
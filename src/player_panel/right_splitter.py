@@ -1,10 +1,11 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QSplitter, QPushButton, QHBoxLayout, QStackedWidget, QScrollArea, QFrame, QGridLayout
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QColor
 import json
 import os
 import glob
 from datetime import datetime
+from core.variable_store import get_variable_store, global_variables_file
 
 def get_display_name_from_setting(setting_name):
     if not setting_name or setting_name == "--":
@@ -13,9 +14,14 @@ def get_display_name_from_setting(setting_name):
     return parts[-1].strip() if parts else setting_name
 
 class RightSplitterWidget(QWidget):
+    _game_time_changed = pyqtSignal()
+
     def __init__(self, theme_settings=None, parent=None):
         super().__init__(parent)
         self.setObjectName("RightSplitterWidget")
+        self._game_time_changed.connect(self._update_game_time, Qt.QueuedConnection)
+        self._variable_subscription = get_variable_store().subscribe(self._on_variables_changed, names=('datetime', 'game_datetime'))
+        self.destroyed.connect(lambda: get_variable_store().unsubscribe(self._variable_subscription))
         self.theme_settings = theme_settings if theme_settings is not None else {}
         self.main_app = parent
         self._workflow_data_dir = None
@@ -841,25 +847,25 @@ class RightSplitterWidget(QWidget):
         self.stacked_widget.setCurrentIndex(0)
         self.load_character_data()
     
+    def _on_variables_changed(self, changes):
+        variables_file = global_variables_file(self._workflow_data_dir)
+        if variables_file and any(change.file_path == os.path.normpath(variables_file) for change in changes):
+            self._game_time_changed.emit()
+
     def _update_game_time(self):
         if not hasattr(self, 'game_time_label') or not self.workflow_data_dir:
             return
         try:
-            variables_file = os.path.join(self.workflow_data_dir, 'game', 'variables.json')
-            if os.path.exists(variables_file):
-                with open(variables_file, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    if content:
-                        variables = json.loads(content)
-                        game_time_str = variables.get('datetime') or variables.get('game_datetime')
-                        if game_time_str:
-                            try:
-                                game_time = datetime.fromisoformat(game_time_str)
-                                time_str = game_time.strftime("%Y-%m-%d %H:%M")
-                                self.game_time_label.setText(f"Game Time: {time_str}")
-                                return
-                            except ValueError as e:
-                                pass
+            variables = get_variable_store().variables(global_variables_file(self.workflow_data_dir))
+            game_time_str = variables.get('datetime') or variables.get('game_datetime')
+            if game_time_str:
+                try:
+                    game_time = datetime.fromisoformat(game_time_str)
+                    time_str = game_time.strftime("%Y-%m-%d %H:%M")
+                    self.game_time_label.setText(f"Game Time: {time_str}")
+                    return
+                except ValueError as e:
+                    pass
             self.game_time_label.setText("Game Time: --")
         except Exception as e:
             self.game_time_label.setText("Game Time: --")
@@ -5,6 +5,8 @@ import random
 import time
 from core.utils import _get_player_current_setting_name, _get_or_create_actor_data, _find_player_character_file, _load_json_safely, _find_setting_file_prioritizing_game_dir, _get_player_character_name, _find_actor_file_path
 from editor_panel.inventory_manager import generate_item_id
+from core.variable_substitution import VariableSnapshot, render_template, render_templates
+from core.variable_store import get_variable_store, global_variables_file, set_actor_variable, set_setting_variable, ACTOR_SCOPE, SETTING_SCOPE, NESTED_VARIABLES_KEY
 import re
 
 def _apply_string_operation_mode(prev_value, new_value, set_var_mode, delimiter="/"):
@@ -274,32 +276,22 @@ INSTRUCTIONS:
             var_mode = obj.get('var_mode', 'replace')
             var_delimiter = obj.get('var_delimiter', '/')
             
+            def store_sample(variables):
+                prev_value = variables.get(var_name, "")
+                if var_mode == 'replace':
+                    variables[var_name] = store_value
+                elif var_mode == 'prepend':
+                    variables[var_name] = f"{store_value}{var_delimiter}{prev_value}" if prev_value else store_value
+                elif var_mode == 'append':
+                    variables[var_name] = f"{prev_value}{var_delimiter}{store_value}" if prev_value else store_value
+
             if var_scope == 'Global':
                 variables_file = tab_data.get('variables_file')
                 if variables_file:
-                    variables = {}
-                    if os.path.exists(variables_file):
-                        try:
-                            with open(variables_file, 'r', encoding='utf-8') as f:
-                                content = f.read().strip()
-                                if content:
-                                    variables = json.loads(content)
-                        except Exception as e:
-                            print(f"Error loading variables file: {e}")
-                    
-                    prev_value = variables.get(var_name, "")
-                    if var_mode == 'replace':
-                        variables[var_name] = store_value
-                    elif var_mode == 'prepend':
-                        variables[var_name] = f"{store_value}{var_delimiter}{prev_value}" if prev_value else store_value
-                    elif var_mode == 'append':
-                        variables[var_name] = f"{prev_value}{var_delimiter}{store_value}" if prev_value else store_value
-                    try:
-                        with open(variables_file, 'w', encoding='utf-8') as f:
-                            json.dump(variables, f, indent=2, ensure_ascii=False)
+                    if get_variable_store().modify(variables_file, store_sample):
                         print(f"Successfully stored sampled result in global variable: {var_name}")
-                    except Exception as e:
-                        print(f"Error saving variables file: {e}")
+                    else:
+                        print(f"Error saving variables file: {variables_file}")
                 else:
                     print(f"ERROR: Cannot store global variable - variables_file not found in tab_data")
             
@@ -309,24 +301,10 @@ INSTRUCTIONS:
                 else:
                     actor_data, actor_path = _get_or_create_actor_data(self, workflow_data_dir, character_name)
                     if actor_data:
-                        if 'variables' not in actor_data:
-                            actor_data['variables'] = {}
-                        prev_value = actor_data['variables'].get(var_name, "")
-                        if var_mode == 'replace':
-                            actor_data['variables'][var_name] = store_value
-                        elif var_mode == 'prepend':
-                            actor_data['variables'][var_name] = f"{store_value}{var_delimiter}{prev_value}" if prev_value else store_value
-                        elif var_mode == 'append':
-                            actor_data['variables'][var_name] = f"{prev_value}{var_delimiter}{store_value}" if prev_value else store_value
-                        
-                        try:
-                            with open(actor_path, 'w', encoding='utf-8') as f:
-                                json.dump(actor_data, f, indent=2, ensure_ascii=False)
-                                f.flush()
-                                os.fsync(f.fileno())
+                        if get_variable_store().modify(actor_path, store_sample, NESTED_VARIABLES_KEY, ACTOR_SCOPE, character_name):
                             print(f"Successfully stored sampled result in character variable: {var_name} for {character_name}")
-                        except Exception as e:
-                            print(f"Error saving character data: {e}")
+                        else:
+                            print(f"Error saving character data for {character_name}")
                     else:
                         print(f"ERROR: Could not load character data for {character_name}")
             
@@ -370,93 +348,37 @@ INSTRUCTIONS:
                     else:
                         print(f"ERROR: Could not find player character file with isPlayer=True")
                         return
-                try:
-                    with open(player_file, 'r', encoding='utf-8') as f:
-                        player_data = json.load(f)
-                    if 'variables' not in player_data:
-                        player_data['variables'] = {}
-                    prev_value = player_data['variables'].get(var_name, "")
-                    if var_mode == 'replace':
-                        player_data['variables'][var_name] = store_value
-                    elif var_mode == 'prepend':
-                        player_data['variables'][var_name] = f"{store_value}{var_delimiter}{prev_value}" if prev_value else store_value
-                    elif var_mode == 'append':
-                        player_data['variables'][var_name] = f"{prev_value}{var_delimiter}{store_value}" if prev_value else store_value
-                    with open(player_file, 'w', encoding='utf-8') as f:
-                        json.dump(player_data, f, indent=2, ensure_ascii=False)
-                        f.flush()
-                        os.fsync(f.fileno())
+                if get_variable_store().modify(player_file, store_sample, NESTED_VARIABLES_KEY, ACTOR_SCOPE, player_name):
                     print(f"Successfully stored sampled result in player variable: {var_name}")
-                except Exception as e:
-                    print(f"Error updating player data: {e}")
+                else:
+                    print(f"Error updating player data: {player_file}")
             
             elif var_scope == 'Setting':
                 current_setting = _get_player_current_setting_name(workflow_data_dir)
                 if current_setting:
-                    setting_file = _find_setting_file_prioritizing_game_dir(workflow_data_dir, current_setting)
+                    setting_file, _ = _find_setting_file_prioritizing_game_dir(self, workflow_data_dir, current_setting)
                     if setting_file and os.path.exists(setting_file):
-                        try:
-                            with open(setting_file, 'r', encoding='utf-8') as f:
-                                setting_data = json.load(f)
-                            
-                            if 'variables' not in setting_data:
-                                setting_data['variables'] = {}
-                            prev_value = setting_data['variables'].get(var_name, "")
-                            if var_mode == 'replace':
-                                setting_data['variables'][var_name] = store_value
-                            elif var_mode == 'prepend':
-                                setting_data['variables'][var_name] = f"{store_value}{var_delimiter}{prev_value}" if prev_value else store_value
-                            elif var_mode == 'append':
-                                setting_data['variables'][var_name] = f"{prev_value}{var_delimiter}{store_value}" if prev_value else store_value
-                            with open(setting_file, 'w', encoding='utf-8') as f:
-                                json.dump(setting_data, f, indent=2, ensure_ascii=False)
-                                f.flush()
-                                os.fsync(f.fileno())
+                        if get_variable_store().modify(setting_file, store_sample, NESTED_VARIABLES_KEY, SETTING_SCOPE, current_setting):
                             print(f"Successfully stored sampled result in setting variable: {var_name} for {current_setting}")
-                        except Exception as e:
-                            print(f"Error updating setting data: {e}")
+                        else:
+                            print(f"Error updating setting data: {setting_file}")
             
             elif var_scope == 'Scene Characters':
                 if character_name:
                     actor_data, actor_path = _get_or_create_actor_data(self, workflow_data_dir, character_name)
                     if actor_data:
-                        if 'variables' not in actor_data:
-                            actor_data['variables'] = {}
-                        prev_value = actor_data['variables'].get(var_name, "")
-                        if var_mode == 'replace':
-                            actor_data['variables'][var_name] = store_value
-                        elif var_mode == 'prepend':
-                            actor_data['variables'][var_name] = f"{store_value}{var_delimiter}{prev_value}" if prev_value else store_value
-                        elif var_mode == 'append':
-                            actor_data['variables'][var_name] = f"{prev_value}{var_delimiter}{store_value}" if prev_value else store_value
-                        try:
-                            with open(actor_path, 'w', encoding='utf-8') as f:
-                                json.dump(actor_data, f, indent=2, ensure_ascii=False)
-                                f.flush()
-                                os.fsync(f.fileno())
+                        if get_variable_store().modify(actor_path, store_sample, NESTED_VARIABLES_KEY, ACTOR_SCOPE, character_name):
                             print(f"Successfully stored sampled result in scene character variable: {var_name} for {character_name}")
-                        except Exception as e:
-                            print(f"Error saving character data for {character_name}: {e}")
+                        else:
+                            print(f"Error saving character data for {character_name}")
                     else:
                         print(f"ERROR: Could not load character data for character {character_name}")
                     variables_file = tab_data.get('variables_file')
                     if variables_file:
-                        variables = {}
-                        if os.path.exists(variables_file):
-                            try:
-                                with open(variables_file, 'r', encoding='utf-8') as f:
-                                    content = f.read().strip()
-                                    if content:
-                                        variables = json.loads(content)
-                            except Exception as e:
-                                print(f"Error loading variables file: {e}")
-                        variables[var_name] = store_value
-                        try:
-                            with open(variables_file, 'w', encoding='utf-8') as f:
-                                json.dump(variables, f, indent=2, ensure_ascii=False)
+                        if get_variable_store().set(variables_file, var_name, store_value):
                             print(f"Successfully stored sampled result in global variable as fallback: {var_name}")
-                        except Exception as e:
-                            print(f"Error saving variables file: {e}")
+                        else:
+                            print(f"Error saving variables file: {variables_file}")
         return
     if obj_type == 'Set Screen Effect':
         workflow_data_dir = tab_data.get('workflow_data_dir')
@@ -666,17 +588,8 @@ INSTRUCTIONS:
                 source_value = None
                 if from_var_scope == 'Global':
                     variables_file = tab_data.get('variables_file')
-                    if variables_file and os.path.exists(variables_file):
-                        try:
-                            with open(variables_file, 'r', encoding='utf-8') as f:
-                                content = f.read().strip()
-                                if content:
-                                    global_variables = json.loads(content)
-                                    if isinstance(global_variables, dict):
-                                        source_value = global_variables.get(from_var_name)
-                        except Exception as e:
-                    
-                            source_value = None
+                    if variables_file:
+                        source_value = get_variable_store().get(variables_file, from_var_name)
                     else:
                         source_value = None
                 elif from_var_scope == 'Player':
@@ -782,16 +695,7 @@ INSTRUCTIONS:
                     except Exception as e:
                         print(f"[SetVar] Math operation failed, falling back to set: {e}")
                         new_value = var_value_converted
-                actor_data['variables'][var_name] = new_value
-                save_success = False
-                try:
-                    with open(actor_path, 'w', encoding='utf-8') as f:
-                        json.dump(actor_data, f, indent=2, ensure_ascii=False)
-                        f.flush()
-                        os.fsync(f.fileno())
-                    save_success = True
-                except Exception as e:
-                    print(f"ERROR: Failed to save updated actor data: {e}")
+                save_success = set_actor_variable(actor_path, character_name, var_name, new_value)
                 if save_success:
                     print(f"✓ Successfully updated character variable for '{character_name}': {var_name} = {new_value}")
                 else:
@@ -835,19 +739,10 @@ INSTRUCTIONS:
                     else:
                         print(f"ERROR: Could not find player character file with isPlayer=True")
                         return
-                try:
-                    with open(player_file, 'r', encoding='utf-8') as f:
-                        player_data = json.load(f)
-                    if 'variables' not in player_data:
-                        player_data['variables'] = {}
-                    player_data['variables'][var_name] = var_value_converted
-                    with open(player_file, 'w', encoding='utf-8') as f:
-                        json.dump(player_data, f, indent=2, ensure_ascii=False)
-                        f.flush()
-                        os.fsync(f.fileno())
+                if set_actor_variable(player_file, player_name, var_name, var_value_converted):
                     print(f"Successfully stored sampled result in player variable: {var_name}")
-                except Exception as e:
-                    print(f"Error updating player data: {e}")
+                else:
+                    print(f"Error updating player data: {player_file}")
             elif variable_scope == 'Setting':
                 workflow_data_dir = tab_data.get('workflow_data_dir')
                 if not workflow_data_dir:
@@ -899,11 +794,7 @@ INSTRUCTIONS:
                         print(f"ERROR: Could not find setting file for '{player_setting_name}' in either /game/settings or /resources/data files/settings")
                         return
                 try:
-                    with open(found_setting_file, 'r', encoding='utf-8') as f:
-                        setting_data = json.load(f)
-                    if 'variables' not in setting_data or not isinstance(setting_data['variables'], dict):
-                        setting_data['variables'] = {}
-                    prev_value = setting_data['variables'].get(var_name)
+                    prev_value = get_variable_store().get(found_setting_file, var_name, None, NESTED_VARIABLES_KEY, SETTING_SCOPE, player_setting_name)
                     new_value = var_value_converted
                     if operation == 'set':
                         set_var_mode = obj.get('set_var_mode', 'replace')
@@ -926,11 +817,8 @@ INSTRUCTIONS:
                         except Exception as e:
                             print(f"[SetVar] Math operation failed, falling back to set: {e}")
                             new_value = var_value_converted
-                    setting_data['variables'][var_name] = new_value
-                    with open(found_setting_file, 'w', encoding='utf-8') as f:
-                        json.dump(setting_data, f, indent=2, ensure_ascii=False)
-                        f.flush()
-                        os.fsync(f.fileno())
+                    if not set_setting_variable(found_setting_file, player_setting_name, var_name, new_value):
+                        print(f"✗ FAILED to update setting variable for '{player_setting_name}': {var_name} = {new_value}")
                 except Exception as e:
                     print(f"✗ FAILED to update setting variable for '{player_setting_name}': {var_name} = {var_value_converted}. Error: {e}")
                     return
@@ -945,19 +833,7 @@ INSTRUCTIONS:
                 if not variables_file:
                     print(f"ERROR: No variables_file found in tab_data for global variable setting.")
                     return
-                variables = {}
-                if os.path.exists(variables_file):
-                    try:
-                        with open(variables_file, 'r', encoding='utf-8') as f:
-                            content = f.read().strip()
-                            if content:
-                                variables = json.loads(content)
-                    except Exception as e:
-                        print(f"ERROR: Could not load variables file for global variable setting: {e}")
-                        return
-                if not isinstance(variables, dict):
-                    print(f"ERROR: Loaded global variables is not a dict! Will not overwrite file. Value: {variables}")
-                    return
+                variables = get_variable_store().variables(variables_file)
                 prev_value = variables.get(var_name)
                 new_value = var_value_converted
                 if operation == 'set':
@@ -983,18 +859,10 @@ INSTRUCTIONS:
                         print(f"[SetVar] Math operation failed, falling back to set: {e}")
                         new_value = var_value_converted
                 variables[var_name] = new_value
-                try:
-                    variables_dir = os.path.dirname(variables_file)
-                    if variables_dir and not os.path.exists(variables_dir):
-                        os.makedirs(variables_dir)
-                    with open(variables_file, 'w', encoding='utf-8') as f:
-                        json.dump(variables, f, indent=2, ensure_ascii=False)
-                        f.flush()
-                        os.fsync(f.fileno())
+                if get_variable_store().set(variables_file, var_name, new_value):
                     tab_data['variables'] = variables.copy()
-                    pass
-                except Exception as e:
-                    print(f"✗ FAILED to update global variable: {var_name} = {new_value}. Error: {e}")
+                else:
+                    print(f"✗ FAILED to update global variable: {var_name} = {new_value}")
             elif variable_scope == 'Scene Characters':
                 workflow_data_dir = tab_data.get('workflow_data_dir')
                 if not workflow_data_dir:
@@ -1063,15 +931,10 @@ INSTRUCTIONS:
                         except Exception as e:
                             print(f"[SetVar] Math operation failed, falling back to set: {e}")
                             new_value = var_value_converted
-                    actor_data['variables'][var_name] = new_value
-                    try:
-                        with open(actor_path, 'w', encoding='utf-8') as f:
-                            json.dump(actor_data, f, indent=2, ensure_ascii=False)
-                            f.flush()
-                            os.fsync(f.fileno())
+                    if set_actor_variable(actor_path, char_name, var_name, new_value):
                         update_count += 1
-                    except Exception as e:
-                        print(f"    ✗ Failed to update variable for character '{char_name}': {e}")
+                    else:
+                        print(f"    ✗ Failed to update variable for character '{char_name}'")
             else:
                 print(f"WARNING: Cannot set variable '{var_name}'. Scope is '{variable_scope}', but required context (e.g., character_name for 'Character' scope) might be missing or scope is unhandled.")
         else:
@@ -1104,9 +967,9 @@ INSTRUCTIONS:
             return
         player_name = _get_player_character_name(workflow_data_dir)
         current_setting_name = _get_player_current_setting_name(workflow_data_dir)
-        owner = _substitute_variables_in_string(owner, tab_data, character_name)
-        description = _substitute_variables_in_string(description, tab_data, character_name)
-        location = _substitute_variables_in_string(location, tab_data, character_name)
+        owner, description, location = _substitute_variables_in_strings(
+            [owner, description, location], tab_data, character_name
+        )
         
         if (generate_description and not description) or (generate_location and not location) or generate:
             try:
@@ -1240,13 +1103,13 @@ INSTRUCTIONS:
             print(f"ERROR: Failed to add item '{item_name}' to {target_type} '{target_name}': {e}")
     
     elif obj_type == 'Remove Item':
-        item_name = _substitute_variables_in_string(obj.get('item_name', ''), tab_data, character_name)
-        quantity = _substitute_variables_in_string(obj.get('quantity', '1'), tab_data, character_name)
+        item_name, quantity, target_name, target_item_name, target_container_name = _substitute_variables_in_strings(
+            [obj.get('item_name', ''), obj.get('quantity', '1'), obj.get('target_name', ''),
+             obj.get('target_item_name', ''), obj.get('target_container_name', '')],
+            tab_data, character_name
+        )
         target_type = obj.get('target_type', 'Setting')
-        target_name = _substitute_variables_in_string(obj.get('target_name', ''), tab_data, character_name)
         target_container_enabled = obj.get('target_container_enabled', False)
-        target_item_name = _substitute_variables_in_string(obj.get('target_item_name', ''), tab_data, character_name)
-        target_container_name = _substitute_variables_in_string(obj.get('target_container_name', ''), tab_data, character_name)
         workflow_data_dir = tab_data.get('workflow_data_dir')
         if not workflow_data_dir:
             print(f"ERROR: Cannot process Remove Item - workflow_data_dir not found")
@@ -1347,18 +1210,17 @@ INSTRUCTIONS:
             print(f"ERROR: Failed to remove items from {target_type} '{target_name}': {e}")
     
     elif obj_type == 'Move Item':
-        item_name = _substitute_variables_in_string(obj.get('item_name', ''), tab_data, character_name)
-        quantity = _substitute_variables_in_string(obj.get('quantity', 1), tab_data, character_name)
+        (item_name, quantity, from_name, to_name, from_item_name,
+         from_container_name, to_item_name, to_container_name) = _substitute_variables_in_strings(
+            [obj.get('item_name', ''), obj.get('quantity', 1), obj.get('from_name', ''), obj.get('to_name', ''),
+             obj.get('from_item_name', ''), obj.get('from_container_name', ''),
+             obj.get('to_item_name', ''), obj.get('to_container_name', '')],
+            tab_data, character_name
+        )
         from_type = obj.get('from_type', '')
-        from_name = _substitute_variables_in_string(obj.get('from_name', ''), tab_data, character_name)
         to_type = obj.get('to_type', '')
-        to_name = _substitute_variables_in_string(obj.get('to_name', ''), tab_data, character_name)
         from_container_enabled = obj.get('from_container_enabled', False)
-        from_item_name = _substitute_variables_in_string(obj.get('from_item_name', ''), tab_data, character_name)
-        from_container_name = _substitute_variables_in_string(obj.get('from_container_name', ''), tab_data, character_name)
         to_container_enabled = obj.get('to_container_enabled', False)
-        to_item_name = _substitute_variables_in_string(obj.get('to_item_name', ''), tab_data, character_name)
-        to_container_name = _substitute_variables_in_string(obj.get('to_container_name', ''), tab_data, character_name)
         workflow_data_dir = tab_data.get('workflow_data_dir')
         if not workflow_data_dir:
             print(f"ERROR: Cannot process Move Item - workflow_data_dir not found")
@@ -1587,10 +1449,10 @@ INSTRUCTIONS:
     elif obj_type == 'Determine Items':
         scope = obj.get('scope', 'Player')
         return_type = obj.get('return_type', 'Return Single Item')
-        owner = _substitute_variables_in_string(obj.get('owner', ''), tab_data, character_name)
-        description = _substitute_variables_in_string(obj.get('description', ''), tab_data, character_name)
-        location = _substitute_variables_in_string(obj.get('location', ''), tab_data, character_name)
-        text = _substitute_variables_in_string(obj.get('text', ''), tab_data, character_name)
+        owner, description, location, text = _substitute_variables_in_strings(
+            [obj.get('owner', ''), obj.get('description', ''), obj.get('location', ''), obj.get('text', '')],
+            tab_data, character_name
+        )
         text_scope = obj.get('text_scope', 'Full Conversation')
         if not text:
             print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - No search text provided, skipping")
@@ -1605,63 +1467,64 @@ INSTRUCTIONS:
             current_user_msg, prev_assistant_msg
         )
         if result is not None:
-            var_name = 'items' if return_type in ['Return Multiple Items', 'Multiple Items'] else 'item'
-            item_details = {}
+            with get_variable_store().batch():
+                var_name = 'items' if return_type in ['Return Multiple Items', 'Multiple Items'] else 'item'
+                item_details = {}
             
-            if result != "NONE":
-                items_data = _load_items_data(workflow_data_dir, scope, character_name)
-                print(f"[DEBUG] Loaded {len(items_data)} items from inventory")
-                print(f"[DEBUG] Looking for item ID: {result}")
-                item_details = _extract_item_details_from_result(result, items_data)
-                print(f"[DEBUG] Extracted item details: {item_details}")
-                if return_type in ['Return Multiple Items', 'Multiple Items']:
-                    if 'names' in item_details:
-                        _save_global_variable(workflow_data_dir, 'itemnames', item_details.get('names', ''))
-                        _save_global_variable(workflow_data_dir, 'itemdescriptions', item_details.get('descriptions', ''))
-                        _save_global_variable(workflow_data_dir, 'itemlocations', item_details.get('locations', ''))
-                        _save_global_variable(workflow_data_dir, 'itemowners', item_details.get('owners', ''))
-                    elif 'name' in item_details:
-                        _save_global_variable(workflow_data_dir, 'itemnames', item_details.get('name', ''))
-                        _save_global_variable(workflow_data_dir, 'itemdescriptions', item_details.get('description', ''))
-                        _save_global_variable(workflow_data_dir, 'itemlocations', item_details.get('location', ''))
-                        _save_global_variable(workflow_data_dir, 'itemowners', item_details.get('owner', ''))
-                else:
-                    if 'name' in item_details:
-                        _save_global_variable(workflow_data_dir, 'itemname', item_details.get('name', ''))
-                        _save_global_variable(workflow_data_dir, 'itemdescription', item_details.get('description', ''))
-                        _save_global_variable(workflow_data_dir, 'itemlocation', item_details.get('location', ''))
-                        _save_global_variable(workflow_data_dir, 'itemowner', item_details.get('owner', ''))
-                    elif 'names' in item_details:
-                        _save_global_variable(workflow_data_dir, 'itemname', item_details.get('names', ''))
-                        _save_global_variable(workflow_data_dir, 'itemdescription', item_details.get('descriptions', ''))
-                        _save_global_variable(workflow_data_dir, 'itemlocation', item_details.get('locations', ''))
-                        _save_global_variable(workflow_data_dir, 'itemowner', item_details.get('owners', ''))
+                if result != "NONE":
+                    items_data = _load_items_data(workflow_data_dir, scope, character_name)
+                    print(f"[DEBUG] Loaded {len(items_data)} items from inventory")
+                    print(f"[DEBUG] Looking for item ID: {result}")
+                    item_details = _extract_item_details_from_result(result, items_data)
+                    print(f"[DEBUG] Extracted item details: {item_details}")
+                    if return_type in ['Return Multiple Items', 'Multiple Items']:
+                        if 'names' in item_details:
+                            _save_global_variable(workflow_data_dir, 'itemnames', item_details.get('names', ''))
+                            _save_global_variable(workflow_data_dir, 'itemdescriptions', item_details.get('descriptions', ''))
+                            _save_global_variable(workflow_data_dir, 'itemlocations', item_details.get('locations', ''))
+                            _save_global_variable(workflow_data_dir, 'itemowners', item_details.get('owners', ''))
+                        elif 'name' in item_details:
+                            _save_global_variable(workflow_data_dir, 'itemnames', item_details.get('name', ''))
+                            _save_global_variable(workflow_data_dir, 'itemdescriptions', item_details.get('description', ''))
+                            _save_global_variable(workflow_data_dir, 'itemlocations', item_details.get('location', ''))
+                            _save_global_variable(workflow_data_dir, 'itemowners', item_details.get('owner', ''))
+                    else:
+                        if 'name' in item_details:
+                            _save_global_variable(workflow_data_dir, 'itemname', item_details.get('name', ''))
+                            _save_global_variable(workflow_data_dir, 'itemdescription', item_details.get('description', ''))
+                            _save_global_variable(workflow_data_dir, 'itemlocation', item_details.get('location', ''))
+                            _save_global_variable(workflow_data_dir, 'itemowner', item_details.get('owner', ''))
+                        elif 'names' in item_details:
+                            _save_global_variable(workflow_data_dir, 'itemname', item_details.get('names', ''))
+                            _save_global_variable(workflow_data_dir, 'itemdescription', item_details.get('descriptions', ''))
+                            _save_global_variable(workflow_data_dir, 'itemlocation', item_details.get('locations', ''))
+                            _save_global_variable(workflow_data_dir, 'itemowner', item_details.get('owners', ''))
             
-            _save_global_variable(workflow_data_dir, var_name, result)
-            print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Stored result '{result}' in global variable '{var_name}'")
+                _save_global_variable(workflow_data_dir, var_name, result)
+                print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Stored result '{result}' in global variable '{var_name}'")
             
-            if result == "NONE":
-                _save_global_variable(workflow_data_dir, 'item', 'NONE')
-                _save_global_variable(workflow_data_dir, 'itemnames', 'NONE')
-                _save_global_variable(workflow_data_dir, 'itemdescriptions', 'NONE')
-                _save_global_variable(workflow_data_dir, 'itemlocations', 'NONE')
-                _save_global_variable(workflow_data_dir, 'itemowners', 'NONE')
-                _save_global_variable(workflow_data_dir, 'itemname', 'NONE')
-                _save_global_variable(workflow_data_dir, 'itemdescription', 'NONE')
-                _save_global_variable(workflow_data_dir, 'itemlocation', 'NONE')
-                _save_global_variable(workflow_data_dir, 'itemowner', 'NONE')
-                print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Cleared all item variables to NONE")
-            elif result != "NONE" and item_details:
-                if return_type in ['Return Multiple Items', 'Multiple Items']:
-                    if 'names' in item_details:
-                        print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Also stored: itemnames='{item_details.get('names', '')}', itemdescriptions='{item_details.get('descriptions', '')}', itemlocations='{item_details.get('locations', '')}', itemowners='{item_details.get('owners', '')}'")
-                    elif 'name' in item_details:
-                        print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Also stored: itemnames='{item_details.get('name', '')}', itemdescriptions='{item_details.get('description', '')}', itemlocations='{item_details.get('location', '')}', itemowners='{item_details.get('owner', '')}'")
-                else:
-                    if 'name' in item_details:
-                        print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Also stored: itemname='{item_details.get('name', '')}', itemdescription='{item_details.get('description', '')}', itemlocation='{item_details.get('location', '')}', itemowner='{item_details.get('owner', '')}'")
-                    elif 'names' in item_details:
-                        print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Also stored: itemname='{item_details.get('names', '')}', itemdescription='{item_details.get('descriptions', '')}', itemlocation='{item_details.get('locations', '')}', itemowner='{item_details.get('owners', '')}'")
+                if result == "NONE":
+                    _save_global_variable(workflow_data_dir, 'item', 'NONE')
+                    _save_global_variable(workflow_data_dir, 'itemnames', 'NONE')
+                    _save_global_variable(workflow_data_dir, 'itemdescriptions', 'NONE')
+                    _save_global_variable(workflow_data_dir, 'itemlocations', 'NONE')
+                    _save_global_variable(workflow_data_dir, 'itemowners', 'NONE')
+                    _save_global_variable(workflow_data_dir, 'itemname', 'NONE')
+                    _save_global_variable(workflow_data_dir, 'itemdescription', 'NONE')
+                    _save_global_variable(workflow_data_dir, 'itemlocation', 'NONE')
+                    _save_global_variable(workflow_data_dir, 'itemowner', 'NONE')
+                    print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Cleared all item variables to NONE")
+                elif result != "NONE" and item_details:
+                    if return_type in ['Return Multiple Items', 'Multiple Items']:
+                        if 'names' in item_details:
+                            print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Also stored: itemnames='{item_details.get('names', '')}', itemdescriptions='{item_details.get('descriptions', '')}', itemlocations='{item_details.get('locations', '')}', itemowners='{item_details.get('owners', '')}'")
+                        elif 'name' in item_details:
+                            print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Also stored: itemnames='{item_details.get('name', '')}', itemdescriptions='{item_details.get('description', '')}', itemlocations='{item_details.get('location', '')}', itemowners='{item_details.get('owner', '')}'")
+                    else:
+                        if 'name' in item_details:
+                            print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Also stored: itemname='{item_details.get('name', '')}', itemdescription='{item_details.get('description', '')}', itemlocation='{item_details.get('location', '')}', itemowner='{item_details.get('owner', '')}'")
+                        elif 'names' in item_details:
+                            print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - Also stored: itemname='{item_details.get('names', '')}', itemdescription='{item_details.get('descriptions', '')}', itemlocation='{item_details.get('locations', '')}', itemowner='{item_details.get('owners', '')}'")
         else:
             print(f"  >> Rule '{rule.get('id', 'Unknown')}' Action: Determine Items - No items found matching criteria")
     
@@ -1804,6 +1667,9 @@ INSTRUCTIONS:
                 with open(time_passage_file, 'w', encoding='utf-8') as f:
                     json.dump(time_passage_data, f, indent=2, ensure_ascii=False)
                 print(f"✓ Successfully changed time passage mode to {passage_mode} with multiplier {time_multiplier}x")
+                timer_manager = getattr(self, 'timer_manager', None)
+                if timer_manager:
+                    timer_manager.on_time_multiplier_changed(time_multiplier, tab_data)
             except Exception as e:
                 print(f"✗ FAILED to save time passage settings: {e}")
         except Exception as e:
@@ -1876,74 +1742,17 @@ INSTRUCTIONS:
                 assistant_msg_for_next_rule = prev_assistant_msg if prev_assistant_msg is not None else ''
                 QTimer.singleShot(0, lambda nr=next_rule_data: _process_specific_rule(self, nr, user_msg_for_next_rule, assistant_msg_for_next_rule, rules_list=tab_data.get('thought_rules', []), rule_index=None, triggered_directly=True))
 
-def _substitute_variables_in_string(text_to_process, tab_data, actor_name_context=None):
+def _substitute_variables_in_string(text_to_process, tab_data, actor_name_context=None, snapshot=None):
     if not text_to_process or not isinstance(text_to_process, str):
         return text_to_process
-    from core.utils import (
-        _get_player_character_name,
-        _get_or_create_actor_data,
-        _get_player_current_setting_name,
-        _find_setting_file_prioritizing_game_dir,
-        _load_json_safely
-    )
-    result_text = text_to_process
-    workflow_data_dir = tab_data.get('workflow_data_dir') if tab_data else None
-    if '(character)' in result_text.lower() and actor_name_context:
-        result_text = re.sub(r'(?<!\[)\(character\)(?![^,\]]*\])', actor_name_context, result_text, flags=re.IGNORECASE)
-    if '(player)' in result_text.lower() and workflow_data_dir:
-        player_name = _get_player_character_name(workflow_data_dir)
-        if player_name:
-            result_text = re.sub(r'\(player\)', player_name, result_text, flags=re.IGNORECASE)
-            result_text = re.sub(r'\(Player\)', player_name, result_text)
-    if '(setting)' in result_text.lower() and workflow_data_dir:
-        setting_name = _get_player_current_setting_name(workflow_data_dir)
-        if setting_name and setting_name != "Unknown Setting":
-            result_text = re.sub(r'\(setting\)', setting_name, result_text, flags=re.IGNORECASE)
-    if workflow_data_dir:
-        class DummySelf:
-            pass
-        dummy_self = DummySelf()
-        def get_var_value(scope, var_name):
-            if scope == "global":
-                variables_file = os.path.join(workflow_data_dir, "game", "variables.json")
-                if os.path.exists(variables_file):
-                    try:
-                        with open(variables_file, 'r', encoding='utf-8') as f:
-                            variables = json.load(f)
-                            return variables.get(var_name, "")
-                    except:
-                        return ""
-                return ""
-            elif scope == "player":
-                player_name = _get_player_character_name(workflow_data_dir)
-                if player_name:
-                    actor_data, _ = _get_or_create_actor_data(dummy_self, workflow_data_dir, player_name)
-                    return actor_data.get('variables', {}).get(var_name, "")
-                return ""
-            elif scope == "actor" or scope == "character":
-                if actor_name_context:
-                    actor_data, _ = _get_or_create_actor_data(dummy_self, workflow_data_dir, actor_name_context)
-                    return actor_data.get('variables', {}).get(var_name, "")
-                return ""
-            elif scope == "setting":
-                current_setting_name = _get_player_current_setting_name(workflow_data_dir)
-                if current_setting_name and current_setting_name != "Unknown Setting":
-                    setting_file_path, _ = _find_setting_file_prioritizing_game_dir(dummy_self, workflow_data_dir, current_setting_name)
-                    if setting_file_path and os.path.exists(setting_file_path):
-                        setting_data = _load_json_safely(setting_file_path)
-                        if setting_data:
-                            return setting_data.get('variables', {}).get(var_name, "")
-                return ""
-            return ""
-        
-        def replace_match(match):
-            scope = match.group(1).lower()
-            var_name = match.group(2).strip()
-            val = get_var_value(scope, var_name)
-            return str(val)
-        pattern = r'\[(global|player|actor|character|setting),\s*([^,\]]+?)\s*\]'
-        result_text = re.sub(pattern, replace_match, result_text)
-    return result_text
+    if snapshot is None:
+        snapshot = VariableSnapshot(tab_data, actor_name_context)
+    return render_template(text_to_process, snapshot)
+
+def _substitute_variables_in_strings(texts, tab_data, actor_name_context=None, snapshot=None):
+    if snapshot is None:
+        snapshot = VariableSnapshot(tab_data, actor_name_context)
+    return render_templates(texts, snapshot)
 
 def _apply_item_consume_effects(item_identifier, consume_scope, workflow_data_dir, tab_data, character_name=None):
     if not item_identifier or not workflow_data_dir:
@@ -2037,28 +1846,22 @@ def _apply_item_consume_effects(item_identifier, consume_scope, workflow_data_di
         _apply_variable_effect(var_name, operation, value, consume_scope, workflow_data_dir, tab_data, character_name)
 
 def _apply_variable_effect(var_name, operation, value, scope, workflow_data_dir, tab_data, character_name=None):
+    store = get_variable_store()
+    apply_effect = lambda variables: _apply_operation_to_variable(variables, var_name, operation, value)
     try:
         if scope == "Player":
             player_name = _get_player_character_name(workflow_data_dir)
             if player_name:
                 actor_data, actor_path = _get_or_create_actor_data(None, workflow_data_dir, player_name)
                 if actor_data:
-                    if 'variables' not in actor_data:
-                        actor_data['variables'] = {}
-                    _apply_operation_to_variable(actor_data['variables'], var_name, operation, value)
-                    with open(actor_path, 'w', encoding='utf-8') as f:
-                        json.dump(actor_data, f, indent=2, ensure_ascii=False)
+                    store.modify(actor_path, apply_effect, NESTED_VARIABLES_KEY, ACTOR_SCOPE, player_name)
                     print(f"    Applied {operation} '{var_name}' = '{value}' to Player")
         
         elif scope == "Character":
             if character_name:
                 actor_data, actor_path = _get_or_create_actor_data(None, workflow_data_dir, character_name)
                 if actor_data:
-                    if 'variables' not in actor_data:
-                        actor_data['variables'] = {}
-                    _apply_operation_to_variable(actor_data['variables'], var_name, operation, value)
-                    with open(actor_path, 'w', encoding='utf-8') as f:
-                        json.dump(actor_data, f, indent=2, ensure_ascii=False)
+                    store.modify(actor_path, apply_effect, NESTED_VARIABLES_KEY, ACTOR_SCOPE, character_name)
                     print(f"    Applied {operation} '{var_name}' = '{value}' to Character '{character_name}'")
         
         elif scope == "Setting":
@@ -2066,13 +1869,7 @@ def _apply_variable_effect(var_name, operation, value, scope, workflow_data_dir,
             if current_setting_name and current_setting_name != "Unknown Setting":
                 setting_file_path, _ = _find_setting_file_prioritizing_game_dir(None, workflow_data_dir, current_setting_name)
                 if setting_file_path and os.path.exists(setting_file_path):
-                    with open(setting_file_path, 'r', encoding='utf-8') as f:
-                        setting_data = json.load(f)
-                    if 'variables' not in setting_data:
-                        setting_data['variables'] = {}
-                    _apply_operation_to_variable(setting_data['variables'], var_name, operation, value)
-                    with open(setting_file_path, 'w', encoding='utf-8') as f:
-                        json.dump(setting_data, f, indent=2, ensure_ascii=False)
+                    store.modify(setting_file_path, apply_effect, NESTED_VARIABLES_KEY, SETTING_SCOPE, current_setting_name)
                     print(f"    Applied {operation} '{var_name}' = '{value}' to Setting '{current_setting_name}'")
         
         elif scope == "Scene Characters":
@@ -2080,28 +1877,19 @@ def _apply_variable_effect(var_name, operation, value, scope, workflow_data_dir,
             if current_setting_name and current_setting_name != "Unknown Setting":
                 setting_file_path, _ = _find_setting_file_prioritizing_game_dir(None, workflow_data_dir, current_setting_name)
                 if setting_file_path and os.path.exists(setting_file_path):
-                    with open(setting_file_path, 'r', encoding='utf-8') as f:
-                        setting_data = json.load(f)
+                    setting_data = _load_json_safely(setting_file_path)
                     player_name = _get_player_character_name(workflow_data_dir)
                     if player_name:
                         actor_data, actor_path = _get_or_create_actor_data(None, workflow_data_dir, player_name)
                         if actor_data:
-                            if 'variables' not in actor_data:
-                                actor_data['variables'] = {}
-                            _apply_operation_to_variable(actor_data['variables'], var_name, operation, value)
-                            with open(actor_path, 'w', encoding='utf-8') as f:
-                                json.dump(actor_data, f, indent=2, ensure_ascii=False)
+                            store.modify(actor_path, apply_effect, NESTED_VARIABLES_KEY, ACTOR_SCOPE, player_name)
                             print(f"    Applied {operation} '{var_name}' = '{value}' to Player")
                     scene_characters = setting_data.get('characters', [])
                     for char_name in scene_characters:
                         if char_name != player_name:
                             actor_data, actor_path = _get_or_create_actor_data(None, workflow_data_dir, char_name)
                             if actor_data:
-                                if 'variables' not in actor_data:
-                                    actor_data['variables'] = {}
-                                _apply_operation_to_variable(actor_data['variables'], var_name, operation, value)
-                                with open(actor_path, 'w', encoding='utf-8') as f:
-                                    json.dump(actor_data, f, indent=2, ensure_ascii=False)
+                                store.modify(actor_path, apply_effect, NESTED_VARIABLES_KEY, ACTOR_SCOPE, char_name)
                                 print(f"    Applied {operation} '{var_name}' = '{value}' to Character '{char_name}'")
     except Exception as e:
         print(f"ERROR: Failed to apply variable effect '{var_name}' to scope '{scope}': {e}")
@@ -2445,18 +2233,8 @@ def _find_item_by_id(items_data, item_id):
 def _save_global_variable(workflow_data_dir, var_name, var_value):
     if not workflow_data_dir:
         return
-    variables_file = os.path.join(workflow_data_dir, "game", "variables.json")
-    try:
-        variables = {}
-        if os.path.exists(variables_file):
-            with open(variables_file, 'r', encoding='utf-8') as f:
-                variables = json.load(f)
-        variables[var_name] = var_value
-        os.makedirs(os.path.dirname(variables_file), exist_ok=True)
-        with open(variables_file, 'w', encoding='utf-8') as f:
-            json.dump(variables, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"ERROR: Failed to save global variable '{var_name}': {e}")
+    if not get_variable_store().set(global_variables_file(workflow_data_dir), var_name, var_value):
+        print(f"ERROR: Failed to save global variable '{var_name}'")
 
 def _load_items_data(workflow_data_dir, scope='Setting', character_name=None):
     if not workflow_data_dir:
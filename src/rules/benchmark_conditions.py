@@ -0,0 +1,140 @@
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+RULE_COUNT = 500
+ROUNDS = 3
+VARIABLE_COUNT = 200
+PLAYER_NAME = "Hero"
+ACTOR_NAME = "Guard"
+SETTING_NAME = "Gatehouse"
+_OPERATORS = ['==', '!=', '>', '<', '>=', '<=', 'contains', 'not contains', 'exists', 'not exists']
+_SCOPES = ['Global', 'Player', 'Character', 'Setting']
+
+class LegacyUI:
+    def __init__(self, ui_class, tab_data):
+        self._ui_class = ui_class
+        self.tabs_data = [tab_data]
+
+    def __getattr__(self, name):
+        value = getattr(self._ui_class, name)
+        return value.__get__(self) if callable(value) else value
+
+def _random_value(rng):
+    choice = rng.random()
+    if choice < 0.4:
+        return str(rng.randint(0, 100))
+    if choice < 0.7:
+        return rng.randint(0, 100)
+    return rng.choice(["open", "closed", "guarded", "asleep"])
+
+def _random_variables(rng):
+    return {f"var_{i}": _random_value(rng) for i in range(VARIABLE_COUNT)}
+
+def _write_json(file_path, data):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+def build_workflow_dir(rng, workflow_data_dir):
+    player = {'name': PLAYER_NAME, 'isPlayer': True, 'variables': _random_variables(rng)}
+    guard = {'name': ACTOR_NAME, 'variables': _random_variables(rng)}
+    setting = {'name': SETTING_NAME, 'characters': [PLAYER_NAME, ACTOR_NAME], 'variables': _random_variables(rng)}
+    for layer in (os.path.join('game'), os.path.join('resources', 'data files')):
+        _write_json(os.path.join(workflow_data_dir, layer, 'actors', f"{PLAYER_NAME}.json"), player)
+        _write_json(os.path.join(workflow_data_dir, layer, 'actors', f"{ACTOR_NAME}.json"), guard)
+        _write_json(os.path.join(workflow_data_dir, layer, 'settings', 'World', 'Region', 'Keep',
+                                 f"{SETTING_NAME}_setting.json"), setting)
+    variables_file = os.path.join(workflow_data_dir, 'game', 'variables.json')
+    _write_json(variables_file, _random_variables(rng))
+    return {'workflow_data_dir': workflow_data_dir, 'variables_file': variables_file, 'scene_number': 3, 'turn_count': 1}
+
+def build_rules(rng, rule_count=RULE_COUNT):
+    rules = []
+    for index in range(rule_count):
+        conditions = []
+        for _ in range(rng.randint(2, 5)):
+            kind = rng.random()
+            if kind < 0.75:
+                scope = rng.choice(_SCOPES)
+                cond = {
+                    'type': 'Variable',
+                    'variable_scope': scope,
+                    'variable': f"var_{rng.randint(0, VARIABLE_COUNT + 49)}",
+                    'operator': rng.choice(_OPERATORS),
+                    'value': rng.choice([str(rng.randint(0, 100)), "open", "guarded", f"[global,var_{rng.randint(0, 9)}]"])
+                }
+                if scope == 'Character':
+                    cond['applies_to'] = 'Character'
+                    cond['character_name'] = ACTOR_NAME
+                conditions.append(cond)
+            elif kind < 0.9:
+                conditions.append({'type': 'Scene Count', 'operator': rng.choice(['==', '>', '<=']), 'value': str(rng.randint(1, 6))})
+            else:
+                conditions.append({'type': 'Always'})
+        rules.append({'id': f"rule_{index}", 'conditions': conditions, 'conditions_operator': rng.choice(['AND', 'OR'])})
+    return rules
+
+def legacy_evaluate_conditions(ui, tab_data, conditions, operator, current_turn):
+    variables_file = tab_data.get('variables_file')
+    if variables_file and os.path.exists(variables_file):
+        with open(variables_file, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+            tab_data['variables'] = json.loads(content) if content else {}
+    results = []
+    for cond in conditions:
+        result = ui._evaluate_condition_row(tab_data, cond, current_turn)
+        results.append(result)
+        if operator.upper() in ("AND", "ALL") and not result:
+            return False
+        elif operator.upper() in ("OR", "ANY") and result:
+            return True
+    if operator.upper() in ("OR", "ANY"):
+        return any(results)
+    return all(results)
+
+def _time_rounds(evaluate, rules, tab_data, rounds):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rounds):
+            results = [evaluate(tab_data, rule['conditions'], rule['conditions_operator']) for rule in rules]
+    return time.perf_counter() - start, results
+
+def run_benchmark(rule_count=RULE_COUNT, rounds=ROUNDS, seed=7, ui_class=None):
+    if ui_class is None:
+        from chatBotRPG import ChatbotUI as ui_class
+    from rules.rule_evaluator import _evaluate_conditions
+    from rules.condition_compiler import compile_rules_conditions
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as workflow_data_dir:
+        tab_data = build_workflow_dir(rng, workflow_data_dir)
+        rules = build_rules(rng, rule_count)
+        ui = LegacyUI(ui_class, tab_data)
+
+        start = time.perf_counter()
+        compile_rules_conditions(rules)
+        compile_time = time.perf_counter() - start
+
+        legacy_time, legacy = _time_rounds(
+            lambda td, conditions, operator: legacy_evaluate_conditions(ui, td, conditions, operator, 1),
+            rules, tab_data, rounds)
+        compiled_time, compiled = _time_rounds(
+            lambda td, conditions, operator: _evaluate_conditions(ui, td, conditions, operator, 1),
+            rules, tab_data, rounds)
+
+    mismatched = [rule['id'] for rule, expected, actual in zip(rules, legacy, compiled) if expected != actual]
+    if mismatched:
+        raise AssertionError(f"Compiled and legacy condition results differ for {len(mismatched)} rules: {mismatched[:10]}")
+    evaluations = rule_count * rounds
+    print(f"{rule_count} rules x {rounds} rounds ({sum(compiled)} rules true per round)")
+    print(f"  legacy:   {legacy_time * 1000:.1f} ms ({legacy_time / evaluations * 1e6:.1f} us/rule)")
+    print(f"  compiled: {compiled_time * 1000:.1f} ms ({compiled_time / evaluations * 1e6:.1f} us/rule), one-time compile {compile_time * 1000:.1f} ms")
+    print(f"  speedup:  {legacy_time / compiled_time:.2f}x")
+    return legacy_time, compiled_time
+
+if __name__ == "__main__":
+    run_benchmark()
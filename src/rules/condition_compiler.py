@@ -0,0 +1,232 @@
+import operator as _operator
+import threading
+
+MAX_COMPILED_CONDITION_SETS = 4096
+_NUMERIC_OPERATORS = {
+    '>': _operator.gt,
+    '<': _operator.lt,
+    '>=': _operator.ge,
+    '<=': _operator.le,
+}
+_SCENE_OPERATORS = {
+    '==': _operator.eq,
+    '!=': _operator.ne,
+    **_NUMERIC_OPERATORS,
+}
+_COMPILED_TYPES = ('None', 'Always', 'Variable', 'Scene Count')
+
+_compiled = {}
+_lock = threading.Lock()
+
+def smart_convert(val):
+    if isinstance(val, (int, float)):
+        return val
+    if isinstance(val, str):
+        val_stripped = val.strip()
+        if val_stripped == "":
+            return val_stripped
+        try:
+            if '.' not in val_stripped and val_stripped.lstrip('-').isdigit():
+                return int(val_stripped)
+            return float(val_stripped)
+        except (ValueError, TypeError):
+            return val_stripped
+    return val
+
+def compare_variable(variables, variable, operator, value, converted_value):
+    if operator == "exists":
+        return variable in variables
+    if operator == "not exists":
+        return variable not in variables
+    var_val = variables.get(variable)
+    if var_val is None:
+        if operator == "!=":
+            return True
+        if operator == "==":
+            return value is None or value == ""
+        return False
+    var_val_converted = smart_convert(var_val)
+    both_numeric = isinstance(var_val_converted, (int, float)) and isinstance(converted_value, (int, float))
+    if operator == "==":
+        if both_numeric:
+            return var_val_converted == converted_value
+        return str(var_val_converted).strip().lower() == str(converted_value).strip().lower()
+    if operator == "!=":
+        if both_numeric:
+            return var_val_converted != converted_value
+        return str(var_val_converted).strip().lower() != str(converted_value).strip().lower()
+    numeric_operator = _NUMERIC_OPERATORS.get(operator)
+    if numeric_operator is not None:
+        return numeric_operator(var_val_converted, converted_value) if both_numeric else False
+    if operator == "contains":
+        return str(converted_value).lower() in str(var_val_converted).lower()
+    if operator == "not contains":
+        return str(converted_value).lower() not in str(var_val_converted).lower()
+    return False
+
+def scope_variables(snapshot, scope_key, character_name):
+    if scope_key == 'global':
+        return snapshot.scope_variables('global')
+    if not snapshot.workflow_data_dir:
+        return None
+    if scope_key == 'character':
+        return snapshot.actor_variables(character_name)
+    if scope_key == 'player':
+        player_name = snapshot.player_name()
+        return snapshot.actor_variables(player_name) if player_name else None
+    setting_name = snapshot.setting_name()
+    if not setting_name or setting_name == "Unknown Setting":
+        return None
+    return snapshot.scope_variables('setting')
+
+class ConditionContext:
+    __slots__ = ('ui', 'tab_data', 'current_turn', 'triggered_directly', 'character_name', 'snapshot', 'substitute', 'debug')
+
+    def __init__(self, ui, tab_data, current_turn, triggered_directly, character_name, snapshot, substitute, debug=False):
+        self.ui = ui
+        self.tab_data = tab_data
+        self.current_turn = current_turn
+        self.triggered_directly = triggered_directly
+        self.character_name = character_name
+        self.snapshot = snapshot
+        self.substitute = substitute
+        self.debug = debug
+
+class ConstantCondition:
+    __slots__ = ('result',)
+
+    def __init__(self, result):
+        self.result = result
+
+    def evaluate(self, context):
+        return self.result
+
+class DirectTriggerCondition:
+    __slots__ = ()
+
+    def evaluate(self, context):
+        return bool(context.triggered_directly)
+
+class SceneCountCondition:
+    __slots__ = ('compare', 'target')
+
+    def __init__(self, compare, target):
+        self.compare = compare
+        self.target = target
+
+    def evaluate(self, context):
+        return self.compare(context.tab_data.get('scene_number', 1), self.target)
+
+class VariableCondition:
+    __slots__ = ('scope', 'variable', 'operator', 'raw_value', 'resolved_value', 'converted_value',
+                 'character_name', 'uses_character', 'inherits_character')
+
+    def __init__(self, cond):
+        self.scope = cond.get('variable_scope', 'Global') or cond.get('var_scope', 'Global')
+        self.variable = cond.get('variable', '')
+        self.operator = cond.get('operator', '==')
+        self.raw_value = cond.get('value', '')
+        self.character_name = cond.get('character_name')
+        self.uses_character = (cond.get('applies_to') == 'Character' or cond.get('variable_scope') == 'Character'
+                               or cond.get('var_scope') == 'Character')
+        self.inherits_character = 'applies_to' not in cond
+        needs_substitution = isinstance(self.raw_value, str) and '(' in self.raw_value
+        self.resolved_value = None if needs_substitution else self.raw_value
+        self.converted_value = None if needs_substitution else smart_convert(self.raw_value)
+
+    def evaluate(self, context):
+        if not self.variable:
+            return False
+        character_name = self.character_name
+        if self.inherits_character and context.character_name:
+            character_name = context.character_name
+        character_name = character_name if self.uses_character else None
+        if self.resolved_value is None:
+            value = context.substitute(self.raw_value, character_name)
+            converted_value = smart_convert(value)
+        else:
+            value = self.resolved_value
+            converted_value = self.converted_value
+        if self.scope == "Character" and character_name:
+            scope_key = 'character'
+        elif self.scope in ("Player", "Setting"):
+            scope_key = self.scope.lower()
+        else:
+            scope_key = 'global'
+        variables = scope_variables(context.snapshot, scope_key, character_name)
+        if variables is None:
+            return False
+        result = compare_variable(variables, self.variable, self.operator, value, converted_value)
+        if context.debug:
+            print(f"[TRANSIT] Variable condition: scope='{self.scope}', var='{self.variable}', op='{self.operator}', "
+                  f"target='{value}', value='{variables.get(self.variable)}' => {result}")
+        return result
+
+class RowCondition:
+    __slots__ = ('cond', 'inherits_character')
+
+    def __init__(self, cond):
+        self.cond = cond
+        self.inherits_character = 'applies_to' not in cond
+
+    def evaluate(self, context):
+        cond = self.cond
+        if self.inherits_character and context.character_name:
+            cond = dict(cond, character_name=context.character_name)
+        return context.ui._evaluate_condition_row(context.tab_data, cond, context.current_turn, context.triggered_directly)
+
+class ConditionGroup:
+    __slots__ = ('match_any', 'nodes')
+
+    def __init__(self, match_any, nodes):
+        self.match_any = match_any
+        self.nodes = nodes
+
+    def evaluate(self, context):
+        if self.match_any:
+            return any(node.evaluate(context) for node in self.nodes)
+        return all(node.evaluate(context) for node in self.nodes)
+
+def compile_condition(cond):
+    ctype = cond.get('type', 'None')
+    if ctype == 'None':
+        return DirectTriggerCondition()
+    if ctype == 'Always':
+        return ConstantCondition(True)
+    if ctype == 'Variable':
+        return VariableCondition(cond)
+    if ctype == 'Scene Count':
+        compare = _SCENE_OPERATORS.get(cond.get('operator', '=='))
+        try:
+            target = int(cond.get('value'))
+        except (ValueError, TypeError):
+            print(f"  Warning: Scene Count target value '{cond.get('value')}' is not an integer. Evaluating as False.")
+            return ConstantCondition(False)
+        if compare is None:
+            print(f"  Warning: Unknown operator '{cond.get('operator')}' for Scene Count. Evaluating as False.")
+            return ConstantCondition(False)
+        return SceneCountCondition(compare, target)
+    return RowCondition(cond)
+
+def compile_conditions(conditions, operator='AND'):
+    match_any = (operator or 'AND').upper() in ('OR', 'ANY')
+    return ConditionGroup(match_any, tuple(compile_condition(cond) for cond in conditions or ()))
+
+def get_compiled_conditions(conditions, operator='AND'):
+    key = (id(conditions), (operator or 'AND').upper())
+    with _lock:
+        cached = _compiled.get(key)
+        if cached is not None and cached[0] is conditions:
+            return cached[1]
+    compiled = compile_conditions(conditions, operator)
+    with _lock:
+        if len(_compiled) >= MAX_COMPILED_CONDITION_SETS:
+            _compiled.clear()
+        _compiled[key] = (conditions, compiled)
+    return compiled
+
+def compile_rules_conditions(rules):
+    for rule in rules or ():
+        conditions = rule.get('conditions')
+        if conditions:
+            get_compiled_conditions(conditions, rule.get('conditions_operator', 'AND'))
@@ -0,0 +1,92 @@
+import os
+import re
+
+CONDITION_SAFE_ACTIONS = {
+    'System Message', 'Switch Model', 'Text Tag', 'Set Screen Effect', 'Change Brightness',
+    'Skip Post', 'Force Narrator', 'Next Rule', 'Exit Rule Processing'
+}
+BATCH_TOKENS_PER_RULE = 40
+SINGLE_RULE_MAX_TOKENS = 100
+_SHARED_TEXT_END = "\n---\n\n"
+_ANSWER_LINE_RE = re.compile(r'^\s*(?:item\s*)?#?(\d+)\s*[:.)\-]\s*(.+?)\s*$', re.IGNORECASE)
+
+BATCH_SYSTEM_PROMPT = (
+    "You are analyzing text based on several independent instructions. Answer every numbered instruction "
+    "separately, using ONLY one of the choices offered for that instruction. - Respond with one line per "
+    "instruction in the form N: [TAG_NAME] and nothing else - "
+)
+
+def rule_tags(rule):
+    return [pair.get('tag', '').strip() for pair in rule.get('tag_action_pairs', []) if pair.get('tag', '').strip()]
+
+def rule_actions_are_condition_safe(rule):
+    for pair in rule.get('tag_action_pairs', []):
+        for action in pair.get('actions', []):
+            if action.get('type', 'System Message') not in CONDITION_SAFE_ACTIONS:
+                return False
+    return True
+
+def is_batchable_rule(rule):
+    if rule.get('applies_to', 'Narrator') != 'Narrator':
+        return False
+    if not rule.get('condition', '').strip():
+        return False
+    tags = rule_tags(rule)
+    return bool(tags) and len(tags) == len(rule.get('tag_action_pairs', []))
+
+def build_batch_context(prepared_texts):
+    shared = os.path.commonprefix(prepared_texts) if len(prepared_texts) > 1 else ''
+    cut = shared.rfind(_SHARED_TEXT_END)
+    shared = shared[:cut + len(_SHARED_TEXT_END)] if cut != -1 else ''
+    parts = [shared.rstrip('\n')] if shared else []
+    for number, text in enumerate(prepared_texts, 1):
+        parts.append(f"### Instruction {number}\n{text[len(shared):].strip()}")
+    parts.append(f"Answer all {len(prepared_texts)} instructions, one line each, as N: [TAG_NAME].")
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": "\n\n".join(parts)}
+    ]
+
+def batch_max_tokens(count):
+    return SINGLE_RULE_MAX_TOKENS + BATCH_TOKENS_PER_RULE * max(0, count - 1)
+
+def parse_batch_reply(reply, count):
+    answers = {}
+    if not isinstance(reply, str):
+        return answers
+    for line in reply.splitlines():
+        match = _ANSWER_LINE_RE.match(line)
+        if not match:
+            continue
+        number = int(match.group(1))
+        if 1 <= number <= count and number not in answers:
+            answers[number] = match.group(2)
+    return answers
+
+def rule_chain_key(tab_data, rules_list):
+    if not tab_data:
+        return None
+    return id(tab_data), tab_data.get('turn_count', 1), id(rules_list)
+
+def _result_key(model, prepared_text):
+    return (model or '', prepared_text)
+
+def store_batched_results(self, chain, results):
+    if getattr(self, '_batched_rule_results_chain', None) != chain or getattr(self, '_batched_rule_results', None) is None:
+        clear_batched_results(self)
+        self._batched_rule_results_chain = chain
+    for model, prepared_text, answer in results:
+        self._batched_rule_results[_result_key(model, prepared_text)] = answer
+
+def take_batched_result(self, chain, model, prepared_text):
+    results = getattr(self, '_batched_rule_results', None)
+    if not results:
+        return None
+    if getattr(self, '_batched_rule_results_chain', None) != chain:
+        clear_batched_results(self)
+        return None
+    return results.pop(_result_key(model, prepared_text), None)
+
+def clear_batched_results(self):
+    self._batched_rule_results = {}
+    self._batched_rule_results_chain = None
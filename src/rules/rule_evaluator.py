@@ -3,15 +3,25 @@ import os
 import json
 import random
 from core.make_inference import make_inference
-from config import get_default_utility_model
+from config import get_default_utility_model, get_rule_batch_size, get_rule_pipeline_workers
 import re
 from core.move_character import move_characters
-from rules.apply_rules import _apply_rule_side_effects, _substitute_variables_in_string
+from core.context_log import get_scene_messages
+from rules.rule_batching import (SINGLE_RULE_MAX_TOKENS, rule_tags, rule_actions_are_condition_safe, is_batchable_rule,
+                                 build_batch_context, batch_max_tokens, parse_batch_reply, store_batched_results,
+                                 take_batched_result, clear_batched_results, rule_chain_key)
+from rules.condition_compiler import ConditionContext, get_compiled_conditions
+from core.variable_substitution import VariableSnapshot
+from rules.rule_pipeline import independent_followers, submit_rule_prefetch, take_rule_prefetch, pending_prefetch_count, clear_rule_prefetches
+from rules.apply_rules import _apply_rule_side_effects, _substitute_variables_in_string, _substitute_variables_in_strings
 from core.utils import (_get_player_character_name, _prepare_condition_text, 
                  _get_player_current_setting_name, 
                  _get_random_filtered_entity_name)
 import time
 
+RULE_CONDITION_SYSTEM_PROMPT = "You are analyzing text based on a specific instruction. Respond ONLY with one of the provided choices, based on the text and the instruction. - Respond with only the chosen tag in square brackets (e.g., [TAG_NAME]) - "
+PREFETCH_POLL_MS = 25
+
 def _is_transit_rule(rule):
     pairs = rule.get('tag_action_pairs', [])
     for pair in pairs:
@@ -26,9 +36,11 @@ def _evaluate_conditions(self, tab_data, conditions, operator, current_turn, tri
     if time_manager_widget and hasattr(time_manager_widget, 'update_time'):
         time_manager_widget.update_time(self, tab_data)
     tab_index = self.tabs_data.index(tab_data) if tab_data in self.tabs_data else -1
+    global_variables_available = False
     if tab_index >= 0:
         variables_file = tab_data.get('variables_file')
         if variables_file and os.path.exists(variables_file):
+            global_variables_available = True
             try:
                 with open(variables_file, 'r', encoding='utf-8') as f:
                     content = f.read().strip()
@@ -42,21 +54,16 @@ def _evaluate_conditions(self, tab_data, conditions, operator, current_turn, tri
         if triggered_directly:
             return True
         return False
-    results = []
-    for idx, cond_row_data in enumerate(conditions):
-        if 'applies_to' not in cond_row_data and character_name:
-            cond_row_data['character_name'] = character_name
-        result = self._evaluate_condition_row(tab_data, cond_row_data, current_turn, triggered_directly)
-        results.append(result)
-        if (operator.upper() == "AND" or operator.upper() == "ALL") and not result:
-            return False
-        elif (operator.upper() == "OR" or operator.upper() == "ANY") and result:
-            return True
-    if operator.upper() == "OR" or operator.upper() == "ANY":
-        final_result = any(results)
-    else:
-        final_result = all(results)
-    return final_result
+    snapshot = VariableSnapshot(
+        tab_data, character_name, ui=self,
+        global_loader=lambda: tab_data.get('variables', {}) if global_variables_available else {}
+    )
+    def substitute(value, value_character_name):
+        shared = snapshot if value_character_name == character_name else None
+        return self._substitute_placeholders_in_condition_value(value, tab_data, value_character_name, snapshot=shared)
+    context = ConditionContext(self, tab_data, current_turn, triggered_directly, character_name, snapshot, substitute,
+                               debug=hasattr(self, '_debug_transit_conditions'))
+    return get_compiled_conditions(conditions, operator).evaluate(context)
 
 def _process_specific_rule(self, rule, current_user_msg, prev_assistant_msg, rules_list, rule_index=None, triggered_directly=False, is_post_phase=False, character_name=None, original_sequential_context=None):
     from chatBotRPG import InferenceThread
@@ -289,11 +296,13 @@ def _process_specific_rule(self, rule, current_user_msg, prev_assistant_msg, rul
                 except Exception:
                     pass
             cot_context = [
-                {"role": "system", "content": f"You are analyzing text based on a specific instruction. Respond ONLY with one of the provided choices, based on the text and the instruction. - Respond with only the chosen tag in square brackets (e.g., [TAG_NAME]) - "},
+                {"role": "system", "content": RULE_CONDITION_SYSTEM_PROMPT},
                 {"role": "user", "content": prepared_condition_text}
             ]
             rule_model = rule.get('model')
             model_to_use = rule_model if rule_model else self.get_current_cot_model()
+            chain = rule_chain_key(tab_data, rules_list)
+            batched_result = take_batched_result(self, chain, model_to_use, prepared_condition_text)
             callback_info = {
                 'rule': rule, 'rule_id': rule_id, 'rule_index': rule_index,
                 'current_user_msg': current_user_msg, 'prev_assistant_msg': prev_assistant_msg,
@@ -315,18 +324,171 @@ def _process_specific_rule(self, rule, current_user_msg, prev_assistant_msg, rul
                     tried_fallback1=False, tried_fallback2=False, tried_fallback3=False,
                     character_name_for_rule_context=character_name
                 )
+            def start_single_inference():
+                self.utility_inference_thread = InferenceThread(
+                    cot_context, self.character_name, model_to_use, SINGLE_RULE_MAX_TOKENS, 0.1, is_utility_call=True,
+                    use_cache=True, cache_dir=tab_data.get('workflow_data_dir') if tab_data else None,
+                    cache_accept=_rule_reply_matcher(rule)
+                )
+                self.utility_inference_thread.result_signal.connect(on_inference_complete)
+                self.utility_inference_thread.error_signal.connect(on_inference_error)
+                self.utility_inference_thread.start()
+            if batched_result is not None:
+                print(f"    Rule '{rule_id}' answered by batched evaluation: {batched_result}")
+                QTimer.singleShot(0, lambda: on_inference_complete(batched_result))
+                return
+            prefetch = take_rule_prefetch(self, chain, model_to_use, prepared_condition_text)
+            if prefetch is not None and not prefetch.cancelled():
+                print(f"    Rule '{rule_id}' using its concurrently evaluated condition")
+                _await_rule_prefetch(self, rule_id, prefetch, on_inference_complete, start_single_inference)
+                return
+            batch = []
+            if not triggered_directly and rule_index is not None:
+                batch = _collect_rule_batch(self, tab_data, rule, rule_index, rules_list, scope, model_to_use,
+                                            current_user_msg, prev_assistant_msg)
+                _prefetch_independent_rules(self, tab_data, rule_index, rules_list, [r for r, _ in batch],
+                                            current_user_msg, prev_assistant_msg)
+            if not batch:
+                start_single_inference()
+                return
+            batch_texts = [prepared_condition_text] + [text for _, text in batch]
+            print(f"    Rule '{rule_id}' evaluating {len(batch_texts)} text conditions in one call: {[rule_id] + [r.get('id') for r, _ in batch]}")
+            def on_batch_complete(result):
+                answers = parse_batch_reply(result, len(batch_texts))
+                store_batched_results(self, chain, [(model_to_use, text, answers[number])
+                                                    for number, text in enumerate(batch_texts[1:], 2) if number in answers])
+                if 1 in answers:
+                    on_inference_complete(answers[1])
+                else:
+                    print(f"    Batched reply had no answer for rule '{rule_id}', evaluating it alone")
+                    self.on_utility_inference_finished()
+                    start_single_inference()
+            def on_batch_error(error):
+                print(f"    Batched rule evaluation failed ({error}), evaluating rule '{rule_id}' alone")
+                self.on_utility_inference_finished()
+                clear_batched_results(self)
+                start_single_inference()
             self.utility_inference_thread = InferenceThread(
-                cot_context, self.character_name, model_to_use, 100, 0.1, is_utility_call=True
+                build_batch_context(batch_texts), self.character_name, model_to_use, batch_max_tokens(len(batch_texts)), 0.1,
+                is_utility_call=True, use_cache=True, cache_dir=tab_data.get('workflow_data_dir') if tab_data else None,
+                cache_accept=lambda reply: len(parse_batch_reply(reply, len(batch_texts))) == len(batch_texts)
             )
-            self.utility_inference_thread.result_signal.connect(on_inference_complete)
-            self.utility_inference_thread.error_signal.connect(on_inference_error)
+            self.utility_inference_thread.result_signal.connect(on_batch_complete)
+            self.utility_inference_thread.error_signal.connect(on_batch_error)
             self.utility_inference_thread.start()
 
+def _build_rule_condition_text(self, rule, tab_data, scope, current_user_msg, prev_assistant_msg):
+    condition = _substitute_variables_in_string(rule.get('condition', '').strip(), tab_data, None)
+    if not condition:
+        return None
+    tags = rule_tags(rule)
+    player_name = _get_player_character_name(tab_data.get('workflow_data_dir'))
+    prepared_condition_text = _prepare_condition_text(self, condition, player_name, None, tab_data, scope,
+                                                      current_user_msg, prev_assistant_msg)
+    if not any(f"[{tag.lower()}]" in condition.lower() for tag in tags) and "choose" not in condition.lower():
+        prepared_condition_text += f"\nChoose ONLY one of these responses: {', '.join([f'[{t}]' for t in tags])}"
+    return prepared_condition_text
+
+def _rule_reply_matcher(rule):
+    tags = [pair.get('tag', '').strip().lower() for pair in rule.get('tag_action_pairs', [])]
+    def matches(reply):
+        reply = reply.strip().lower()
+        return any(not tag or tag in reply for tag in tags)
+    return matches
+
+def _await_rule_prefetch(self, rule_id, future, on_complete, on_failed):
+    if not future.done():
+        QTimer.singleShot(PREFETCH_POLL_MS, lambda: _await_rule_prefetch(self, rule_id, future, on_complete, on_failed))
+        return
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"    Concurrent evaluation of rule '{rule_id}' failed ({e}), evaluating it again")
+        on_failed()
+        return
+    on_complete(result)
+
+def _prefetch_independent_rules(self, tab_data, rule_index, rules_list, batched_rules, current_user_msg, prev_assistant_msg):
+    workers = get_rule_pipeline_workers()
+    if workers < 1 or not rules_list:
+        return
+    capacity = workers - pending_prefetch_count(self)
+    if capacity <= 0:
+        return
+    workflow_data_dir = tab_data.get('workflow_data_dir')
+    for candidate in independent_followers(rules_list, rule_index, workers + len(batched_rules)):
+        if capacity <= 0:
+            break
+        if any(candidate is batched for batched in batched_rules):
+            continue
+        conditions = candidate.get('conditions', [])
+        if conditions and not _evaluate_conditions(self, tab_data, conditions, candidate.get('conditions_operator', 'AND'), tab_data.get('turn_count', 1)):
+            continue
+        scope = candidate.get('scope', 'user_message')
+        model = candidate.get('model') or self.get_current_cot_model()
+        try:
+            prepared_text = _build_rule_condition_text(self, candidate, tab_data, scope, current_user_msg, prev_assistant_msg)
+        except Exception as e:
+            print(f"    Could not prepare rule '{candidate.get('id')}' for concurrent evaluation: {e}")
+            continue
+        if not prepared_text:
+            continue
+        context = [
+            {"role": "system", "content": RULE_CONDITION_SYSTEM_PROMPT},
+            {"role": "user", "content": prepared_text}
+        ]
+        def evaluate(context=context, model=model, prepared_text=prepared_text, accept=_rule_reply_matcher(candidate)):
+            return make_inference(context, prepared_text, self.character_name, model, SINGLE_RULE_MAX_TOKENS, 0.1,
+                                  is_utility_call=True, use_cache=True, cache_dir=workflow_data_dir, cache_accept=accept)
+        submit_rule_prefetch(self, workers, rule_chain_key(tab_data, rules_list), model, prepared_text, evaluate)
+        capacity -= 1
+
+def _collect_rule_batch(self, tab_data, rule, rule_index, rules_list, scope, model_to_use, current_user_msg, prev_assistant_msg):
+    batch = []
+    batch_size = get_rule_batch_size()
+    if batch_size < 2 or not rules_list or not is_batchable_rule(rule) or not rule_actions_are_condition_safe(rule):
+        return batch
+    is_eor_processing = getattr(self, '_is_processing_eor', False)
+    for next_rule in rules_list[rule_index + 1:]:
+        if len(batch) + 1 >= batch_size:
+            break
+        applies_to = next_rule.get('applies_to', 'Narrator')
+        if applies_to == 'End of Round' and not is_eor_processing:
+            continue
+        if not is_batchable_rule(next_rule):
+            if rule_actions_are_condition_safe(next_rule):
+                continue
+            break
+        next_model = next_rule.get('model') or self.get_current_cot_model()
+        if next_rule.get('scope', 'user_message') != scope or next_model != model_to_use:
+            if rule_actions_are_condition_safe(next_rule):
+                continue
+            break
+        conditions = next_rule.get('conditions', [])
+        if conditions and not _evaluate_conditions(self, tab_data, conditions, next_rule.get('conditions_operator', 'AND'), tab_data.get('turn_count', 1)):
+            continue
+        try:
+            prepared_text = _build_rule_condition_text(self, next_rule, tab_data, scope, current_user_msg, prev_assistant_msg)
+        except Exception as e:
+            print(f"    Could not prepare rule '{next_rule.get('id')}' for batching: {e}")
+            break
+        if prepared_text:
+            batch.append((next_rule, prepared_text))
+        if not rule_actions_are_condition_safe(next_rule):
+            break
+    return batch
+
+def _begin_rule_chain(self):
+    clear_batched_results(self)
+    clear_rule_prefetches(self)
+
 def _process_next_sequential_rule_pre(self, current_user_msg, prev_assistant_msg, rules):
     print(f"[DEBUG] Starting sequential rule processing with {len(rules) if rules else 0} rules")
     tab_data = self.get_current_tab_data()
     if not tab_data:
         return
+    if not getattr(self, '_cot_sequential_index', 0):
+        _begin_rule_chain(self)
     if tab_data.get('_exit_rule_processing'):
         tab_data.pop('_exit_rule_processing', None)
         if hasattr(self, '_cot_next_step') and self._cot_next_step:
@@ -397,6 +559,8 @@ def _process_next_sequential_rule_post(self, current_user_msg, assistant_msg, ru
     tab_data = self.get_current_tab_data()
     if not tab_data:
         return
+    if not getattr(self, '_cot_sequential_index', 0):
+        _begin_rule_chain(self)
     if tab_data.get('_exit_rule_processing'):
         tab_data.pop('_exit_rule_processing', None)
         if hasattr(self, '_cot_next_step') and self._cot_next_step:
@@ -544,8 +708,9 @@ def _apply_rule_actions_and_continue(self, matched_pair, rule, rule_index, curre
                             actor_context_for_substitution = rule.get('character_name')
                         elif character_name_for_rule_context:
                             actor_context_for_substitution = character_name_for_rule_context
-                        min_str_substituted = _substitute_variables_in_string(str(min_str), tab_data, actor_context_for_substitution)
-                        max_str_substituted = _substitute_variables_in_string(str(max_str), tab_data, actor_context_for_substitution)
+                        min_str_substituted, max_str_substituted = _substitute_variables_in_strings(
+                            [str(min_str), str(max_str)], tab_data, actor_context_for_substitution
+                        )
                         def parse_numeric_value(value_str, field_name):
                             try:
                                 return int(value_str)
@@ -626,8 +791,8 @@ def _apply_rule_actions_and_continue(self, matched_pair, rule, rule_index, curre
                             current_scene_messages = [msg for msg in filtered_context
                                                     if msg.get('role') != 'system' and msg.get('scene', 1) == current_scene_number]
                         else:
-                            current_scene_messages = [msg for msg in tab_data.get('context', [])
-                                                    if msg.get('role') != 'system' and msg.get('scene', 1) == current_scene_number]
+                            current_scene_messages = [msg for msg in get_scene_messages(tab_data.get('context', []), current_scene_number)
+                                                    if msg.get('role') != 'system']
                         formatted_history = [f"{msg.get('role', 'unknown').capitalize()}: {msg.get('content', '')}"
                                             for msg in current_scene_messages]
                         context_str = "\n".join(formatted_history)
@@ -1489,7 +1654,9 @@ def _retry_rule_with_fallback(self, rule, rule_id, rule_index, current_user_msg,
             character_name_for_rule_context=character_name_for_rule_context
         )
     self.utility_inference_thread = InferenceThread(
-        cot_context, self.character_name, fallback_model, 100, 0.1, is_utility_call=True
+        cot_context, self.character_name, fallback_model, 100, 0.1, is_utility_call=True,
+        use_cache=True, cache_dir=tab_data.get('workflow_data_dir') if tab_data else None,
+        cache_accept=_rule_reply_matcher(rule)
     )
     self.utility_inference_thread.result_signal.connect(on_fallback_inference_complete)
     self.utility_inference_thread.error_signal.connect(on_fallback_inference_error)
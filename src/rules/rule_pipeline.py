@@ -0,0 +1,121 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from rules.rule_batching import CONDITION_SAFE_ACTIONS, is_batchable_rule
+
+MAX_TRACKED_PREFETCHES = 64
+_PLACEHOLDER_VAR_RE = re.compile(r'\[(?:global|player|actor|character|setting),\s*([^,\]]+?)\s*\]', re.IGNORECASE)
+_ANY_VARIABLE = '*'
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+class RuleDependencies:
+    def __init__(self, reads, writes, barrier):
+        self.reads = reads
+        self.writes = writes
+        self.barrier = barrier
+
+    def conflicts_with(self, later):
+        if self.barrier:
+            return True
+        if not self.writes:
+            return False
+        if _ANY_VARIABLE in self.writes or _ANY_VARIABLE in later.reads:
+            return True
+        return bool(self.writes & later.reads)
+
+def _variable_key(name):
+    name = (name or '').strip().lower()
+    if not name or '[' in name or '(' in name:
+        return _ANY_VARIABLE
+    return name
+
+def rule_dependencies(rule):
+    reads = set()
+    for cond in rule.get('conditions', []):
+        if cond.get('type') == 'Variable':
+            reads.add(_variable_key(cond.get('variable', '')))
+        elif cond.get('type') not in ('None', 'Always', 'Scene Count'):
+            reads.add(_ANY_VARIABLE)
+    for match in _PLACEHOLDER_VAR_RE.finditer(rule.get('condition', '') or ''):
+        reads.add(_variable_key(match.group(1)))
+    writes = set()
+    barrier = False
+    for pair in rule.get('tag_action_pairs', []):
+        for action in pair.get('actions', []):
+            action_type = action.get('type', 'System Message')
+            if action_type == 'Set Var':
+                writes.add(_variable_key(action.get('var_name', '')))
+            elif action_type not in CONDITION_SAFE_ACTIONS or action_type in ('Next Rule', 'Exit Rule Processing'):
+                barrier = True
+    return RuleDependencies(reads, writes, barrier)
+
+def independent_followers(rules_list, rule_index, limit):
+    followers = []
+    if limit <= 0:
+        return followers
+    earlier = [rule_dependencies(rules_list[rule_index])]
+    if earlier[0].barrier:
+        return followers
+    for index in range(rule_index + 1, len(rules_list)):
+        candidate = rules_list[index]
+        deps = rule_dependencies(candidate)
+        if is_batchable_rule(candidate) and not any(previous.conflicts_with(deps) for previous in earlier):
+            followers.append(candidate)
+            if len(followers) >= limit:
+                break
+        if deps.barrier:
+            break
+        earlier.append(deps)
+    return followers
+
+def get_rule_executor(max_workers):
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != max_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rule-prefetch")
+            _executor_workers = max_workers
+        return _executor
+
+def _prefetches(self):
+    if getattr(self, '_rule_prefetches', None) is None:
+        self._rule_prefetches = {}
+    return self._rule_prefetches
+
+def submit_rule_prefetch(self, max_workers, chain, model, prepared_text, fn):
+    if getattr(self, '_rule_prefetch_chain', None) != chain:
+        clear_rule_prefetches(self)
+        self._rule_prefetch_chain = chain
+    prefetches = _prefetches(self)
+    key = (model or '', prepared_text)
+    if key in prefetches:
+        return prefetches[key]
+    if len(prefetches) >= MAX_TRACKED_PREFETCHES:
+        clear_rule_prefetches(self)
+        self._rule_prefetch_chain = chain
+        prefetches = _prefetches(self)
+    future = get_rule_executor(max_workers).submit(fn)
+    prefetches[key] = future
+    return future
+
+def take_rule_prefetch(self, chain, model, prepared_text):
+    prefetches = getattr(self, '_rule_prefetches', None)
+    if not prefetches:
+        return None
+    if getattr(self, '_rule_prefetch_chain', None) != chain:
+        clear_rule_prefetches(self)
+        return None
+    return prefetches.pop((model or '', prepared_text), None)
+
+def pending_prefetch_count(self):
+    return sum(1 for future in _prefetches(self).values() if not future.done())
+
+def clear_rule_prefetches(self):
+    for future in _prefetches(self).values():
+        future.cancel()
+    self._rule_prefetches = {}
+    self._rule_prefetch_chain = None
@@ -0,0 +1,51 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from core.utils import _evaluate_variable_condition
+from core.variable_store import get_variable_store, ACTOR_SCOPE
+from editor_panel.timer_manager import _execute_set_var_action
+
+def _write_json(file_path, data):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+class VariableStorePathsTest(unittest.TestCase):
+    def setUp(self):
+        self.workflow_data_dir = tempfile.mkdtemp()
+        player = {'name': 'Hero', 'isPlayer': True, 'variables': {'hp': 7}}
+        for layer in ('game', os.path.join('resources', 'data files')):
+            _write_json(os.path.join(self.workflow_data_dir, layer, 'actors', 'Hero.json'), player)
+        self.guard_file = os.path.join(self.workflow_data_dir, 'game', 'actors', 'Guard.json')
+        _write_json(self.guard_file, {'name': 'Guard', 'variables': {'mood': 'happy'}})
+        _write_json(os.path.join(self.workflow_data_dir, 'game', 'variables.json'), {'gold': 3})
+        self.tab_data = {'workflow_data_dir': self.workflow_data_dir}
+        self.changes = []
+        self.token = get_variable_store().subscribe(self.changes.extend, scope=ACTOR_SCOPE)
+
+    def tearDown(self):
+        get_variable_store().unsubscribe(self.token)
+        shutil.rmtree(self.workflow_data_dir, ignore_errors=True)
+
+    def _visible(self, condition):
+        return _evaluate_variable_condition(condition, 'Guard', 'Hero', self.workflow_data_dir, self.tab_data)
+
+    def test_visibility_reads_scopes_from_the_store(self):
+        self.assertTrue(self._visible({'var_name': 'mood', 'operator': '==', 'value': 'happy', 'variable_scope': 'Character'}))
+        self.assertTrue(self._visible({'var_name': 'hp', 'operator': '>=', 'value': '7', 'variable_scope': 'Player'}))
+        self.assertTrue(self._visible('gold > 2'))
+        self.assertFalse(self._visible('missing exists'))
+
+    def test_timer_set_var_notifies_subscribers(self):
+        action = {'var_name': 'mood', 'var_value': 'angry', 'scope': 'Character', 'operation': 'Set'}
+        _execute_set_var_action(None, action, 'Guard', self.tab_data)
+        self.assertEqual([(change.owner, change.name, change.new_value) for change in self.changes],
+                         [('Guard', 'mood', 'angry')])
+        with open(self.guard_file, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['variables']['mood'], 'angry')
+        self.assertTrue(self._visible({'var_name': 'mood', 'operator': '==', 'value': 'angry', 'variable_scope': 'Character'}))
+
+if __name__ == '__main__':
+    unittest.main()
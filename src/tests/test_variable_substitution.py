@@ -0,0 +1,37 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from rules.apply_rules import _substitute_variables_in_string, _substitute_variables_in_strings
+
+def _write_json(file_path, data):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+class SubstituteVariablesTest(unittest.TestCase):
+    def setUp(self):
+        self.workflow_data_dir = tempfile.mkdtemp()
+        player = {'name': 'Hero', 'isPlayer': True, 'variables': {'hp': 7}}
+        for layer in ('game', os.path.join('resources', 'data files')):
+            _write_json(os.path.join(self.workflow_data_dir, layer, 'actors', 'Hero.json'), player)
+        _write_json(os.path.join(self.workflow_data_dir, 'game', 'actors', 'Guard.json'),
+                    {'name': 'Guard', 'variables': {'mood': 'happy'}})
+        _write_json(os.path.join(self.workflow_data_dir, 'game', 'variables.json'), {'gold': 3})
+        self.tab_data = {'workflow_data_dir': self.workflow_data_dir}
+
+    def tearDown(self):
+        shutil.rmtree(self.workflow_data_dir, ignore_errors=True)
+
+    def test_substitutes_player_and_actor_variables(self):
+        text = 'p=[player,hp] a=[actor,mood] c=[character,mood] g=[global,gold]'
+        result = _substitute_variables_in_string(text, self.tab_data, 'Guard')
+        self.assertEqual(result, 'p=7 a=happy c=happy g=3')
+
+    def test_substitutes_several_strings_from_one_snapshot(self):
+        result = _substitute_variables_in_strings(['[player,hp]', '[actor,mood]', 'plain'], self.tab_data, 'Guard')
+        self.assertEqual(result, ['7', 'happy', 'plain'])
+
+if __name__ == '__main__':
+    unittest.main()